@@ -1,19 +1,30 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 import os
-from database import get_db, DBUser
+import threading
+import time
+from database import get_db, get_user_by_username, add_user, update_user, DBUser
+from executors import hash_executor
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-for-jwt-please-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Verified tokens and active users are cached for AUTH_CACHE_TTL seconds, so
+# most authenticated requests skip jwt.decode and the users query. Changes made
+# by another process become visible once the entry expires.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -35,15 +46,106 @@ class User(BaseModel):
     email: str
     is_active: bool = True
     is_superuser: bool = False
+    
+    class Config:
+        orm_mode = True
 
 class UserCreate(BaseModel):
     username: str
     email: str
     password: str
 
+class UserUpdate(BaseModel):
+    email: Optional[str] = None
+    password: Optional[str] = None
+    is_active: Optional[bool] = None
+    is_superuser: Optional[bool] = None
+
 class UserInDB(User):
     hashed_password: str
 
+class TTLCache:
+    """
+    Thread-safe LRU dictionary whose entries expire after a TTL
+    """
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+            }
+
+# token -> username for tokens whose signature and expiry were verified
+token_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+# username -> User for active users
+user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+def auth_cache_stats() -> Dict[str, Any]:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+# Drop cached users once a change to their row is committed in this process
+@event.listens_for(DBUser, "after_update")
+@event.listens_for(DBUser, "after_delete")
+def _track_changed_user(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_usernames", set()).add(target.username)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for username in session.info.pop("changed_usernames", ()):
+        user_cache.invalidate(username)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_usernames", None)
+
 # Password functions
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -52,26 +154,29 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 # User functions
-def get_user(db: Session, username: str):
-    return db.query(DBUser).filter(DBUser.username == username).first()
-
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+async def create_user(db: Session, user: UserCreate):
+    hashed_password = await hash_executor.run(get_password_hash, user.password)
     db_user = DBUser(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
-
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
+    return await add_user(db, db_user)
+
+async def update_user_account(db: Session, username: str, changes: UserUpdate):
+    """
+    Apply the set fields of a UserUpdate (the cached user is dropped on commit)
+    """
+    values = changes.dict(exclude_unset=True, exclude_none=True)
+    if "password" in values:
+        values["hashed_password"] = await hash_executor.run(get_password_hash, values.pop("password"))
+    return await update_user(db, username, values)
+
+async def authenticate_user(db: Session, username: str, password: str):
+    user = await get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await hash_executor.run(verify_password, password, user.hashed_password):
         return False
     return user
 
@@ -92,17 +197,28 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    username = token_cache.get(token)
+    if username is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+            token_data = TokenData(username=username)
+        except JWTError:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    user = get_user(db, username=token_data.username)
+        # Never keep a token past its own expiry
+        expires = payload.get("exp")
+        token_cache.set(token, token_data.username, expires - time.time() if expires else None)
+    
+    user = user_cache.get(username)
     if user is None:
-        raise credentials_exception
+        db_user = await get_user_by_username(db, username)
+        if db_user is None:
+            raise credentials_exception
+        user = User.from_orm(db_user)
+        if user.is_active:
+            user_cache.set(username, user)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
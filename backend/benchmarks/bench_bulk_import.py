@@ -0,0 +1,77 @@
+"""
+Benchmark: bulk scenario import and streaming export throughput
+
+Loads the same scenarios three ways and reports rows per second:
+one POST /scenarios/ per scenario, POST /scenarios/import with an NDJSON
+body and, when pyarrow is installed, POST /scenarios/import with Parquet.
+Then streams GET /scenarios/export and reports its throughput.
+
+Usage (from backend/):
+    python benchmarks/bench_bulk_import.py [--rows 5000] [--single-rows 500] [--chunk-size 500]
+"""
+import argparse
+import io
+import json
+
+from common import running_server, request, login, sample_scenario
+
+def ndjson_body(start: int, rows: int) -> bytes:
+    return "".join(json.dumps(sample_scenario(i)) + "\n" for i in range(start, start + rows)).encode()
+
+def parquet_body(start: int, rows: int):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist([sample_scenario(i) for i in range(start, start + rows)]), buffer)
+    return buffer.getvalue()
+
+def throughput(rows: int, seconds: float):
+    return {"rows": rows, "seconds": round(seconds, 3), "rows_per_second": round(rows / seconds, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="scenarios per bulk import")
+    parser.add_argument("--single-rows", type=int, default=500, help="scenarios posted one at a time")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows per import transaction")
+    args = parser.parse_args()
+
+    results = {}
+    with running_server() as base_url:
+        token = login(base_url)
+
+        elapsed = 0.0
+        for i in range(args.single_rows):
+            status, _, seconds = request(base_url, "POST", "/scenarios/", body=sample_scenario(1_000_000 + i), token=token)
+            assert status == 200, status
+            elapsed += seconds
+        results["single_posts"] = throughput(args.single_rows, elapsed)
+
+        bodies = {"ndjson": ndjson_body(0, args.rows), "parquet": parquet_body(args.rows, args.rows)}
+        for name, body in bodies.items():
+            if body is None:
+                results[f"import_{name}"] = "skipped (pyarrow not installed)"
+                continue
+            status, report, seconds = request(
+                base_url, "POST", f"/scenarios/import?format={name}&chunk_size={args.chunk_size}",
+                token=token, raw=body, headers={"Content-Type": "application/octet-stream"}
+            )
+            assert status == 200, (status, report)
+            results[f"import_{name}"] = {
+                **throughput(report["imported"], seconds),
+                "body_mb": round(len(body) / 1e6, 2),
+                "server": {key: report[key] for key in
+                           ("validateSeconds", "insertSeconds", "elapsedSeconds", "rowsPerSecond", "failed")},
+            }
+
+        status, payload, seconds = request(base_url, "GET", "/scenarios/export", token=token)
+        assert status == 200, status
+        exported = payload.count(b"\n") if isinstance(payload, bytes) else 1
+        results["export_ndjson"] = {**throughput(exported, seconds), "body_mb": round(len(payload) / 1e6, 2)}
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: latency of unrelated endpoints during a login storm
+
+Measures GET /scenarios/ latency on an idle server, then again while
+--clients threads log in as fast as they can (bcrypt verification on every
+POST /token). Reports both latency distributions plus login latency and how
+many logins were shed with 429.
+
+Usage (from backend/):
+    python benchmarks/bench_login_storm.py [--clients 32] [--seconds 10] [--hash-pool 2] [--hash-queue 8]
+"""
+import argparse
+import json
+import threading
+import time
+
+from common import ADMIN_PASSWORD, running_server, request, login, sample_scenario, summarize
+
+def measure(base_url, token, count=None, until=None):
+    latencies = []
+    while (count is None or len(latencies) < count) and (until is None or not until.is_set()):
+        status, _, elapsed = request(base_url, "GET", "/scenarios/?limit=20", token=token)
+        assert status == 200, status
+        latencies.append(elapsed)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent login loops")
+    parser.add_argument("--seconds", type=float, default=10, help="storm duration")
+    parser.add_argument("--requests", type=int, default=300, help="idle-phase /scenarios/ requests")
+    parser.add_argument("--hash-pool", type=int, default=None, help="HASH_POOL_SIZE for the server")
+    parser.add_argument("--hash-queue", type=int, default=None, help="HASH_QUEUE_SIZE for the server")
+    args = parser.parse_args()
+
+    env = {}
+    if args.hash_pool is not None:
+        env["HASH_POOL_SIZE"] = str(args.hash_pool)
+    if args.hash_queue is not None:
+        env["HASH_QUEUE_SIZE"] = str(args.hash_queue)
+
+    with running_server(env=env) as base_url:
+        token = login(base_url)
+        for i in range(20):
+            request(base_url, "POST", "/scenarios/", body=sample_scenario(i), token=token)
+
+        idle = measure(base_url, token, count=args.requests)
+
+        stop = threading.Event()
+        logins = {"ok": [], "rejected": [], "other": 0}
+        lock = threading.Lock()
+        def storm():
+            while not stop.is_set():
+                status, _, elapsed = request(base_url, "POST", "/token",
+                                             form={"username": "admin", "password": ADMIN_PASSWORD})
+                with lock:
+                    if status == 200:
+                        logins["ok"].append(elapsed)
+                    elif status == 429:
+                        logins["rejected"].append(elapsed)
+                    else:
+                        logins["other"] += 1
+
+        threads = [threading.Thread(target=storm) for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5)
+        timer = threading.Timer(args.seconds, stop.set)
+        timer.start()
+        busy = measure(base_url, token, until=stop)
+        for thread in threads:
+            thread.join()
+
+        _, metrics, _ = request(base_url, "GET", "/metrics", token=token)
+
+    print(json.dumps({
+        "idle": summarize(idle),
+        "during_login_storm": summarize(busy),
+        "logins": {
+            "succeeded": len(logins["ok"]),
+            "rejected_429": len(logins["rejected"]),
+            "other_errors": logins["other"],
+            "latency": summarize(logins["ok"]) if logins["ok"] else None,
+            "rejection_latency": summarize(logins["rejected"]) if logins["rejected"] else None,
+        },
+        "password_hashing": metrics.get("password_hashing") if isinstance(metrics, dict) else None,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark: database writes per scenario update
+
+Saves one scenario, then applies a series of typical edits through
+database.update_scenario and counts the INSERT/UPDATE/DELETE statements and
+rows each edit writes, per table. Also reports how many staff_positions rows
+exist afterwards compared with the positions actually referenced.
+
+Runs in-process against a throwaway SQLite database.
+
+Usage (from backend/):
+    python benchmarks/bench_position_updates.py [--positions 20] [--repeats 50]
+"""
+import argparse
+import copy
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WRITE_STATEMENT = re.compile(r"^\s*(INSERT INTO|UPDATE|DELETE FROM)\s+(\w+)", re.IGNORECASE)
+
+class WriteCounter:
+    """Counts DML statements and affected rows per (verb, table)"""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.statements = defaultdict(int)
+        self.rows = defaultdict(int)
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        match = WRITE_STATEMENT.match(statement)
+        if match:
+            key = f"{match.group(1).split()[0].upper()} {match.group(2)}"
+            self.statements[key] += 1
+            if cursor.rowcount > 0:
+                self.rows[key] += cursor.rowcount
+            elif " RETURNING " in statement:
+                # Batched INSERT ... RETURNING (insertmanyvalues): one VALUES group per row
+                self.rows[key] += statement.split(" VALUES ", 1)[1].count("(?")
+            else:
+                self.rows[key] += len(parameters) if executemany else 1
+
+    def snapshot(self, repeats: int):
+        return {
+            "statements_per_update": round(sum(self.statements.values()) / repeats, 2),
+            "rows_per_update": round(sum(self.rows.values()) / repeats, 2),
+            "rows_by_table": {key: round(count / repeats, 2) for key, count in sorted(self.rows.items())},
+        }
+
+def scenario_payload(positions: int):
+    from common import sample_scenario
+    payload = sample_scenario(0)
+    template = payload["fohPositions"][0]
+    payload["fohPositions"] = [{**template, "id": f"foh-{i}"} for i in range(positions)]
+    payload["bohPositions"] = [{**template, "id": f"boh-{i}", "department": "BOH"} for i in range(positions)]
+    return payload
+
+def edits(payload):
+    """(name, function returning the edited payload for repeat i)"""
+    def unchanged(i):
+        return payload
+
+    def change_one_salary(i):
+        edited = copy.deepcopy(payload)
+        edited["fohPositions"][0]["salary"] = 3500 + i + 1
+        return edited
+
+    def add_and_remove_one(i):
+        edited = copy.deepcopy(payload)
+        edited["bohPositions"][-1] = {**edited["bohPositions"][-1], "id": f"boh-new-{i}"}
+        return edited
+
+    def rename_scenario(i):
+        return {**payload, "name": f"Renamed {i}"}
+
+    return [
+        ("unchanged", unchanged),
+        ("change_one_salary", change_one_salary),
+        ("replace_one_position", add_and_remove_one),
+        ("rename_scenario", rename_scenario),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--positions", type=int, default=20, help="FOH and BOH positions each")
+    parser.add_argument("--repeats", type=int, default=50, help="updates per edit type")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from sqlalchemy import event, func, select
+    from database import (DBStaffPosition, SessionLocal, create_tables, engine, save_scenario,
+                          scenario_foh_positions, scenario_boh_positions, update_scenario)
+    from models import Scenario
+
+    create_tables()
+    counter = WriteCounter()
+    event.listen(engine, "after_cursor_execute", counter.after_cursor_execute)
+
+    payload = scenario_payload(args.positions)
+    db = SessionLocal()
+    save_scenario.sync(db, Scenario.parse_obj(payload), None)
+
+    results = {}
+    for name, edit in edits(payload):
+        counter.reset()
+        start = time.perf_counter()
+        for i in range(args.repeats):
+            update_scenario.sync(db, Scenario.parse_obj(edit(i)))
+        elapsed = time.perf_counter() - start
+        results[name] = {**counter.snapshot(args.repeats), "ms_per_update": round(elapsed / args.repeats * 1000, 2)}
+
+    referenced = sum(db.scalar(select(func.count()).select_from(table))
+                     for table in (scenario_foh_positions, scenario_boh_positions))
+    results["staff_positions_rows"] = {
+        "stored": db.scalar(select(func.count()).select_from(DBStaffPosition)),
+        "referenced": referenced,
+    }
+    db.close()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
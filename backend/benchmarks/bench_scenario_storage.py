@@ -0,0 +1,127 @@
+"""
+Benchmark: scenario read/write latency, relational vs document storage
+
+Runs the same workload against each SCENARIO_STORAGE mode on a throwaway
+SQLite database: create scenarios, read them by id, update them, list them
+a page at a time, then delete them. Reports per-operation latency and SQL
+statements per operation.
+
+Runs in-process; pass --database-url to use e.g. a scratch PostgreSQL database.
+
+Usage (from backend/):
+    python benchmarks/bench_scenario_storage.py [--scenarios 500] [--positions 10] [--page-size 50]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import sample_scenario, summarize
+
+def scenario_payload(index: int, positions: int):
+    payload = sample_scenario(index)
+    for key, department in (("fohPositions", "FOH"), ("bohPositions", "BOH")):
+        template = payload[key][0]
+        payload[key] = [{**template, "id": f"{department.lower()}-{i}", "department": department}
+                        for i in range(positions)]
+    return payload
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+def timed(counter, func, *args, **kwargs):
+    before = counter.count
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start, counter.count - before
+
+def run_mode(database, mode, args, counter, user_id):
+    from models import Scenario
+    database.SCENARIO_STORAGE = mode
+    db = database.SessionLocal()
+    payloads = [scenario_payload(i, args.positions) for i in range(args.scenarios)]
+    for payload in payloads:
+        payload["id"] = f"{mode}-{payload['id']}"
+
+    phases = {}
+    def record(phase, elapsed, statements):
+        phase_data = phases.setdefault(phase, {"latencies": [], "statements": 0})
+        phase_data["latencies"].append(elapsed)
+        phase_data["statements"] += statements
+
+    for payload in payloads:
+        _, elapsed, statements = timed(counter, database.save_scenario.sync, db, Scenario.parse_obj(payload), user_id)
+        record("create", elapsed, statements)
+        db.expunge_all()
+
+    for payload in payloads:
+        scenario, elapsed, statements = timed(counter, database.get_scenario_by_id.sync, db, payload["id"])
+        assert scenario is not None and len(scenario.fohPositions) == args.positions
+        record("read", elapsed, statements)
+        db.expunge_all()
+
+    for i, payload in enumerate(payloads):
+        payload["fohPositions"][0]["salary"] += 100
+        payload["name"] = f"Updated {i}"
+        _, elapsed, statements = timed(counter, database.update_scenario.sync, db, Scenario.parse_obj(payload))
+        record("update", elapsed, statements)
+        db.expunge_all()
+
+    cursor = None
+    while True:
+        (items, cursor), elapsed, statements = timed(
+            counter, database.get_scenarios_page.sync, db, user_id, limit=args.page_size, cursor=cursor
+        )
+        record(f"list_page_{args.page_size}", elapsed, statements)
+        db.expunge_all()
+        if not cursor:
+            break
+
+    for payload in payloads:
+        _, elapsed, statements = timed(counter, database.delete_scenario.sync, db, payload["id"])
+        record("delete", elapsed, statements)
+    db.close()
+
+    return {
+        phase: {**summarize(data["latencies"]),
+                "statements_per_op": round(data["statements"] / len(data["latencies"]), 2)}
+        for phase, data in phases.items()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, default=500)
+    parser.add_argument("--positions", type=int, default=10, help="FOH and BOH positions per scenario")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from sqlalchemy import event
+    import database
+
+    database.create_tables()
+    db = database.SessionLocal()
+    user = database.DBUser(username=f"bench-{os.getpid()}", email=f"bench-{os.getpid()}@example.com",
+                           hashed_password="-")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    counter = StatementCounter()
+    event.listen(database.engine, "after_cursor_execute", counter)
+
+    results = {mode: run_mode(database, mode, args, counter, user_id) for mode in database.SCENARIO_STORAGE_MODES}
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
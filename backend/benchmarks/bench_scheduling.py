@@ -0,0 +1,79 @@
+"""
+Benchmark: weekly shift scheduling across outlet sizes
+
+Builds a week of shifts for outlets of increasing headcount, with demand
+scaled from the peak hour heatmap of a 50-person outlet (25 on duty at peak),
+then re-solves the next week warm-started from the first schedule.
+
+Usage (from backend/):
+    python benchmarks/bench_scheduling.py [--sizes 10 25 50 100 200] [--slot-minutes 60]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculations import analyze_peak_hours
+from models import PeakHourParams, ShiftScheduleParams
+from scheduling import build_shift_schedule
+
+REFERENCE_SIZE = 50
+
+def scaled_heatmap(size: int, seed: int, slot_minutes: int):
+    heatmap = analyze_peak_hours(PeakHourParams(seed=seed, slotMinutes=slot_minutes)).heatmapData
+    scale = size / REFERENCE_SIZE
+    return {
+        day: {
+            slot: {**cell, "foh": round(cell["foh"] * scale), "boh": round(cell["boh"] * scale)}
+            for slot, cell in slots.items()
+        }
+        for day, slots in heatmap.items()
+    }
+
+def run(size: int, slot_minutes: int, previous=None, seed: int = 1):
+    params = ShiftScheduleParams(
+        heatmapData=scaled_heatmap(size, seed, slot_minutes),
+        headcount={"FOH": round(size * 0.6), "BOH": size - round(size * 0.6)},
+        previousSchedule=previous or []
+    )
+    start = time.perf_counter()
+    result = build_shift_schedule(params)
+    elapsed = time.perf_counter() - start
+    return result, {
+        "seconds": round(elapsed, 3),
+        "solve_seconds": round(result.solver["solveTime"], 3),
+        "status": result.solver["status"],
+        "gap": result.solver["optimalityGap"],
+        "variables": result.solver["variables"],
+        "paid_hours": result.summary["paidHours"],
+        "required_hours": result.summary["requiredStaffHours"],
+        "understaffed_hours": result.summary["understaffedStaffHours"],
+        "shifts": result.summary["shifts"],
+        "split_shifts": result.summary["splitShifts"],
+        "unassigned": result.summary["unassignedShifts"],
+        "kept_assignments": result.summary["keptAssignments"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 25, 50, 100, 200])
+    parser.add_argument("--slot-minutes", type=int, default=60, choices=[15, 30, 60])
+    args = parser.parse_args()
+
+    # Warm up imports and the solver
+    run(10, args.slot_minutes)
+
+    report = []
+    for size in args.sizes:
+        first, cold = run(size, args.slot_minutes, seed=1)
+        _, warm = run(size, args.slot_minutes, previous=first.shifts, seed=2)
+        _, cold_next = run(size, args.slot_minutes, seed=2)
+        report.append({"employees": size, "week_1": cold, "week_2_cold": cold_next, "week_2_warm": warm})
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
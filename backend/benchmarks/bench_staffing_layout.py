@@ -0,0 +1,73 @@
+"""
+Benchmark: StaffingOptimizer with one pipeline per target vs one multi-output model
+
+Trains both layouts on the same synthetic dataset and reports training time,
+model file size on disk, StaffingOptimizer.optimize() latency per request
+(single feature row, as the API calls it) and test MSE per target.
+
+Runs in-process; models are written to a temporary MODELS_DIR.
+
+Usage (from backend/):
+    python benchmarks/bench_staffing_layout.py [--rows 365] [--model-type random_forest] [--search halving] [--requests 500]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import summarize
+from bench_training_search import TARGETS, staffing_training_data
+
+def run_layout(model_type, data, multi_output, args):
+    from ml_models import StaffingOptimizer
+    options = {"strategy": args.search, "n_jobs": args.n_jobs}
+    if args.n_iter:
+        options["n_iter"] = args.n_iter
+
+    start = time.perf_counter()
+    metrics = StaffingOptimizer(model_type).train(data, options, multi_output=multi_output)
+    training_seconds = time.perf_counter() - start
+
+    # Reload from disk as serving does
+    optimizer = StaffingOptimizer(model_type)
+    size = sum(os.path.getsize(path) for path in (optimizer.model_path, optimizer.preprocessor_path))
+    features = data.drop(columns=TARGETS).to_dict(orient="records")
+    latencies = []
+    for i in range(args.requests):
+        start = time.perf_counter()
+        optimizer.optimize(features[i % len(features)])
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        "training_seconds": round(training_seconds, 2),
+        "model_bytes": size,
+        "optimize_latency": summarize(latencies),
+        "test_mse": {target: round(metrics[target]['mse'], 3) for target in TARGETS},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=365, help="training rows (one per day)")
+    parser.add_argument("--model-type", default="random_forest",
+                        choices=["random_forest", "gradient_boosting", "linear_regression"])
+    parser.add_argument("--search", default="halving", choices=["grid", "random", "halving"])
+    parser.add_argument("--n-iter", type=int, default=None, help="candidates for random/halving search")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--requests", type=int, default=500, help="optimize() calls per layout")
+    args = parser.parse_args()
+
+    os.environ["MODELS_DIR"] = tempfile.mkdtemp()
+    data = staffing_training_data(args.rows)
+    results = {
+        layout: run_layout(args.model_type, data, multi_output, args)
+        for layout, multi_output in (("per_target", False), ("multi_output", True))
+    }
+    print(json.dumps({"rows": args.rows, "model_type": args.model_type, "search": args.search,
+                      "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: GET /scenarios/ latency while a model training job runs
+
+Measures /scenarios/ latency on an idle server, then again while a job
+submitted to /ml/train-demand-model is training (polled through
+/ml/jobs/{id}). With training in a separate, lower-priority process the two
+distributions should be close.
+
+Usage (from backend/):
+    python benchmarks/bench_training_latency.py [--rows 600] [--requests 200]
+"""
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+from common import running_server, request, login, sample_scenario, summarize
+
+def demand_training_data(rows: int):
+    rng = np.random.default_rng(42)
+    day_of_week = rng.integers(0, 7, rows)
+    return [
+        {
+            "date": f"2024-01-{(i % 28) + 1:02d}",
+            "day_of_week": int(day_of_week[i]),
+            "is_weekend": bool(day_of_week[i] >= 4),
+            "is_holiday": bool(rng.random() < 0.05),
+            "is_ramadan": bool(rng.random() < 0.08),
+            "temperature": float(rng.normal(30, 5)),
+            "precipitation": float(rng.exponential(1)),
+            "special_event": str(rng.choice(["none", "concert", "sports"])),
+            "marketing_campaign": bool(rng.random() < 0.2),
+            "menu_change": bool(rng.random() < 0.1),
+            "competitor_promotion": bool(rng.random() < 0.15),
+            "covers": int(200 + 40 * (day_of_week[i] >= 4) + rng.normal(0, 20)),
+        }
+        for i in range(rows)
+    ]
+
+def measure(base_url, token, count):
+    latencies = []
+    for _ in range(count):
+        status, _, elapsed = request(base_url, "GET", "/scenarios/?limit=50", token=token)
+        assert status == 200, status
+        latencies.append(elapsed)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=600, help="training rows")
+    parser.add_argument("--requests", type=int, default=200, help="/scenarios/ requests per phase")
+    parser.add_argument("--model-type", default="random_forest")
+    args = parser.parse_args()
+
+    with running_server() as base_url:
+        token = login(base_url)
+        for i in range(50):
+            request(base_url, "POST", "/scenarios/", body=sample_scenario(i), token=token)
+
+        idle = measure(base_url, token, args.requests)
+
+        training = {}
+        def train():
+            start = time.perf_counter()
+            status, job, submit_latency = request(base_url, "POST", f"/ml/train-demand-model?model_type={args.model_type}",
+                                                  body=demand_training_data(args.rows), token=token)
+            training.update(submit_status=status, submit_ms=round(submit_latency * 1000, 2))
+            if status != 202:
+                training.update(result=job)
+                return
+            while job["status"] in ("queued", "running"):
+                time.sleep(0.5)
+                _, job, _ = request(base_url, "GET", f"/ml/jobs/{job['id']}", token=token)
+            training.update(status=job["status"], metrics=job["metrics"], error=job["error"],
+                            seconds=round(time.perf_counter() - start, 2))
+
+        trainer = threading.Thread(target=train)
+        trainer.start()
+        time.sleep(0.5)
+        busy = []
+        while trainer.is_alive() and len(busy) < args.requests:
+            busy.extend(measure(base_url, token, 1))
+        trainer.join()
+
+        print(json.dumps({
+            "idle": summarize(idle),
+            "during_training": summarize(busy) if busy else None,
+            "training": training,
+        }, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: StaffingOptimizer training time and accuracy per search strategy
+
+Trains the staffing optimizer on a synthetic dataset with the previous
+approach (GridSearchCV over a preprocessing+model pipeline, refitting the
+ColumnTransformer for every candidate, fold and target) and with each
+TRAINING_SEARCH strategy on cached preprocessed folds. Reports wall-clock
+time, model fits and test MSE per target.
+
+Runs in-process; models are written to a temporary MODELS_DIR.
+
+Usage (from backend/):
+    python benchmarks/bench_training_search.py [--rows 365] [--model-type gradient_boosting] [--n-jobs -1] [--time-budget 0]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TARGETS = ['waiters', 'runners', 'kitchen_staff', 'other_staff']
+
+def staffing_training_data(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    covers = rng.integers(80, 600, rows)
+    style = rng.choice(["fast-casual", "casual", "premium"], rows)
+    style_factor = pd.Series(style).map({"fast-casual": 0.7, "casual": 1.0, "premium": 1.4}).to_numpy()
+    peak_factor = rng.uniform(1.1, 1.6, rows)
+    utilization = rng.uniform(0.6, 0.9, rows)
+    load = covers * peak_factor * style_factor / utilization
+    return pd.DataFrame({
+        "covers": covers,
+        "service_style": style,
+        "area_per_cover": rng.uniform(1.2, 2.5, rows),
+        "avg_check": rng.uniform(40, 250, rows),
+        "dwelling_time": rng.uniform(30, 120, rows),
+        "peak_factor": peak_factor,
+        "staff_utilization": utilization,
+        "tech_impact": rng.uniform(0, 0.2, rows),
+        "cross_training": rng.uniform(0, 0.15, rows),
+        "waiters": np.rint(load / 25 + rng.normal(0, 1, rows)),
+        "runners": np.rint(load / 60 + rng.normal(0, 0.5, rows)),
+        "kitchen_staff": np.rint(load / 30 + rng.normal(0, 1, rows)),
+        "other_staff": np.rint(load / 80 + rng.normal(0, 0.5, rows)),
+    })
+
+def legacy_grid_search(model_type: str, data: pd.DataFrame):
+    """The per-target GridSearchCV training loop the search strategies replace"""
+    from sklearn.base import clone
+    from sklearn.compose import ColumnTransformer
+    from sklearn.metrics import mean_squared_error
+    from sklearn.model_selection import GridSearchCV, train_test_split
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+    from ml_models import model_search_space
+
+    X = data.drop(TARGETS, axis=1)
+    X_train, X_test, y_train, y_test = train_test_split(X, data[TARGETS], test_size=0.2, random_state=42)
+    preprocessor = ColumnTransformer(transformers=[
+        ('num', StandardScaler(), [column for column in X.columns if column != 'service_style']),
+        ('cat', OneHotEncoder(handle_unknown='ignore'), ['service_style'])
+    ])
+    estimator, param_grid, _ = model_search_space(model_type)
+    metrics = {}
+    for target in TARGETS:
+        pipeline = Pipeline(steps=[('preprocessor', clone(preprocessor)), ('model', clone(estimator))])
+        search = GridSearchCV(pipeline, {f"model__{key}": values for key, values in param_grid.items()},
+                              cv=5, scoring='neg_mean_squared_error')
+        search.fit(X_train, y_train[target])
+        metrics[target] = {'mse': mean_squared_error(y_test[target], search.predict(X_test))}
+    return metrics
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=365, help="training rows (one per day)")
+    parser.add_argument("--model-type", default="gradient_boosting", choices=["random_forest", "gradient_boosting"])
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--n-iter", type=int, default=None, help="candidates for random/halving search")
+    parser.add_argument("--time-budget", type=float, default=0, help="seconds per search, 0 for no limit")
+    parser.add_argument("--skip-legacy", action="store_true", help="skip the GridSearchCV baseline")
+    args = parser.parse_args()
+
+    os.environ["MODELS_DIR"] = tempfile.mkdtemp()
+    from ml_models import StaffingOptimizer
+    from model_search import SEARCH_STRATEGIES
+
+    data = staffing_training_data(args.rows)
+    results = {}
+
+    if not args.skip_legacy:
+        start = time.perf_counter()
+        metrics = legacy_grid_search(args.model_type, data)
+        results["legacy_grid_search_cv"] = {
+            "seconds": round(time.perf_counter() - start, 2),
+            "test_mse": {target: round(metrics[target]['mse'], 3) for target in TARGETS},
+        }
+
+    for strategy in SEARCH_STRATEGIES:
+        options = {"strategy": strategy, "n_jobs": args.n_jobs, "time_budget": args.time_budget}
+        if args.n_iter:
+            options["n_iter"] = args.n_iter
+        start = time.perf_counter()
+        metrics = StaffingOptimizer(args.model_type).train(data, options)
+        results[strategy] = {
+            "seconds": round(time.perf_counter() - start, 2),
+            "fits": sum(metrics[target]['search']['fits'] for target in TARGETS),
+            "preprocessor_fits": metrics['training']['preprocessor_fits'],
+            "budget_exhausted": any(metrics[target]['search']['budget_exhausted'] for target in TARGETS),
+            "test_mse": {target: round(metrics[target]['mse'], 3) for target in TARGETS},
+            "best_params": {target: metrics[target]['search']['best_params'] for target in TARGETS},
+        }
+
+    print(json.dumps({"rows": args.rows, "model_type": args.model_type, "cpus": os.cpu_count(),
+                      "results": results}, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
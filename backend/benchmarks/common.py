@@ -0,0 +1,132 @@
+"""
+Helpers shared by the benchmark scripts
+
+Each benchmark starts the API with uvicorn in a subprocess against a throwaway
+SQLite database and models directory, so it can run without PostgreSQL and
+without touching the real data.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ADMIN_PASSWORD = "benchmark-admin"
+
+@contextmanager
+def running_server(port: int = 8765, env: Optional[Dict[str, str]] = None):
+    """Start the API on localhost:port and yield its base URL"""
+    with tempfile.TemporaryDirectory() as tmp:
+        server_env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            "MODELS_DIR": os.path.join(tmp, "models"),
+            "ADMIN_PASSWORD": ADMIN_PASSWORD,
+            **(env or {}),
+        }
+        subprocess.run([sys.executable, "init_db.py"], cwd=BACKEND_DIR, env=server_env, check=True,
+                       stdout=subprocess.DEVNULL)
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=server_env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    urllib.request.urlopen(base_url + "/", timeout=1)
+                    break
+                except (urllib.error.URLError, ConnectionError):
+                    time.sleep(0.1)
+            else:
+                raise RuntimeError("Server did not start")
+            yield base_url
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+def request(base_url: str, method: str, path: str, body: Any = None, token: Optional[str] = None,
+            form: Optional[Dict[str, str]] = None, headers: Optional[Dict[str, str]] = None,
+            timeout: float = 600, raw: Optional[bytes] = None):
+    """Send a request and return (status, parsed JSON body, seconds elapsed)"""
+    data = None
+    all_headers = dict(headers or {})
+    if raw is not None:
+        data = raw
+    elif form is not None:
+        data = urllib.parse.urlencode(form).encode()
+        all_headers["Content-Type"] = "application/x-www-form-urlencoded"
+    elif body is not None:
+        data = json.dumps(body).encode()
+        all_headers["Content-Type"] = "application/json"
+    if token:
+        all_headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(base_url + path, data=data, method=method, headers=all_headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            status, payload = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, payload = e.code, e.read()
+    elapsed = time.perf_counter() - start
+    try:
+        parsed = json.loads(payload) if payload else None
+    except ValueError:
+        parsed = payload
+    return status, parsed, elapsed
+
+def login(base_url: str, username: str = "admin", password: str = ADMIN_PASSWORD) -> str:
+    """Return a bearer token for the given user"""
+    status, body, _ = request(base_url, "POST", "/token", form={"username": username, "password": password})
+    if status != 200:
+        raise RuntimeError(f"Login failed ({status}): {body}")
+    return body["access_token"]
+
+def sample_scenario(index: int) -> Dict[str, Any]:
+    """A complete scenario payload for seeding benchmark databases"""
+    return {
+        "id": f"bench-{index}",
+        "name": f"Benchmark scenario {index}",
+        "brand": f"brand-{index % 5}",
+        "outlet": f"outlet-{index % 20}",
+        "fohPositions": [
+            {"id": "waiter", "title": "Waiter", "salary": 3500, "department": "FOH", "level": 2, "count": 8},
+            {"id": "runner", "title": "Runner", "salary": 3000, "department": "FOH", "level": 3, "count": 4},
+        ],
+        "bohPositions": [
+            {"id": "chef", "title": "Chef", "salary": 10000, "department": "BOH", "level": 0, "count": 1},
+            {"id": "line-cook", "title": "Line Cook", "salary": 4500, "department": "BOH", "level": 2, "count": 4},
+        ],
+        "spaceParameters": {"totalArea": 400, "fohPercentage": 65, "areaPerCover": "1.67", "externalSeating": 20},
+        "serviceParameters": {"coversPerWaiter": "20", "runnerRatio": "50", "kitchenStations": 5,
+                              "serviceStyle": "casual"},
+        "revenueDrivers": {"avgSpending": 120, "dwellingTime": 75, "tableTurnTime": 90, "peakFactor": 1.5,
+                           "dailyCovers": 250},
+        "operationalHours": {"operatingDays": 30, "dailyHours": 14, "ramadanAdjustment": False},
+        "efficiencyDrivers": {"staffUtilization": 85, "techImpact": 10, "crossTraining": 15,
+                              "seasonalityFactor": 1.0},
+    }
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max latency in milliseconds"""
+    ordered = sorted(latencies)
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+    return {
+        "n": len(ordered),
+        "p50_ms": round(percentile(50), 2),
+        "p95_ms": round(percentile(95), 2),
+        "p99_ms": round(percentile(99), 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2),
+    }
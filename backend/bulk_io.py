@@ -0,0 +1,223 @@
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from database import bulk_insert_scenarios, get_existing_scenario_ids, get_scenarios_after, session_scope
+from executors import run_in_thread
+from models import Scenario
+
+# Rows validated and inserted per transaction
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "500"))
+
+# Scenarios loaded per query while exporting
+BULK_EXPORT_BATCH_SIZE = int(os.getenv("BULK_EXPORT_BATCH_SIZE", "500"))
+
+# Row errors listed in an import report (the rest are only counted)
+BULK_IMPORT_MAX_ERRORS = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "100"))
+
+# Parquet uploads larger than this are spooled to a temporary file
+PARQUET_SPOOL_BYTES = 8 * 1024 * 1024
+
+BULK_FORMATS = ("ndjson", "parquet")
+CONFLICT_POLICIES = ("error", "skip")
+
+async def ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (line number, raw line) for each non-blank line of a streamed NDJSON body
+
+    Lines are parsed later, during chunk validation, so a malformed line is
+    reported as a row error instead of aborting the import.
+    """
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    if buffer.strip():
+        yield line_number + 1, buffer
+
+def _parquet_batches(spool, batch_size: int) -> Iterable[List[Dict[str, Any]]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet import requires the pyarrow package") from e
+    for batch in pq.ParquetFile(spool).iter_batches(batch_size=batch_size):
+        yield batch.to_pylist()
+
+async def parquet_records(chunks: AsyncIterator[bytes], batch_size: int = BULK_IMPORT_CHUNK_SIZE) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (row number, record) for each row of a streamed Parquet body
+
+    Parquet keeps its schema in a footer, so the body is spooled (to disk past
+    PARQUET_SPOOL_BYTES) and then read one record batch at a time. Rows hold
+    either the scenario fields as columns or a single "scenario" column of JSON.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=PARQUET_SPOOL_BYTES) as spool:
+        async for chunk in chunks:
+            await run_in_thread(spool.write, chunk)
+        spool.seek(0)
+
+        batches = iter(_parquet_batches(spool, batch_size))
+        row_number = 0
+        while True:
+            batch = await run_in_thread(next, batches, None)
+            if batch is None:
+                break
+            for record in batch:
+                row_number += 1
+                yield row_number, record
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+    return str(error)
+
+def validate_chunk(rows: List[Tuple[int, Any]]) -> Tuple[List[Tuple[int, Scenario]], List[Dict[str, Any]]]:
+    """
+    Parse and validate one chunk of raw rows into Scenario models
+
+    Returns ([(row, scenario)], [row errors]). Rows without an id get a new UUID.
+    """
+    valid = []
+    errors = []
+    for row, raw in rows:
+        try:
+            record = json.loads(raw) if isinstance(raw, (bytes, str)) else raw
+            if isinstance(record, dict) and isinstance(record.get("scenario"), str):
+                record = json.loads(record["scenario"])
+            scenario = Scenario.parse_obj(record)
+        except (ValueError, TypeError) as e:
+            errors.append({"row": row, "id": None, "error": _error_message(e)})
+            continue
+        if not scenario.id:
+            scenario.id = str(uuid.uuid4())
+        valid.append((row, scenario))
+    return valid, errors
+
+class ScenarioImporter:
+    """
+    Validates and inserts a stream of scenario rows chunk by chunk
+
+    Each chunk is validated in the thread pool, checked against existing IDs
+    with one query and written with bulk_insert_scenarios in its own
+    transaction, so memory stays bounded by the chunk size and a bad chunk
+    does not roll back earlier ones.
+    """
+    def __init__(self, db, user_id: int, chunk_size: int = BULK_IMPORT_CHUNK_SIZE, on_conflict: str = "error"):
+        if on_conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"on_conflict must be one of: {', '.join(CONFLICT_POLICIES)}")
+        self.db = db
+        self.user_id = user_id
+        self.chunk_size = max(1, chunk_size)
+        self.on_conflict = on_conflict
+        self.seen_ids = set()
+        self.errors: List[Dict[str, Any]] = []
+        self.stats = {
+            "received": 0,
+            "imported": 0,
+            "skipped": 0,
+            "failed": 0,
+            "chunks": 0,
+            "rowsWritten": {},
+            "validateSeconds": 0.0,
+            "insertSeconds": 0.0,
+        }
+
+    def _fail(self, row: int, scenario_id: Optional[str], message: str):
+        self.stats["failed"] += 1
+        if len(self.errors) < BULK_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "id": scenario_id, "error": message})
+
+    async def _flush(self, rows: List[Tuple[int, Any]]):
+        self.stats["chunks"] += 1
+        start = time.perf_counter()
+        valid, errors = await run_in_thread(validate_chunk, rows)
+        self.stats["validateSeconds"] += time.perf_counter() - start
+        for error in errors:
+            self._fail(error["row"], error["id"], error["error"])
+
+        # IDs repeated within the upload keep their first row
+        unique = []
+        for row, scenario in valid:
+            if scenario.id in self.seen_ids:
+                self._fail(row, scenario.id, "Duplicate scenario id in upload")
+            else:
+                self.seen_ids.add(scenario.id)
+                unique.append((row, scenario))
+
+        start = time.perf_counter()
+        existing = await get_existing_scenario_ids(self.db, [scenario.id for _, scenario in unique])
+        pending = []
+        for row, scenario in unique:
+            if scenario.id not in existing:
+                pending.append((row, scenario))
+            elif self.on_conflict == "skip":
+                self.stats["skipped"] += 1
+            else:
+                self._fail(row, scenario.id, "Scenario already exists")
+
+        try:
+            counts = await bulk_insert_scenarios(self.db, [scenario for _, scenario in pending], self.user_id)
+        except Exception as e:
+            for row, scenario in pending:
+                self._fail(row, scenario.id, f"Chunk insert failed: {e}")
+        else:
+            self.stats["imported"] += len(pending)
+            for table, count in counts.items():
+                self.stats["rowsWritten"][table] = self.stats["rowsWritten"].get(table, 0) + count
+        self.stats["insertSeconds"] += time.perf_counter() - start
+
+    async def run(self, records: AsyncIterator[Tuple[int, Any]]) -> Dict[str, Any]:
+        """
+        Import every record and return the report with throughput figures
+        """
+        start = time.perf_counter()
+        chunk = []
+        async for record in records:
+            self.stats["received"] += 1
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                await self._flush(chunk)
+                chunk = []
+        if chunk:
+            await self._flush(chunk)
+
+        elapsed = time.perf_counter() - start
+        return {
+            **self.stats,
+            "validateSeconds": round(self.stats["validateSeconds"], 4),
+            "insertSeconds": round(self.stats["insertSeconds"], 4),
+            "elapsedSeconds": round(elapsed, 4),
+            "rowsPerSecond": round(self.stats["received"] / elapsed, 1) if elapsed > 0 else None,
+            "errors": self.errors,
+            "errorsTruncated": self.stats["failed"] > len(self.errors),
+        }
+
+def _ndjson_lines(scenarios: List[Scenario]) -> bytes:
+    return "".join(scenario.json() + "\n" for scenario in scenarios).encode()
+
+async def export_scenarios_ndjson(user_id: Optional[int], batch_size: int = BULK_EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """
+    Stream a user's scenarios (positions and parameters included) as NDJSON
+
+    Scenarios are read in keyset batches on a session owned by the generator,
+    so at most one batch is held in memory and the stream does not depend on
+    the request's session staying open.
+    """
+    async with session_scope() as db:
+        after_id = None
+        while True:
+            scenarios = await get_scenarios_after(db, user_id, after_id, batch_size)
+            if not scenarios:
+                break
+            yield await run_in_thread(_ndjson_lines, scenarios)
+            after_id = scenarios[-1].id
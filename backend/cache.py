@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+import logging
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# In-process cache size (entries) and time to live (seconds)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+
+# Optional shared backend: "none", "local" (in-process stand-in) or "redis"
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "none")
+RESULT_CACHE_URL = os.getenv("RESULT_CACHE_URL", "redis://localhost:6379/0")
+
+# Request header that skips the cache for one request
+CACHE_BYPASS_HEADER = "X-Cache-Bypass"
+
+def canonical_hash(params: BaseModel) -> str:
+    """SHA-256 of a params model's canonical JSON (sorted keys, no whitespace)"""
+    payload = json.dumps(params.dict(), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def month_bucket(now: Optional[datetime] = None) -> str:
+    """Date bucket for results that depend on the current month"""
+    return (now or datetime.now()).strftime("%Y-%m")
+
+class LocalSharedBackend:
+    """
+    In-process stand-in for a shared cache server (same interface as RedisBackend)
+    """
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+
+class RedisBackend:
+    """
+    Shared cache on Redis (requires the optional redis package)
+    """
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RESULT_CACHE_BACKEND=redis requires the redis package") from e
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(key)
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str, ttl: float):
+        self._client.set(key, value, ex=max(1, int(ttl)))
+
+def create_shared_backend(name: str = RESULT_CACHE_BACKEND, url: str = RESULT_CACHE_URL):
+    """Shared backend selected by RESULT_CACHE_BACKEND, or None"""
+    if name == "local":
+        return LocalSharedBackend()
+    if name == "redis":
+        return RedisBackend(url)
+    return None
+
+class ResultCache:
+    """
+    Content-addressed cache for deterministic calculation results
+
+    Keys are (kind, canonical params hash, date bucket). Entries live in an
+    in-process LRU with a TTL and, when configured, in a shared backend as JSON.
+    """
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL, shared=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self._entries: "OrderedDict[str, Tuple[float, BaseModel]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "local_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "bypasses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    @staticmethod
+    def make_key(kind: str, params: BaseModel, bucket: Optional[str] = None) -> str:
+        return f"calc:{kind}:{bucket or '-'}:{canonical_hash(params)}"
+
+    def _get_local(self, key: str) -> Optional[BaseModel]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _set_local(self, key: str, value: BaseModel):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get_or_compute(
+        self,
+        kind: str,
+        func: Callable[[BaseModel], BaseModel],
+        params: BaseModel,
+        result_model: Type[BaseModel],
+        bucket: Optional[str] = None,
+        bypass: bool = False
+    ) -> Tuple[BaseModel, bool]:
+        """
+        Return (result, hit) for func(params), computing and storing on a miss
+
+        With bypass the result is computed and stored but the cache is not read.
+        """
+        key = self.make_key(kind, params, bucket)
+
+        if bypass:
+            with self._lock:
+                self._stats["bypasses"] += 1
+        else:
+            value = self._get_local(key)
+            if value is not None:
+                with self._lock:
+                    self._stats["hits"] += 1
+                    self._stats["local_hits"] += 1
+                return value, True
+
+            if self.shared is not None:
+                try:
+                    raw = self.shared.get(key)
+                except Exception as e:
+                    logger.warning(f"Shared cache read failed: {e}")
+                    raw = None
+                if raw is not None:
+                    value = result_model.parse_raw(raw)
+                    self._set_local(key, value)
+                    with self._lock:
+                        self._stats["hits"] += 1
+                        self._stats["shared_hits"] += 1
+                    return value, True
+
+            with self._lock:
+                self._stats["misses"] += 1
+
+        value = func(params)
+        self._set_local(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value.json(), self.ttl)
+            except Exception as e:
+                logger.warning(f"Shared cache write failed: {e}")
+        return value, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "shared_backend": type(self.shared).__name__ if self.shared is not None else None,
+            }
+
+# Shared cache used by the API
+result_cache = ResultCache(shared=create_shared_backend())
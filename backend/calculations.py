@@ -2,24 +2,56 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
+import calendar
 import math
+import os
 import random
+import time
 from models import (
     Scenario,
     StaffingParams,
+    StaffingSweepParams,
     RevenueParams,
+    RevenuePortfolioParams,
     PLParams,
     PeakHourParams,
     OptimizationParams,
     WhatIfParams,
+    SensitivityParams,
     StaffingResult,
+    StaffingSweepResult,
     RevenueResult,
+    RevenuePortfolioResult,
     PLResult,
     PeakHourResult,
     ComparisonResult,
     OptimizationResult,
-    WhatIfResult
+    WhatIfResult,
+    SensitivityResult,
+    BatchItemResult,
+    BatchResult
 )
+from pydantic import ValidationError
+from cache import canonical_hash
+
+# Monthly salaries used for staffing labor cost estimates
+STAFFING_SALARIES = {
+    "waiters": 3500,
+    "runners": 3000,
+    "hosts": 4000,
+    "cashiers": 3500,
+    "managers": 8000,
+    "chefs": 10000,
+    "sous_chefs": 7000,
+    "line_cooks": 4500,
+    "prep_cooks": 3500,
+    "kitchen_helpers": 3000,
+    "dishwashers": 2800
+}
+
+# Positions with a fixed headcount regardless of outlet size
+FIXED_FOH_STAFF = {"hosts": 2, "cashiers": 2, "managers": 2}
+FIXED_BOH_STAFF = {"chefs": 1, "sous_chefs": 1, "kitchen_helpers": 2, "dishwashers": 2}
 
 # Staffing calculation functions
 def calculate_staffing_requirements(params: StaffingParams) -> StaffingResult:
@@ -52,9 +84,9 @@ def calculate_staffing_requirements(params: StaffingParams) -> StaffingResult:
     # Calculate FOH staff
     waiters_required = math.ceil(total_capacity / covers_per_waiter / efficiency_factor)
     runners_required = math.ceil(waiters_required * runner_ratio)
-    hosts_required = 2
-    cashiers_required = 2
-    managers_required = 2
+    hosts_required = FIXED_FOH_STAFF["hosts"]
+    cashiers_required = FIXED_FOH_STAFF["cashiers"]
+    managers_required = FIXED_FOH_STAFF["managers"]
     
     # Calculate BOH staff based on kitchen stations
     kitchen_stations = service_params.kitchenStations
@@ -64,12 +96,12 @@ def calculate_staffing_requirements(params: StaffingParams) -> StaffingResult:
     elif service_params.serviceStyle == "casual":
         service_style_factor = 1.5
     
-    chefs_required = 1
-    sous_chefs_required = 1
+    chefs_required = FIXED_BOH_STAFF["chefs"]
+    sous_chefs_required = FIXED_BOH_STAFF["sous_chefs"]
     line_cooks_required = kitchen_stations
     prep_cooks_required = math.ceil(kitchen_stations * 0.75)
-    kitchen_helpers_required = 2
-    dishwashers_required = 2
+    kitchen_helpers_required = FIXED_BOH_STAFF["kitchen_helpers"]
+    dishwashers_required = FIXED_BOH_STAFF["dishwashers"]
     
     # Calculate total staff and labor cost
     foh_staff = {
@@ -89,20 +121,14 @@ def calculate_staffing_requirements(params: StaffingParams) -> StaffingResult:
         "dishwashers": dishwashers_required
     }
     
+    return _build_staffing_result(foh_staff, boh_staff, service_params, efficiency_params)
+
+def _build_staffing_result(foh_staff, boh_staff, service_params, efficiency_params) -> StaffingResult:
+    """
+    Labor cost, staffing structure and recommendations for computed headcounts
+    """
     # Calculate labor cost (using sample salaries)
-    salaries = {
-        "waiters": 3500,
-        "runners": 3000,
-        "hosts": 4000,
-        "cashiers": 3500,
-        "managers": 8000,
-        "chefs": 10000,
-        "sous_chefs": 7000,
-        "line_cooks": 4500,
-        "prep_cooks": 3500,
-        "kitchen_helpers": 3000,
-        "dishwashers": 2800
-    }
+    salaries = STAFFING_SALARIES
     
     foh_labor_cost = sum(foh_staff[position] * salaries[position] for position in foh_staff)
     boh_labor_cost = sum(boh_staff[position] * salaries[position] for position in boh_staff)
@@ -154,131 +180,327 @@ def calculate_staffing_requirements(params: StaffingParams) -> StaffingResult:
         recommendations=recommendations
     )
 
-# Revenue projection functions
-def generate_revenue_projections(params: RevenueParams) -> RevenueResult:
+# Vectorized staffing engine
+# Flattened StaffingParams fields used by the staffing calculation
+STAFFING_SWEEP_FIELDS = {
+    "totalArea": ("spaceParameters", float),
+    "fohPercentage": ("spaceParameters", float),
+    "areaPerCover": ("spaceParameters", float),
+    "externalSeating": ("spaceParameters", np.int64),
+    "coversPerWaiter": ("serviceParameters", np.int64),
+    "runnerRatio": ("serviceParameters", np.int64),
+    "kitchenStations": ("serviceParameters", np.int64),
+    "staffUtilization": ("efficiencyDrivers", float),
+    "techImpact": ("efficiencyDrivers", float),
+    "crossTraining": ("efficiencyDrivers", float),
+    "seasonalityFactor": ("efficiencyDrivers", float),
+}
+
+# Upper bound on parameter sets evaluated in one sweep
+MAX_STAFFING_SWEEP_SIZE = 200000
+
+def _staffing_sweep_values(field: str, values) -> np.ndarray:
     """
-    Generate revenue projections based on input parameters
+    One sweep field's values in its dtype, rejecting fractional values for
+    integer fields instead of truncating them
     """
-    # Extract parameters
-    projection_period = params.projectionPeriod
-    projection_length = params.projectionLength
-    avg_check = params.avgCheck
-    daily_covers = params.dailyCovers
-    food_bev_ratio = params.foodBevRatio / 100
-    seasonality_factor = params.seasonalityFactor
-    growth_rate = params.growthRate / 100
-    apply_ramadan = params.applyRamadan
-    
-    # Generate time periods
-    now = datetime.now()
-    periods = []
-    
-    if projection_period == "monthly":
-        for i in range(projection_length):
-            month = (now.month + i - 1) % 12 + 1
-            year = now.year + (now.month + i - 1) // 12
-            periods.append(f"{month}/{year}")
-    elif projection_period == "quarterly":
-        for i in range(projection_length):
-            quarter = (now.month + i * 3 - 1) // 3 % 4 + 1
-            year = now.year + (now.month + i * 3 - 1) // 12
-            periods.append(f"Q{quarter}/{year}")
-    else:  # yearly
-        for i in range(projection_length):
-            periods.append(str(now.year + i))
-    
-    # Define seasonality factors by month (1.0 = baseline)
-    monthly_seasonality = {
-        1: 0.9,   # Jan
-        2: 0.95,  # Feb
-        3: 1.0,   # Mar
-        4: 1.05,  # Apr
-        5: 1.1,   # May
-        6: 0.9,   # Jun
-        7: 0.85,  # Jul
-        8: 0.9,   # Aug
-        9: 1.0,   # Sep
-        10: 1.1,  # Oct
-        11: 1.15, # Nov
-        12: 1.2,  # Dec
+    dtype = STAFFING_SWEEP_FIELDS[field][1]
+    values = np.asarray(values)
+    if dtype is not float:
+        if values.dtype.kind == "f":
+            fractional = bool(np.any(values != np.trunc(values)))
+        elif values.dtype.kind == "O":
+            fractional = any(isinstance(v, (float, np.floating)) and not float(v).is_integer() for v in values.ravel())
+        else:
+            fractional = False
+        if fractional:
+            raise ValueError(f"{field} values must be whole numbers")
+    return values.astype(dtype)
+
+def staffing_sweep_grid(base: StaffingParams, grid: Dict[str, List[Any]]) -> Dict[str, np.ndarray]:
+    """
+    Expand a base StaffingParams and per-field value lists into the cartesian
+    product of parameter sets, as one array per flattened field
+    """
+    unknown = [field for field in grid if field not in STAFFING_SWEEP_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown sweep fields: {', '.join(unknown)}")
+    
+    axes = {field: _staffing_sweep_values(field, values) for field, values in grid.items()}
+    size = int(np.prod([len(values) for values in axes.values()])) if axes else 1
+    if size > MAX_STAFFING_SWEEP_SIZE:
+        raise ValueError(f"Sweep of {size} parameter sets exceeds the limit of {MAX_STAFFING_SWEEP_SIZE}")
+    
+    mesh = dict(zip(axes, (values.ravel() for values in np.meshgrid(*axes.values(), indexing="ij")))) if axes else {}
+    columns = {}
+    for field, (group, dtype) in STAFFING_SWEEP_FIELDS.items():
+        if field in mesh:
+            columns[field] = mesh[field]
+        else:
+            columns[field] = np.full(size, getattr(getattr(base, group), field), dtype=dtype)
+    return columns
+
+def calculate_staffing_sweep(parameters) -> Dict[str, Any]:
+    """
+    Calculate staffing requirements for many parameter sets in one pass
+
+    Parameters:
+    - parameters: DataFrame or mapping of flattened StaffingParams fields
+      (see STAFFING_SWEEP_FIELDS) to equal-length arrays
+
+    Returns:
+    - Dictionary of columnar arrays (fohStaff/bohStaff by position, totalStaff,
+      fohLaborCost, bohLaborCost, laborCost), row i matching parameter set i and
+      calculate_staffing_requirements exactly
+    """
+    missing = [field for field in STAFFING_SWEEP_FIELDS if field not in parameters]
+    if missing:
+        raise ValueError(f"Missing sweep fields: {', '.join(missing)}")
+    
+    # String fields (areaPerCover, coversPerWaiter, runnerRatio) parse as in the scalar path
+    p = {field: _staffing_sweep_values(field, parameters[field]) for field in STAFFING_SWEEP_FIELDS}
+    size = len(p["totalArea"])
+    if any(len(values) != size for values in p.values()):
+        raise ValueError("All sweep fields must have the same length")
+    if size > MAX_STAFFING_SWEEP_SIZE:
+        raise ValueError(f"Sweep of {size} parameter sets exceeds the limit of {MAX_STAFFING_SWEEP_SIZE}")
+    
+    # Same operation order as calculate_staffing_requirements so results match bit for bit
+    foh_area = p["totalArea"] * (p["fohPercentage"] / 100)
+    foh_capacity = np.floor(foh_area / p["areaPerCover"])
+    total_capacity = foh_capacity + p["externalSeating"]
+    
+    runner_ratio = p["runnerRatio"] / 100
+    efficiency_factor = (
+        (p["staffUtilization"] / 100) *
+        (1 - p["techImpact"] / 100) *
+        (1 - p["crossTraining"] / 100) *
+        p["seasonalityFactor"]
+    )
+    
+    invalid = (p["areaPerCover"] == 0) | (p["coversPerWaiter"] == 0) | (efficiency_factor == 0)
+    if invalid.any():
+        raise ValueError(f"Division by zero for parameter sets {np.flatnonzero(invalid)[:10].tolist()}")
+    
+    waiters = np.ceil(total_capacity / p["coversPerWaiter"] / efficiency_factor).astype(np.int64)
+    runners = np.ceil(waiters * runner_ratio).astype(np.int64)
+    line_cooks = p["kitchenStations"]
+    prep_cooks = np.ceil(p["kitchenStations"] * 0.75).astype(np.int64)
+    
+    foh_staff = {
+        "waiters": waiters,
+        "runners": runners,
+        **{position: np.full(size, count, dtype=np.int64) for position, count in FIXED_FOH_STAFF.items()}
+    }
+    boh_staff = {
+        "chefs": np.full(size, FIXED_BOH_STAFF["chefs"], dtype=np.int64),
+        "sous_chefs": np.full(size, FIXED_BOH_STAFF["sous_chefs"], dtype=np.int64),
+        "line_cooks": line_cooks,
+        "prep_cooks": prep_cooks,
+        "kitchen_helpers": np.full(size, FIXED_BOH_STAFF["kitchen_helpers"], dtype=np.int64),
+        "dishwashers": np.full(size, FIXED_BOH_STAFF["dishwashers"], dtype=np.int64),
     }
     
-    # Ramadan month (for this example, assume it's in month 9 - September)
-    ramadan_month = 9
+    foh_labor_cost = sum(foh_staff[position] * STAFFING_SALARIES[position] for position in foh_staff)
+    boh_labor_cost = sum(boh_staff[position] * STAFFING_SALARIES[position] for position in boh_staff)
+    
+    return {
+        "count": size,
+        "fohStaff": foh_staff,
+        "bohStaff": boh_staff,
+        "totalStaff": sum(foh_staff.values()) + sum(boh_staff.values()),
+        "fohLaborCost": foh_labor_cost,
+        "bohLaborCost": boh_labor_cost,
+        "laborCost": (foh_labor_cost + boh_labor_cost).astype(float),
+    }
+
+def calculate_staffing_requirements_many(params_list: List[StaffingParams]) -> List[StaffingResult]:
+    """
+    Calculate staffing requirements for many parameter sets
+
+    Headcounts come from one calculate_staffing_sweep pass; the per-row results
+    equal calculate_staffing_requirements for each parameter set.
+    """
+    columns = {
+        field: [getattr(getattr(params, group), field) for params in params_list]
+        for field, (group, _) in STAFFING_SWEEP_FIELDS.items()
+    }
+    sweep = calculate_staffing_sweep(columns)
+    
+    results = []
+    for i, params in enumerate(params_list):
+        foh_staff = {position: int(counts[i]) for position, counts in sweep["fohStaff"].items()}
+        boh_staff = {position: int(counts[i]) for position, counts in sweep["bohStaff"].items()}
+        results.append(_build_staffing_result(foh_staff, boh_staff, params.serviceParameters, params.efficiencyDrivers))
+    return results
+
+def run_staffing_sweep(params: StaffingSweepParams) -> StaffingSweepResult:
+    """
+    Sweep staffing requirements over the cartesian product of params.grid
+    """
+    columns = staffing_sweep_grid(params.base, params.grid)
+    result = calculate_staffing_sweep(columns)
+    
+    # Columns are built from validated arrays; skip per-element validation
+    return StaffingSweepResult.construct(
+        count=result["count"],
+        parameters={field: columns[field].tolist() for field in params.grid},
+        fohStaff={position: counts.tolist() for position, counts in result["fohStaff"].items()},
+        bohStaff={position: counts.tolist() for position, counts in result["bohStaff"].items()},
+        totalStaff=result["totalStaff"].tolist(),
+        fohLaborCost=result["fohLaborCost"].astype(float).tolist(),
+        bohLaborCost=result["bohLaborCost"].astype(float).tolist(),
+        laborCost=result["laborCost"].tolist()
+    )
+
+# Revenue projection functions
+
+# Seasonality factors by month (1.0 = baseline)
+MONTHLY_SEASONALITY = np.array([
+    0.9,   # Jan
+    0.95,  # Feb
+    1.0,   # Mar
+    1.05,  # Apr
+    1.1,   # May
+    0.9,   # Jun
+    0.85,  # Jul
+    0.9,   # Aug
+    1.0,   # Sep
+    1.1,   # Oct
+    1.15,  # Nov
+    1.2,   # Dec
+])
+
+# Ramadan month (for this example, assume it's in month 9 - September) and its
+# revenue factor for each projection period
+RAMADAN_MONTH = 9
+RAMADAN_FACTORS = {"monthly": 0.7, "quarterly": 0.9, "yearly": 0.95}
+
+# Periods per year, used to spread the annual growth rate
+PERIODS_PER_YEAR = {"monthly": 12, "quarterly": 4, "yearly": 1}
+
+MAX_REVENUE_PROJECTION_CELLS = 1000000
+
+def revenue_calendar(projection_period: str, projection_length: int, start: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Period labels, day counts, seasonality and Ramadan flags for a projection
+
+    Monthly periods are calendar months from the start month, quarterly periods
+    are consecutive three-month blocks and yearly periods are calendar years.
+    Day counts come from the calendar, so leap years and quarter lengths are exact.
+    """
+    period = getattr(projection_period, "value", projection_period)
+    if period not in PERIODS_PER_YEAR:
+        raise ValueError(f"Unknown projection period: {period}")
+    if projection_length < 1:
+        raise ValueError("projectionLength must be at least 1")
+    
+    now = start or datetime.now()
+    index = np.arange(projection_length)
+    
+    if period == "yearly":
+        years = now.year + index
+        return {
+            "periods": [str(year) for year in years],
+            "days": np.array([366 if calendar.isleap(int(year)) else 365 for year in years], dtype=float),
+            "seasonality": np.ones(projection_length),  # No seasonality for yearly
+            "ramadan": np.ones(projection_length, dtype=bool),
+        }
+    
+    # Month offsets from the start month: one per monthly period, three per quarter
+    months_per_period = 1 if period == "monthly" else 3
+    offsets = (now.month - 1) + index[:, None] * months_per_period + np.arange(months_per_period)[None, :]
+    months = offsets % 12 + 1
+    years = now.year + offsets // 12
+    
+    month_days = np.array([
+        [calendar.monthrange(int(year), int(month))[1] for year, month in zip(year_row, month_row)]
+        for year_row, month_row in zip(years, months)
+    ], dtype=float)
+    
+    if period == "monthly":
+        labels = [f"{month}/{year}" for month, year in zip(months[:, 0], years[:, 0])]
+    else:
+        labels = [f"Q{(month - 1) // 3 + 1}/{year}" for month, year in zip(months[:, 0], years[:, 0])]
+    
+    # Average seasonality across the months in each period
+    seasonality = MONTHLY_SEASONALITY[months - 1].sum(axis=1) / months_per_period
+    
+    return {
+        "periods": labels,
+        "days": month_days.sum(axis=1),
+        "seasonality": seasonality,
+        "ramadan": (months == RAMADAN_MONTH).any(axis=1),
+    }
+
+def revenue_projection_matrix(params_list: List[RevenueParams], start: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Project revenue for many outlets sharing one projection period and length
+
+    Returns the period labels and (periods x outlets) arrays of rounded food,
+    beverage and total revenue.
+    """
+    if not params_list:
+        raise ValueError("At least one outlet is required")
+    layouts = {(str(getattr(p.projectionPeriod, "value", p.projectionPeriod)), p.projectionLength) for p in params_list}
+    if len(layouts) > 1:
+        raise ValueError("All outlets must share projectionPeriod and projectionLength")
+    period, length = layouts.pop()
+    if length * len(params_list) > MAX_REVENUE_PROJECTION_CELLS:
+        raise ValueError(f"Projection of {length * len(params_list)} cells exceeds the limit of {MAX_REVENUE_PROJECTION_CELLS}")
+    
+    periods = revenue_calendar(period, length, start)
+    
+    # Outlet factors as row vectors, period factors as column vectors
+    avg_check = np.array([p.avgCheck for p in params_list], dtype=float)
+    daily_covers = np.array([p.dailyCovers for p in params_list], dtype=float)
+    food_bev_ratio = np.array([p.foodBevRatio for p in params_list], dtype=float) / 100
+    seasonality_factor = np.array([p.seasonalityFactor for p in params_list], dtype=float)
+    growth_rate = np.array([p.growthRate for p in params_list], dtype=float) / 100
+    apply_ramadan = np.array([p.applyRamadan for p in params_list], dtype=bool)
     
-    # Calculate base daily revenue
     base_daily_revenue = avg_check * daily_covers
     base_food_revenue = base_daily_revenue * food_bev_ratio
     base_bev_revenue = base_daily_revenue * (1 - food_bev_ratio)
     
-    # Calculate projections
-    food_projections = []
-    bev_projections = []
-    total_projections = []
-    
-    for i, period in enumerate(periods):
-        # Apply growth rate
-        if projection_period == "monthly":
-            growth_factor = (1 + growth_rate) ** (i / 12)
-            month = (now.month + i - 1) % 12 + 1
-            seasonal_factor = monthly_seasonality[month] * seasonality_factor
-            
-            # Apply Ramadan adjustment if needed
-            if apply_ramadan and month == ramadan_month:
-                seasonal_factor *= 0.7
-                
-            # Days in month
-            if month in [4, 6, 9, 11]:
-                days = 30
-            elif month == 2:
-                if (now.year + (now.month + i - 1) // 12) % 4 == 0:
-                    days = 29
-                else:
-                    days = 28
-            else:
-                days = 31
-                
-        elif projection_period == "quarterly":
-            growth_factor = (1 + growth_rate) ** (i / 4)
-            quarter_start_month = (now.month + i * 3 - 1) % 12 + 1
-            
-            # Average seasonality for the quarter
-            seasonal_factor = 0
-            for j in range(3):
-                month = (quarter_start_month + j - 1) % 12 + 1
-                seasonal_factor += monthly_seasonality[month]
-            seasonal_factor = (seasonal_factor / 3) * seasonality_factor
-            
-            # Apply Ramadan adjustment if needed
-            if apply_ramadan and ramadan_month in range(quarter_start_month, quarter_start_month + 3):
-                seasonal_factor *= 0.9
-                
-            days = 90  # Approximate days per quarter
-            
-        else:  # yearly
-            growth_factor = (1 + growth_rate) ** i
-            seasonal_factor = 1.0 * seasonality_factor  # No seasonality for yearly
-            
-            # Apply Ramadan adjustment if needed
-            if apply_ramadan:
-                seasonal_factor *= 0.95  # Less impact on yearly basis
-                
-            days = 365  # Days per year
-        
-        # Calculate revenue for this period
-        food_revenue = base_food_revenue * days * seasonal_factor * growth_factor
-        bev_revenue = base_bev_revenue * days * seasonal_factor * growth_factor
-        total_revenue = food_revenue + bev_revenue
-        
-        food_projections.append(round(food_revenue))
-        bev_projections.append(round(bev_revenue))
-        total_projections.append(round(total_revenue))
+    index = np.arange(length)[:, None]
+    growth_factor = (1 + growth_rate[None, :]) ** (index / PERIODS_PER_YEAR[period])
+    seasonal_factor = periods["seasonality"][:, None] * seasonality_factor[None, :]
+    ramadan = periods["ramadan"][:, None] & apply_ramadan[None, :]
+    seasonal_factor = np.where(ramadan, seasonal_factor * RAMADAN_FACTORS[period], seasonal_factor)
+    days = periods["days"][:, None]
+    
+    food_revenue = base_food_revenue[None, :] * days * seasonal_factor * growth_factor
+    bev_revenue = base_bev_revenue[None, :] * days * seasonal_factor * growth_factor
+    total_revenue = food_revenue + bev_revenue
+    
+    return {
+        "periods": periods["periods"],
+        "days": periods["days"],
+        "food": np.rint(food_revenue),
+        "beverage": np.rint(bev_revenue),
+        "total": np.rint(total_revenue),
+    }
+
+def _revenue_result(params: RevenueParams, periods: List[str], food: np.ndarray, beverage: np.ndarray, total: np.ndarray) -> RevenueResult:
+    """Summary metrics, insights and opportunities for one outlet's projections"""
+    projection_period = getattr(params.projectionPeriod, "value", params.projectionPeriod)
+    projection_length = params.projectionLength
+    avg_check = params.avgCheck
+    daily_covers = params.dailyCovers
+    growth_rate = params.growthRate / 100
+    
+    food_projections = [int(value) for value in food]
+    bev_projections = [int(value) for value in beverage]
+    total_projections = [int(value) for value in total]
     
     # Calculate summary metrics
     total_revenue = sum(total_projections)
     total_food = sum(food_projections)
     total_bev = sum(bev_projections)
     avg_monthly_revenue = total_revenue / len(periods)
+    peak_index = int(np.argmax(total))
+    lowest_index = int(np.argmin(total))
     
     # Calculate year-over-year growth if applicable
     yoy_growth = None
@@ -293,17 +515,17 @@ def generate_revenue_projections(params: RevenueParams) -> RevenueResult:
         "totalBeverage": total_bev,
         "averageMonthlyRevenue": avg_monthly_revenue,
         "yoyGrowth": yoy_growth,
-        "peakRevenue": max(total_projections),
-        "peakPeriod": periods[total_projections.index(max(total_projections))],
-        "lowestRevenue": min(total_projections),
-        "lowestPeriod": periods[total_projections.index(min(total_projections))],
+        "peakRevenue": total_projections[peak_index],
+        "peakPeriod": periods[peak_index],
+        "lowestRevenue": total_projections[lowest_index],
+        "lowestPeriod": periods[lowest_index],
     }
     
     # Generate insights
     insights = [
         f"{'Projected growth' if growth_rate > 0 else 'Projected decline'} of {growth_rate * 100:.1f}% annually will result in total revenue of SAR {total_revenue / 1000000:.2f}M over {projection_length} {projection_period}s",
         f"Food revenue accounts for {(total_food / total_revenue) * 100:.1f}% of total revenue",
-        f"Seasonal variations result in peak revenue during {periods[total_projections.index(max(total_projections))]}",
+        f"Seasonal variations result in peak revenue during {periods[peak_index]}",
         f"Average daily revenue: SAR {round(avg_check * daily_covers):,}",
         f"Projected annual revenue: SAR {(avg_check * daily_covers * 365) / 1000000:.2f}M (without seasonality)"
     ]
@@ -312,7 +534,7 @@ def generate_revenue_projections(params: RevenueParams) -> RevenueResult:
     optimization_opportunities = [
         f"Increase average check by 10% to achieve SAR {(avg_check * 1.1 * daily_covers * 365) / 1000000:.2f}M annual revenue",
         f"Focus on beverage sales to improve overall margins",
-        f"Implement seasonal promotions to boost revenue during {periods[total_projections.index(min(total_projections))]}",
+        f"Implement seasonal promotions to boost revenue during {periods[lowest_index]}",
         f"Consider special Ramadan offerings to mitigate the 30% reduction in revenue",
         f"Develop strategies to increase daily covers by 15% to achieve SAR {(avg_check * daily_covers * 1.15 * 365) / 1000000:.2f}M annual revenue"
     ]
@@ -329,6 +551,53 @@ def generate_revenue_projections(params: RevenueParams) -> RevenueResult:
         optimizationOpportunities=optimization_opportunities
     )
 
+def generate_revenue_projections_many(params_list: List[RevenueParams], start: Optional[datetime] = None) -> List[RevenueResult]:
+    """
+    Generate revenue projections for many outlets, projecting outlets that share
+    a period and length in one array pass
+    """
+    layouts: Dict[tuple, List[int]] = {}
+    for i, params in enumerate(params_list):
+        layouts.setdefault((getattr(params.projectionPeriod, "value", params.projectionPeriod), params.projectionLength), []).append(i)
+    
+    results: List[Optional[RevenueResult]] = [None] * len(params_list)
+    for indexes in layouts.values():
+        group = [params_list[i] for i in indexes]
+        matrix = revenue_projection_matrix(group, start)
+        for column, i in enumerate(indexes):
+            results[i] = _revenue_result(
+                params_list[i], matrix["periods"],
+                matrix["food"][:, column], matrix["beverage"][:, column], matrix["total"][:, column]
+            )
+    return results
+
+def generate_revenue_projections(params: RevenueParams) -> RevenueResult:
+    """
+    Generate revenue projections based on input parameters
+    """
+    return generate_revenue_projections_many([params])[0]
+
+def run_revenue_portfolio(params: RevenuePortfolioParams) -> RevenuePortfolioResult:
+    """
+    Period-by-outlet revenue matrix for a portfolio of outlets
+    """
+    matrix = revenue_projection_matrix(params.outlets)
+    labels = [
+        params_item.outlet or params_item.brand or str(i) for i, params_item in enumerate(params.outlets)
+    ]
+    
+    # Matrices are built from validated arrays; skip per-element validation
+    return RevenuePortfolioResult.construct(
+        periods=matrix["periods"],
+        outlets=labels,
+        days=matrix["days"].astype(int).tolist(),
+        food=matrix["food"].tolist(),
+        beverage=matrix["beverage"].tolist(),
+        total=matrix["total"].tolist(),
+        periodTotals=matrix["total"].sum(axis=1).tolist(),
+        outletTotals=matrix["total"].sum(axis=0).tolist()
+    )
+
 # P&L calculation functions
 def calculate_profit_loss(params: PLParams) -> PLResult:
     """
@@ -424,6 +693,9 @@ def calculate_profit_loss(params: PLParams) -> PLResult:
     months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
     current_month = datetime.now().month - 1  # 0-indexed
     
+    # Variation is seeded from the parameters so equal inputs give equal output
+    rng = random.Random(canonical_hash(params))
+    
     # Generate 12 months of data
     historical_data = {
         "labels": [],
@@ -440,7 +712,7 @@ def calculate_profit_loss(params: PLParams) -> PLResult:
         
         # Add some variation to the data
         seasonal_factor = 1 + (math.sin((i / 11) * math.pi * 2) * 0.2)
-        random_factor = 0.9 + (random.random() * 0.2)
+        random_factor = 0.9 + (rng.random() * 0.2)
         monthly_factor = seasonal_factor * random_factor
         
         month_revenue = monthly_revenue * monthly_factor
@@ -481,134 +753,137 @@ def calculate_profit_loss(params: PLParams) -> PLResult:
     )
 
 # Peak hour analysis functions
-def analyze_peak_hours(params: PeakHourParams) -> PeakHourResult:
+PEAK_HOUR_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+WEEKDAY_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday"]
+WEEKEND_DAYS = ["Friday", "Saturday", "Sunday"]
+
+# Supported slot lengths in minutes
+PEAK_HOUR_SLOT_MINUTES = (15, 30, 60)
+
+def _peak_hour_seed(params: PeakHourParams) -> int:
+    """Explicit seed, or one derived from the parameters so results are reproducible"""
+    if params.seed is not None:
+        return params.seed
+    return int(canonical_hash(params)[:16], 16)
+
+def _peak_hour_slots(start_hour: int, end_hour: int, slot_minutes: int):
+    """Slot start times in minutes and their labels ("8" for hourly slots, "8:15" otherwise)"""
+    if slot_minutes not in PEAK_HOUR_SLOT_MINUTES:
+        raise ValueError(f"slotMinutes must be one of {PEAK_HOUR_SLOT_MINUTES}")
+    if not 0 <= start_hour < end_hour <= 24:
+        raise ValueError("Hours must satisfy 0 <= startHour < endHour <= 24")
+    minutes = np.arange(start_hour * 60, end_hour * 60, slot_minutes)
+    if slot_minutes == 60:
+        labels = [str(m // 60) for m in minutes]
+    else:
+        labels = [f"{m // 60}:{m % 60:02d}" for m in minutes]
+    return minutes, labels
+
+def peak_hour_grids(params_list: List[PeakHourParams], minutes: np.ndarray) -> Dict[str, np.ndarray]:
     """
-    Analyze peak hour staffing requirements
+    Demand grids for many outlets sharing one slot layout
+
+    Returns arrays of shape (outlets, days, slots): value, adjustedValue, foh, boh.
     """
-    # Extract parameters
-    selected_day = params.selectedDay
-    selected_staff_type = params.selectedStaffType
-    peak_factor = params.peakFactor
-    apply_ramadan = params.applyRamadan
-    
-    # Generate sample data for the heatmap
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    hours = list(range(8, 24))  # 8 AM to 11 PM
-    
-    heatmap_data = {}
-    
-    for day in days:
-        heatmap_data[day] = {}
-        for hour in hours:
-            # Generate different patterns for different days
-            base_value = 0.0
-            
-            # Weekday pattern
-            if day in ["Monday", "Tuesday", "Wednesday", "Thursday"]:
-                if hour >= 12 and hour <= 14:  # Lunch peak
-                    base_value = 0.8
-                elif hour >= 18 and hour <= 21:  # Dinner peak
-                    base_value = 0.9
-                else:
-                    base_value = 0.4
-            # Weekend pattern
-            else:
-                if hour >= 11 and hour <= 15:  # Extended lunch peak
-                    base_value = 0.85
-                elif hour >= 18 and hour <= 22:  # Extended dinner peak
-                    base_value = 1.0
-                else:
-                    base_value = 0.5
-            
-            # Add some randomness
-            random_factor = 0.1
-            value = min(1, max(0, base_value + (random.random() * random_factor * 2 - random_factor)))
-            
-            # Apply peak factor and Ramadan adjustment
-            adjusted_value = value * peak_factor
-            if apply_ramadan:
-                # During Ramadan, shift peak hours and reduce overall capacity
-                if hour >= 19 and hour <= 23:  # Shifted dinner peak during Ramadan
-                    adjusted_value = value * peak_factor * 0.9
-                else:
-                    adjusted_value = value * peak_factor * 0.6
-            
-            adjusted_value = min(1, adjusted_value)
-            
-            heatmap_data[day][hour] = {
-                "value": value,
-                "adjustedValue": adjusted_value,
-                "foh": round(adjusted_value * 15),  # FOH staff needed
-                "boh": round(adjusted_value * 10),  # BOH staff needed
+    hours = minutes // 60
+    weekday = np.array([day in WEEKDAY_DAYS for day in PEAK_HOUR_DAYS])[:, None]
+    
+    # Base demand by day type and hour of the slot
+    weekday_base = np.where((hours >= 12) & (hours <= 14), 0.8, np.where((hours >= 18) & (hours <= 21), 0.9, 0.4))
+    weekend_base = np.where((hours >= 11) & (hours <= 15), 0.85, np.where((hours >= 18) & (hours <= 22), 1.0, 0.5))
+    base = np.where(weekday, weekday_base[None, :], weekend_base[None, :])
+    
+    # Seeded noise of +/-0.1 per cell, one generator per outlet
+    random_factor = 0.1
+    noise = np.stack([
+        np.random.default_rng(_peak_hour_seed(params)).random(base.shape) for params in params_list
+    ])
+    value = np.clip(base[None, :, :] + (noise * random_factor * 2 - random_factor), 0, 1)
+    
+    # Apply peak factor and Ramadan adjustment (shifted dinner peak, lower overall capacity)
+    peak_factor = np.array([params.peakFactor for params in params_list])[:, None, None]
+    ramadan = np.array([params.applyRamadan for params in params_list])[:, None, None]
+    ramadan_factor = np.where((hours >= 19) & (hours <= 23), 0.9, 0.6)[None, None, :]
+    adjusted = np.where(ramadan, value * peak_factor * ramadan_factor, value * peak_factor)
+    adjusted = np.minimum(1, adjusted)
+    
+    return {
+        "value": value,
+        "adjustedValue": adjusted,
+        "foh": np.rint(adjusted * 15).astype(np.int64),  # FOH staff needed
+        "boh": np.rint(adjusted * 10).astype(np.int64),  # BOH staff needed
+    }
+
+def _peak_hour_result(grid: Dict[str, np.ndarray], minutes: np.ndarray, labels: List[str]) -> PeakHourResult:
+    """Heatmap, aggregates, insights and opportunities for one outlet's grid"""
+    days = PEAK_HOUR_DAYS
+    value, adjusted, foh, boh = grid["value"], grid["adjustedValue"], grid["foh"], grid["boh"]
+    total = foh + boh
+    n_days, n_slots = total.shape
+    
+    heatmap_data = {
+        day: {
+            label: {
+                "value": float(value[d, s]),
+                "adjustedValue": float(adjusted[d, s]),
+                "foh": int(foh[d, s]),
+                "boh": int(boh[d, s]),
             }
+            for s, label in enumerate(labels)
+        }
+        for d, day in enumerate(days)
+    }
+    
+    # Aggregates as array reductions
+    day_foh, day_boh, day_total, day_peak = foh.sum(axis=1), boh.sum(axis=1), total.sum(axis=1), total.max(axis=1)
+    slot_foh = np.rint(foh.sum(axis=0) / n_days).astype(np.int64)
+    slot_boh = np.rint(boh.sum(axis=0) / n_days).astype(np.int64)
+    slot_total = np.rint(total.sum(axis=0) / n_days).astype(np.int64)
+    slot_peak = total.max(axis=0)
     
-    # Calculate staffing requirements
+    total_foh = int(np.rint(slot_foh.sum() / n_slots))
+    total_boh = int(np.rint(slot_boh.sum() / n_slots))
     staffing_requirements = {
-        "byDay": {},
-        "byHour": {},
+        "byDay": {
+            day: {"foh": int(day_foh[d]), "boh": int(day_boh[d]), "total": int(day_total[d]), "peak": int(day_peak[d])}
+            for d, day in enumerate(days)
+        },
+        "byHour": {
+            label: {"foh": int(slot_foh[s]), "boh": int(slot_boh[s]), "total": int(slot_total[s]), "peak": int(slot_peak[s])}
+            for s, label in enumerate(labels)
+        },
         "total": {
-            "foh": 0,
-            "boh": 0,
-            "total": 0,
-            "peakFoh": 0,
-            "peakBoh": 0,
-            "peakTotal": 0,
+            "foh": total_foh,
+            "boh": total_boh,
+            "total": total_foh + total_boh,
+            "peakFoh": int(foh.max()),
+            "peakBoh": int(boh.max()),
+            "peakTotal": int(total.max()),
         }
     }
     
-    # Initialize
-    for day in days:
-        staffing_requirements["byDay"][day] = {"foh": 0, "boh": 0, "total": 0, "peak": 0}
-    
-    for hour in hours:
-        staffing_requirements["byHour"][hour] = {"foh": 0, "boh": 0, "total": 0, "peak": 0}
-    
-    # Calculate
-    for day in days:
-        for hour in hours:
-            cell_data = heatmap_data[day][hour]
-            foh_needed = cell_data["foh"]
-            boh_needed = cell_data["boh"]
-            total_needed = foh_needed + boh_needed
-            
-            staffing_requirements["byDay"][day]["foh"] += foh_needed
-            staffing_requirements["byDay"][day]["boh"] += boh_needed
-            staffing_requirements["byDay"][day]["total"] += total_needed
-            staffing_requirements["byDay"][day]["peak"] = max(staffing_requirements["byDay"][day]["peak"], total_needed)
-            
-            staffing_requirements["byHour"][hour]["foh"] += foh_needed
-            staffing_requirements["byHour"][hour]["boh"] += boh_needed
-            staffing_requirements["byHour"][hour]["total"] += total_needed
-            staffing_requirements["byHour"][hour]["peak"] = max(staffing_requirements["byHour"][hour]["peak"], total_needed)
-            
-            staffing_requirements["total"]["peakFoh"] = max(staffing_requirements["total"]["peakFoh"], foh_needed)
-            staffing_requirements["total"]["peakBoh"] = max(staffing_requirements["total"]["peakBoh"], boh_needed)
-            staffing_requirements["total"]["peakTotal"] = max(staffing_requirements["total"]["peakTotal"], total_needed)
-    
-    # Average by number of days
-    for hour in hours:
-        staffing_requirements["byHour"][hour]["foh"] = round(staffing_requirements["byHour"][hour]["foh"] / len(days))
-        staffing_requirements["byHour"][hour]["boh"] = round(staffing_requirements["byHour"][hour]["boh"] / len(days))
-        staffing_requirements["byHour"][hour]["total"] = round(staffing_requirements["byHour"][hour]["total"] / len(days))
-    
-    staffing_requirements["total"]["foh"] = round(sum(staffing_requirements["byHour"][hour]["foh"] for hour in hours) / len(hours))
-    staffing_requirements["total"]["boh"] = round(sum(staffing_requirements["byHour"][hour]["boh"] for hour in hours) / len(hours))
-    staffing_requirements["total"]["total"] = staffing_requirements["total"]["foh"] + staffing_requirements["total"]["boh"]
-    
     # Generate insights
-    peak_day = max(days, key=lambda d: staffing_requirements["byDay"][d]["peak"])
-    peak_hour = max(hours, key=lambda h: sum(heatmap_data[day][h]["foh"] + heatmap_data[day][h]["boh"] for day in days))
+    peak_day = days[int(np.argmax(day_peak))]
+    peak_slot = labels[int(np.argmax(total.sum(axis=0)))]
+    
+    day_index = {day: d for d, day in enumerate(days)}
+    weekend_avg = day_total[[day_index[day] for day in WEEKEND_DAYS]].mean()
+    weekday_avg = day_total[[day_index[day] for day in WEEKDAY_DAYS]].mean()
     
-    weekend_avg = sum(staffing_requirements["byDay"][day]["total"] for day in ["Friday", "Saturday", "Sunday"]) / 3
-    weekday_avg = sum(staffing_requirements["byDay"][day]["total"] for day in ["Monday", "Tuesday", "Wednesday", "Thursday"]) / 4
+    hours = minutes // 60
+    lunch = (hours >= 12) & (hours < 15)
+    dinner = (hours >= 18) & (hours < 22)
     
     insights = [
-        f"Peak staffing requirements occur on {peak_day} at {peak_hour}:00",
-        f"Weekend staffing needs are {((weekend_avg / weekday_avg) * 100 - 100):.0f}% higher than weekdays",
-        f"Lunch peak requires {round(sum(staffing_requirements['byHour'][h]['total'] for h in range(12, 15)) / 3)} staff on average",
-        f"Dinner peak requires {round(sum(staffing_requirements['byHour'][h]['total'] for h in range(18, 22)) / 4)} staff on average",
-        f"The ratio of BOH to FOH staff is {staffing_requirements['total']['boh'] / staffing_requirements['total']['foh']:.2f}"
+        f"Peak staffing requirements occur on {peak_day} at {peak_slot if ':' in peak_slot else peak_slot + ':00'}",
+        f"Weekend staffing needs are {((weekend_avg / weekday_avg) * 100 - 100):.0f}% higher than weekdays" if weekday_avg else "No weekday staffing demand in the selected hours",
     ]
+    if lunch.any():
+        insights.append(f"Lunch peak requires {round(float(slot_total[lunch].mean()))} staff on average")
+    if dinner.any():
+        insights.append(f"Dinner peak requires {round(float(slot_total[dinner].mean()))} staff on average")
+    if total_foh:
+        insights.append(f"The ratio of BOH to FOH staff is {total_boh / total_foh:.2f}")
     
     # Generate optimization opportunities
     optimization_opportunities = [
@@ -626,21 +901,263 @@ def analyze_peak_hours(params: PeakHourParams) -> PeakHourResult:
         optimizationOpportunities=optimization_opportunities
     )
 
+def analyze_peak_hours_many(params_list: List[PeakHourParams]) -> List[PeakHourResult]:
+    """
+    Analyze peak hours for many outlets, computing grids that share a slot
+    layout in one array pass
+    """
+    layouts: Dict[tuple, List[int]] = {}
+    for i, params in enumerate(params_list):
+        layouts.setdefault((params.startHour, params.endHour, params.slotMinutes), []).append(i)
+    
+    results: List[Optional[PeakHourResult]] = [None] * len(params_list)
+    for (start_hour, end_hour, slot_minutes), indexes in layouts.items():
+        minutes, labels = _peak_hour_slots(start_hour, end_hour, slot_minutes)
+        grids = peak_hour_grids([params_list[i] for i in indexes], minutes)
+        for position, i in enumerate(indexes):
+            outlet_grid = {name: values[position] for name, values in grids.items()}
+            results[i] = _peak_hour_result(outlet_grid, minutes, labels)
+    return results
+
+def analyze_peak_hours(params: PeakHourParams) -> PeakHourResult:
+    """
+    Analyze peak hour staffing requirements
+
+    Demand noise is seeded by params.seed (or the parameters themselves), so the
+    same parameters always give the same heatmap.
+    """
+    return analyze_peak_hours_many([params])[0]
+
 # Staffing optimization functions
-def optimize_staffing(params: OptimizationParams) -> OptimizationResult:
+
+# Solver time budget (seconds) and relative optimality gap at which to stop
+OPTIMIZER_TIME_LIMIT = float(os.getenv("OPTIMIZER_TIME_LIMIT", "5"))
+OPTIMIZER_MIP_GAP = float(os.getenv("OPTIMIZER_MIP_GAP", "0.0001"))
+
+OPTIMIZATION_TARGETS = ("labor_cost", "efficiency", "revenue")
+
+# Share of rostered staff on duty at any time, and working days per month
+DEFAULT_STAFF_AVAILABILITY = 0.85
+OPTIMIZER_OPERATING_DAYS = 30
+
+def staffing_demand_curve(constraints: Dict[str, Any]) -> Dict[str, np.ndarray]:
     """
-    Optimize staffing based on target and constraints
+    On-duty FOH/BOH demand per slot of the week
+
+    Uses constraints["demand_curve"] ({"foh": [...], "boh": [...]}) when given,
+    otherwise the peak hour heatmap for the constraint's peak factor.
     """
-    # This would be a complex optimization algorithm in a real implementation
-    # For this example, we'll simulate optimization results
-    
-    # Extract parameters
-    scenario_id = params.scenario_id
-    optimization_target = params.optimizationTarget
-    constraints = params.constraints
-    
-    # Placeholder for original scenario (would be fetched from database)
-    original_scenario = {
+    curve = constraints.get("demand_curve")
+    if curve is not None:
+        foh = np.asarray(curve.get("foh", []), dtype=float)
+        boh = np.asarray(curve.get("boh", []), dtype=float)
+        if foh.shape != boh.shape or foh.ndim != 1 or foh.size == 0:
+            raise ValueError("demand_curve needs equal-length, non-empty 'foh' and 'boh' lists")
+        return {"foh": foh, "boh": boh}
+    
+    params = PeakHourParams(
+        peakFactor=constraints.get("peak_factor", 1.0),
+        applyRamadan=constraints.get("apply_ramadan", False),
+        seed=constraints.get("seed", 0)
+    )
+    minutes, _ = _peak_hour_slots(params.startHour, params.endHour, params.slotMinutes)
+    grid = peak_hour_grids([params], minutes)
+    return {"foh": grid["foh"][0].ravel().astype(float), "boh": grid["boh"][0].ravel().astype(float)}
+
+def _position_bounds(positions: List[Dict[str, Any]], constraints: Dict[str, Any], peak_headcount: np.ndarray):
+    """
+    Lower/upper headcount per position
+
+    Defaults keep every role and allow between half and double the current
+    count, or up to the headcount covering the department's peak on its own;
+    min_staff_by_type / max_staff_by_type override them by position id.
+    """
+    counts = np.array([p["count"] for p in positions], dtype=float)
+    lower = np.where(counts > 0, np.maximum(1, np.ceil(counts / 2)), 0)
+    upper = np.maximum(np.maximum(counts * 2, counts + 2), peak_headcount)
+    if not constraints.get("keep_all_roles", True):
+        lower = np.zeros_like(counts)
+    
+    ids = [p["id"] for p in positions]
+    for key, bound in (("min_staff_by_type", lower), ("max_staff_by_type", upper)):
+        for position_id, value in (constraints.get(key) or {}).items():
+            if position_id not in ids:
+                raise ValueError(f"Unknown position in {key}: {position_id}")
+            bound[ids.index(position_id)] = value
+    if np.any(lower > upper):
+        raise ValueError("min_staff_by_type exceeds max_staff_by_type")
+    return lower, upper
+
+def staffing_coverage(counts: np.ndarray, foh_mask: np.ndarray, demand: Dict[str, np.ndarray], availability: float) -> Dict[str, float]:
+    """Share of FOH/BOH slot demand covered by the on-duty staff for a headcount"""
+    foh_on_duty = availability * counts[foh_mask].sum()
+    boh_on_duty = availability * counts[~foh_mask].sum()
+    covered = np.minimum(demand["foh"], foh_on_duty).sum() + np.minimum(demand["boh"], boh_on_duty).sum()
+    total = demand["foh"].sum() + demand["boh"].sum()
+    
+    # Revenue is earned in a slot only as far as both FOH and BOH can serve it
+    slot_demand = demand["foh"] + demand["boh"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        foh_share = np.where(demand["foh"] > 0, foh_on_duty / demand["foh"], 1)
+        boh_share = np.where(demand["boh"] > 0, boh_on_duty / demand["boh"], 1)
+    served = (slot_demand * np.minimum(1, np.minimum(foh_share, boh_share))).sum()
+    return {
+        "coverage": float(covered / total) if total else 1.0,
+        "served": float(served / slot_demand.sum()) if slot_demand.sum() else 1.0,
+    }
+
+def solve_staffing(
+    positions: List[Dict[str, Any]],
+    demand: Dict[str, np.ndarray],
+    target: str,
+    constraints: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Integer program for position headcounts (HiGHS via scipy.optimize.milp)
+
+    Variables are the headcount per position plus, for the efficiency and revenue
+    targets, covered demand per slot. Targets:
+    - labor_cost: minimize labor cost while on-duty staff cover min_coverage
+      (default 100%) of the peak FOH and BOH demand
+    - efficiency: maximize covered slot demand within max_labor_cost
+      (default: the current labor cost), then minimize cost
+    - revenue: maximize monthly revenue served minus labor cost
+    All targets honour max_total_staff and the per-position bounds.
+    """
+    try:
+        from scipy.optimize import milp, LinearConstraint, Bounds
+    except ImportError as e:
+        raise RuntimeError("Staffing optimization requires scipy") from e
+    
+    if target not in OPTIMIZATION_TARGETS:
+        raise ValueError(f"optimizationTarget must be one of {OPTIMIZATION_TARGETS}")
+    if not positions:
+        raise ValueError("Scenario has no positions to optimize")
+    
+    n = len(positions)
+    salaries = np.array([p["salary"] for p in positions], dtype=float)
+    foh_mask = np.array([p["department"] == "FOH" for p in positions], dtype=bool)
+    availability = float(constraints.get("availability", DEFAULT_STAFF_AVAILABILITY))
+    peak_headcount = np.ceil(np.where(foh_mask, demand["foh"].max(), demand["boh"].max()) / availability)
+    lower, upper = _position_bounds(positions, constraints, peak_headcount)
+    time_limit = float(constraints.get("time_limit", OPTIMIZER_TIME_LIMIT))
+    
+    foh_demand, boh_demand = demand["foh"], demand["boh"]
+    slots = foh_demand.size
+    foh_row = np.where(foh_mask, availability, 0.0)
+    boh_row = np.where(~foh_mask, availability, 0.0)
+    
+    rows, row_lower, row_upper = [], [], []
+    def add_row(coefficients, lo=-np.inf, hi=np.inf):
+        rows.append(coefficients)
+        row_lower.append(lo)
+        row_upper.append(hi)
+    
+    if target == "labor_cost":
+        # x only; on-duty staff must cover the peak of each department's curve
+        min_coverage = float(constraints.get("min_coverage", 1.0))
+        c = salaries.copy()
+        add_row(foh_row, lo=min_coverage * foh_demand.max())
+        add_row(boh_row, lo=min_coverage * boh_demand.max())
+        extra = 0
+    elif target == "efficiency":
+        # x, then covered FOH and BOH units per slot
+        total_demand = foh_demand.sum() + boh_demand.sum()
+        cost_weight = 1e-6 * total_demand / max(salaries.sum(), 1)  # tie-break towards cheaper rosters
+        c = np.concatenate([salaries * cost_weight, -np.ones(2 * slots)])
+        extra = 2 * slots
+        for t in range(slots):
+            row = np.zeros(n + extra)
+            row[:n] = -foh_row
+            row[n + t] = 1
+            add_row(row, hi=0)
+            row = np.zeros(n + extra)
+            row[:n] = -boh_row
+            row[n + slots + t] = 1
+            add_row(row, hi=0)
+        budget = float(constraints.get("max_labor_cost", sum(p["salary"] * p["count"] for p in positions)))
+        add_row(np.concatenate([salaries, np.zeros(extra)]), hi=budget)
+    else:  # revenue
+        # x, then revenue served per slot (bounded by each department's capacity)
+        monthly_revenue = (
+            float(constraints.get("daily_covers", 250)) * float(constraints.get("avg_check", 120)) * OPTIMIZER_OPERATING_DAYS
+        )
+        slot_demand = foh_demand + boh_demand
+        # No demand at all means no revenue to serve in any slot
+        slot_revenue = monthly_revenue * slot_demand / slot_demand.sum() if slot_demand.sum() else np.zeros(slots)
+        c = np.concatenate([salaries, -np.ones(slots)])
+        extra = slots
+        for t in range(slots):
+            for department_row, department_demand in ((foh_row, foh_demand), (boh_row, boh_demand)):
+                if department_demand[t] <= 0:
+                    continue
+                row = np.zeros(n + extra)
+                row[:n] = -department_row * slot_revenue[t] / department_demand[t]
+                row[n + t] = 1
+                add_row(row, hi=0)
+    
+    if extra:
+        extra_upper = np.concatenate([foh_demand, boh_demand]) if target == "efficiency" else slot_revenue
+    else:
+        extra_upper = np.zeros(0)
+    
+    if "max_total_staff" in constraints:
+        add_row(np.concatenate([np.ones(n), np.zeros(extra)]), hi=float(constraints["max_total_staff"]))
+    
+    bounds = Bounds(np.concatenate([lower, np.zeros(extra)]), np.concatenate([upper, extra_upper]))
+    integrality = np.concatenate([np.ones(n), np.zeros(extra)])
+    
+    start = time.perf_counter()
+    result = milp(
+        c,
+        constraints=LinearConstraint(np.array(rows), row_lower, row_upper) if rows else (),
+        integrality=integrality,
+        bounds=bounds,
+        options={"time_limit": time_limit, "mip_rel_gap": OPTIMIZER_MIP_GAP}
+    )
+    solve_time = time.perf_counter() - start
+    
+    if result.x is None:
+        if result.status == 2:
+            raise ValueError("Constraints are infeasible for the demand curve")
+        raise ValueError(f"No staffing solution found within {time_limit}s: {result.message}")
+    
+    counts = np.rint(result.x[:n]).astype(int)
+    return {
+        "counts": counts,
+        "solver": {
+            "solver": "HiGHS (scipy.optimize.milp)",
+            "status": "optimal" if result.status == 0 else "time_limit",
+            "solveTime": solve_time,
+            "timeLimit": time_limit,
+            "optimalityGap": float(getattr(result, "mip_gap", 0.0) or 0.0),
+            "objective": float(result.fun),
+            "bound": float(getattr(result, "mip_dual_bound", result.fun)),
+            "nodes": int(getattr(result, "mip_node_count", 0) or 0),
+            "variables": n + extra,
+            "constraints": len(rows),
+        },
+        "availability": availability,
+        "foh_mask": foh_mask,
+    }
+
+def _optimization_defaults(scenario: Scenario) -> Dict[str, Any]:
+    """Constraint defaults taken from the scenario's drivers"""
+    defaults = {}
+    if scenario.revenueDrivers:
+        defaults["peak_factor"] = scenario.revenueDrivers.peakFactor
+        defaults["avg_check"] = scenario.revenueDrivers.avgSpending
+        if scenario.revenueDrivers.dailyCovers:
+            defaults["daily_covers"] = scenario.revenueDrivers.dailyCovers
+    if scenario.operationalHours:
+        defaults["apply_ramadan"] = scenario.operationalHours.ramadanAdjustment
+    if scenario.efficiencyDrivers:
+        defaults["availability"] = scenario.efficiencyDrivers.staffUtilization / 100
+    return defaults
+
+def _placeholder_optimization_scenario(scenario_id: str) -> Dict[str, Any]:
+    """Positions used when no scenario is loaded"""
+    return {
         "id": scenario_id,
         "name": "Original Scenario",
         "fohPositions": [
@@ -657,141 +1174,256 @@ def optimize_staffing(params: OptimizationParams) -> OptimizationResult:
             {"id": "prep-cook", "title": "Prep Cook", "count": 3, "salary": 3500},
             {"id": "kitchen-helper", "title": "Kitchen Helper", "count": 2, "salary": 3000},
             {"id": "dishwasher", "title": "Dishwasher", "count": 2, "salary": 2800}
-        ],
-        "laborCost": 97800,
-        "totalStaff": 31
+        ]
     }
+
+def optimize_staffing(params: OptimizationParams, scenario: Optional[Scenario] = None) -> OptimizationResult:
+    """
+    Optimize staffing based on target and constraints
+
+    Positions and constraint defaults come from the loaded scenario when given.
+    """
+    # Extract parameters
+    scenario_id = params.scenario_id
+    optimization_target = params.optimizationTarget
+    constraints = params.constraints or {}
+    
+    if scenario is not None:
+        original_scenario = {
+            "id": scenario.id,
+            "name": scenario.name,
+            "fohPositions": [
+                {"id": p.id, "title": p.title, "count": p.count, "salary": p.salary} for p in scenario.fohPositions
+            ],
+            "bohPositions": [
+                {"id": p.id, "title": p.title, "count": p.count, "salary": p.salary} for p in scenario.bohPositions
+            ],
+        }
+        constraints = {**_optimization_defaults(scenario), **constraints}
+    else:
+        original_scenario = _placeholder_optimization_scenario(scenario_id)
+    
+    positions = (
+        [{**p, "department": "FOH"} for p in original_scenario["fohPositions"]] +
+        [{**p, "department": "BOH"} for p in original_scenario["bohPositions"]]
+    )
+    original_scenario["laborCost"] = sum(p["salary"] * p["count"] for p in positions)
+    original_scenario["totalStaff"] = sum(p["count"] for p in positions)
+    
+    demand = staffing_demand_curve(constraints)
+    solution = solve_staffing(positions, demand, optimization_target, constraints)
+    counts = solution["counts"]
     
-    # Create optimized scenario based on target
+    # Create optimized scenario from the solver's headcounts
+    optimized_positions = [
+        {key: value for key, value in {**p, "count": int(count)}.items() if key != "department"}
+        for p, count in zip(positions, counts)
+    ]
+    n_foh = len(original_scenario["fohPositions"])
     optimized_scenario = {
         "id": f"{scenario_id}-optimized",
         "name": f"Optimized Scenario ({optimization_target})",
-        "fohPositions": [],
-        "bohPositions": [],
-        "laborCost": 0,
-        "totalStaff": 0
+        "fohPositions": optimized_positions[:n_foh],
+        "bohPositions": optimized_positions[n_foh:],
+        "laborCost": sum(p["salary"] * p["count"] for p in optimized_positions),
+        "totalStaff": int(counts.sum())
     }
     
-    if optimization_target == "labor_cost":
-        # Optimize for labor cost reduction
-        optimized_scenario["fohPositions"] = [
-            {"id": "waiter", "title": "Waiter", "count": 6, "salary": 3500},
-            {"id": "runner", "title": "Runner", "count": 2, "salary": 3000},
-            {"id": "host", "title": "Host", "count": 2, "salary": 4000},
-            {"id": "cashier", "title": "Cashier", "count": 1, "salary": 3500},
-            {"id": "manager", "title": "Manager", "count": 2, "salary": 8000}
-        ]
-        optimized_scenario["bohPositions"] = [
-            {"id": "chef", "title": "Chef", "count": 1, "salary": 10000},
-            {"id": "sous-chef", "title": "Sous Chef", "count": 1, "salary": 7000},
-            {"id": "line-cook", "title": "Line Cook", "count": 3, "salary": 4500},
-            {"id": "prep-cook", "title": "Prep Cook", "count": 2, "salary": 3500},
-            {"id": "kitchen-helper", "title": "Kitchen Helper", "count": 2, "salary": 3000},
-            {"id": "dishwasher", "title": "Dishwasher", "count": 1, "salary": 2800}
-        ]
-        optimized_scenario["laborCost"] = 79800
-        optimized_scenario["totalStaff"] = 23
-        
-    elif optimization_target == "efficiency":
-        # Optimize for efficiency
-        optimized_scenario["fohPositions"] = [
-            {"id": "waiter", "title": "Waiter", "count": 7, "salary": 3500},
-            {"id": "runner", "title": "Runner", "count": 2, "salary": 3000},
-            {"id": "host", "title": "Host", "count": 2, "salary": 4000},
-            {"id": "cashier", "title": "Cashier", "count": 1, "salary": 3500},
-            {"id": "manager", "title": "Manager", "count": 2, "salary": 8000}
-        ]
-        optimized_scenario["bohPositions"] = [
-            {"id": "chef", "title": "Chef", "count": 1, "salary": 10000},
-            {"id": "sous-chef", "title": "Sous Chef", "count": 1, "salary": 7000},
-            {"id": "line-cook", "title": "Line Cook", "count": 4, "salary": 4500},
-            {"id": "prep-cook", "title": "Prep Cook", "count": 2, "salary": 3500},
-            {"id": "kitchen-helper", "title": "Kitchen Helper", "count": 2, "salary": 3000},
-            {"id": "dishwasher", "title": "Dishwasher", "count": 1, "salary": 2800}
-        ]
-        optimized_scenario["laborCost"] = 86300
-        optimized_scenario["totalStaff"] = 25
-        
-    else:  # revenue
-        # Optimize for revenue generation
-        optimized_scenario["fohPositions"] = [
-            {"id": "waiter", "title": "Waiter", "count": 9, "salary": 3500},
-            {"id": "runner", "title": "Runner", "count": 3, "salary": 3000},
-            {"id": "host", "title": "Host", "count": 2, "salary": 4000},
-            {"id": "cashier", "title": "Cashier", "count": 2, "salary": 3500},
-            {"id": "manager", "title": "Manager", "count": 2, "salary": 8000}
-        ]
-        optimized_scenario["bohPositions"] = [
-            {"id": "chef", "title": "Chef", "count": 1, "salary": 10000},
-            {"id": "sous-chef", "title": "Sous Chef", "count": 1, "salary": 7000},
-            {"id": "line-cook", "title": "Line Cook", "count": 5, "salary": 4500},
-            {"id": "prep-cook", "title": "Prep Cook", "count": 3, "salary": 3500},
-            {"id": "kitchen-helper", "title": "Kitchen Helper", "count": 2, "salary": 3000},
-            {"id": "dishwasher", "title": "Dishwasher", "count": 2, "salary": 2800}
-        ]
-        optimized_scenario["laborCost"] = 107800
-        optimized_scenario["totalStaff"] = 32
-    
     # Calculate improvements
+    original_counts = np.array([p["count"] for p in positions], dtype=float)
+    original_fit = staffing_coverage(original_counts, solution["foh_mask"], demand, solution["availability"])
+    optimized_fit = staffing_coverage(counts.astype(float), solution["foh_mask"], demand, solution["availability"])
+    
     staff_reduction = original_scenario["totalStaff"] - optimized_scenario["totalStaff"]
     cost_savings = original_scenario["laborCost"] - optimized_scenario["laborCost"]
-    cost_savings_percentage = (cost_savings / original_scenario["laborCost"]) * 100
-    
     improvements = {
         "staffReduction": staff_reduction,
         "staffReductionPercentage": (staff_reduction / original_scenario["totalStaff"]) * 100 if staff_reduction > 0 else 0,
         "costSavings": cost_savings,
-        "costSavingsPercentage": cost_savings_percentage if cost_savings > 0 else 0,
-        "efficiencyImprovement": 15 if optimization_target == "efficiency" else 5,
-        "revenueImprovement": 10 if optimization_target == "revenue" else 0
+        "costSavingsPercentage": (
+            (cost_savings / original_scenario["laborCost"]) * 100
+            if cost_savings > 0 and original_scenario["laborCost"] > 0 else 0
+        ),
+        "efficiencyImprovement": (optimized_fit["coverage"] - original_fit["coverage"]) * 100,
+        "revenueImprovement": (optimized_fit["served"] - original_fit["served"]) * 100,
+        "demandCoverage": optimized_fit["coverage"] * 100,
+        "originalDemandCoverage": original_fit["coverage"] * 100
     }
     
-    # Generate recommendations
+    # Recommendations follow the solver's headcount changes only
     recommendations = []
-    
-    if optimization_target == "labor_cost":
-        recommendations = [
-            "Reduce runner to waiter ratio from 1:2 to 1:3",
-            "Consolidate cashier positions during non-peak hours",
-            "Reduce line cook staffing by implementing more efficient kitchen workflows",
-            "Cross-train prep cooks to handle multiple stations",
-            "Implement a single dishwasher system with improved equipment"
-        ]
-    elif optimization_target == "efficiency":
-        recommendations = [
-            "Optimize waiter sections to improve service efficiency",
-            "Implement runner zones to reduce travel time",
-            "Cross-train staff between FOH and BOH positions",
-            "Streamline kitchen processes to reduce preparation time",
-            "Implement technology solutions for order taking and processing"
-        ]
-    else:  # revenue
-        recommendations = [
-            "Increase waiter staffing to improve service quality and upselling",
-            "Add dedicated runners to ensure prompt food delivery",
-            "Increase line cook staffing to handle higher volume",
-            "Maintain full prep cook staffing to ensure food quality",
-            "Focus on staff training for suggestive selling techniques"
-        ]
+    for original, optimized in zip(positions, optimized_positions):
+        if optimized["count"] < original["count"]:
+            recommendations.append(f"Reduce {original['title']} headcount from {original['count']} to {optimized['count']}")
+        elif optimized["count"] > original["count"]:
+            recommendations.append(f"Increase {original['title']} headcount from {original['count']} to {optimized['count']}")
+    if not recommendations:
+        recommendations.append(f"Current headcounts are already optimal for the {optimization_target} target")
     
     return OptimizationResult(
         originalScenario=original_scenario,
         optimizedScenario=optimized_scenario,
         improvements=improvements,
-        recommendations=recommendations
+        recommendations=recommendations,
+        solver=solution["solver"]
     )
 
 # What-if analysis functions
-def run_what_if_analysis(params: WhatIfParams) -> WhatIfResult:
+
+# Drivers of the what-if model and the metrics derived from them
+WHAT_IF_METRICS = ("totalRevenue", "totalCost", "profit", "profitMargin")
+
+# Limits and defaults for distribution mode
+MAX_WHAT_IF_SAMPLES = 1000000
+WHAT_IF_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+def what_if_metrics(values: Dict[str, Any], revenue_from_drivers: bool) -> Dict[str, Any]:
     """
-    Run what-if analysis based on scenario changes
+    Revenue, cost, profit and margin for a set of drivers
+
+    Works on scalars or NumPy arrays of samples alike. Revenue is recomputed from
+    avgCheck x dailyCovers when revenue_from_drivers, otherwise totalRevenue is used.
     """
-    # Extract parameters
-    base_scenario_id = params.baseScenarioId
-    changes = params.changes
+    total_revenue = values["avgCheck"] * values["dailyCovers"] * 30 if revenue_from_drivers else values["totalRevenue"]  # Monthly
     
-    # Placeholder for base scenario (would be fetched from database)
-    base_scenario = {
+    food_cost = total_revenue * 0.7 * (values["foodCostPercentage"] / 100)
+    beverage_cost = total_revenue * 0.3 * (values["beverageCostPercentage"] / 100)
+    labor_cost = total_revenue * (values["laborCostPercentage"] / 100)
+    other_costs = total_revenue * 0.25  # Fixed at 25% for this example
+    
+    total_cost = food_cost + beverage_cost + labor_cost + other_costs
+    profit = total_revenue - total_cost
+    return {
+        "totalRevenue": total_revenue,
+        "totalCost": total_cost,
+        "profit": profit,
+        "profitMargin": (profit / total_revenue) * 100,
+    }
+
+def sample_what_if_change(rng: np.random.Generator, spec: Any, samples: int) -> Any:
+    """
+    Draw samples for one change
+
+    A number is fixed; [low, high] is uniform; a dict names a distribution:
+    {"distribution": "normal", "mean", "std"}, {"distribution": "uniform", "low", "high"},
+    {"distribution": "triangular", "low", "mode", "high"} or
+    {"distribution": "lognormal", "mean", "sigma"} (parameters of the log).
+    Optional "min"/"max" clip the samples.
+    """
+    if isinstance(spec, (int, float)) and not isinstance(spec, bool):
+        return spec
+    if isinstance(spec, (list, tuple)):
+        if len(spec) != 2:
+            raise ValueError("A range change must be [low, high]")
+        spec = {"distribution": "uniform", "low": spec[0], "high": spec[1]}
+    if not isinstance(spec, dict):
+        raise ValueError(f"Unsupported change value: {spec!r}")
+    
+    kind = spec.get("distribution", "uniform")
+    try:
+        if kind == "normal":
+            values = rng.normal(spec["mean"], spec["std"], samples)
+        elif kind == "uniform":
+            values = rng.uniform(spec["low"], spec["high"], samples)
+        elif kind == "triangular":
+            values = rng.triangular(spec["low"], spec["mode"], spec["high"], samples)
+        elif kind == "lognormal":
+            values = rng.lognormal(spec["mean"], spec["sigma"], samples)
+        else:
+            raise ValueError(f"Unknown distribution: {kind}")
+    except KeyError as e:
+        raise ValueError(f"Missing parameter {e} for {kind} distribution")
+    
+    if "min" in spec or "max" in spec:
+        values = np.clip(values, spec.get("min", -np.inf), spec.get("max", np.inf))
+    return values
+
+def _what_if_seed(params: WhatIfParams) -> int:
+    """Explicit seed, or one derived from the parameters so results are reproducible"""
+    if params.seed is not None:
+        return params.seed
+    return int(canonical_hash(params)[:16], 16)
+
+def _distribution_summary(values: np.ndarray, bins: int) -> Dict[str, Any]:
+    """Percentiles, moments and histogram of one metric's samples"""
+    percentiles = np.percentile(values, WHAT_IF_PERCENTILES)
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "percentiles": {f"p{p}": float(value) for p, value in zip(WHAT_IF_PERCENTILES, percentiles)},
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+def run_what_if_distribution(base_scenario: Dict[str, Any], changes: Dict[str, Any], params: WhatIfParams) -> Dict[str, Any]:
+    """
+    Monte Carlo what-if: sample every change and evaluate all samples at once
+
+    Returns the median outcome as the modified scenario values and, per metric,
+    percentiles and a histogram of the samples.
+    """
+    samples = params.samples
+    if not 1 <= samples <= MAX_WHAT_IF_SAMPLES:
+        raise ValueError(f"samples must be between 1 and {MAX_WHAT_IF_SAMPLES}")
+    
+    start = time.perf_counter()
+    seed = _what_if_seed(params)
+    rng = np.random.default_rng(seed)
+    
+    # Changes are drawn in sorted key order so the same seed gives the same samples
+    values = dict(base_scenario)
+    for key in sorted(changes):
+        if key in base_scenario:
+            values[key] = sample_what_if_change(rng, changes[key], samples)
+    
+    metrics = what_if_metrics(values, "avgCheck" in changes or "dailyCovers" in changes)
+    metrics = {key: np.broadcast_to(np.asarray(value, dtype=float), (samples,)) for key, value in metrics.items()}
+    
+    distribution = {key: _distribution_summary(metrics[key], params.bins) for key in WHAT_IF_METRICS}
+    distribution["probabilityOfLoss"] = float((metrics["profit"] < 0).mean())
+    distribution["probabilityOfProfitDecrease"] = float((metrics["profit"] < base_scenario["profit"]).mean())
+    distribution["samples"] = samples
+    distribution["seed"] = seed
+    distribution["elapsedSeconds"] = time.perf_counter() - start
+    
+    medians = {
+        key: (float(np.median(value)) if isinstance(value, np.ndarray) else value)
+        for key, value in values.items() if key in changes
+    }
+    medians.update({key: distribution[key]["percentiles"]["p50"] for key in WHAT_IF_METRICS})
+    return {"values": medians, "distribution": distribution}
+
+def _what_if_base_scenario(base_scenario_id: str, scenario: Optional[Scenario] = None) -> Dict[str, Any]:
+    """
+    Base values for what-if and sensitivity analysis
+
+    Derived from the loaded scenario when given: revenue from its revenue
+    drivers and the labor cost share from its positions. Food and beverage
+    cost shares are not stored on scenarios and keep their defaults.
+    """
+    if scenario is not None:
+        drivers = scenario.revenueDrivers
+        avg_check = drivers.avgSpending if drivers else 120
+        daily_covers = (drivers.dailyCovers if drivers else None) or 250
+        total_revenue = (drivers.monthlyRevenue if drivers else None) or avg_check * daily_covers * 30
+        labor_cost = sum(p.salary * p.count for p in scenario.fohPositions + scenario.bohPositions)
+        base_scenario = {
+            "id": scenario.id,
+            "name": scenario.name,
+            "avgCheck": avg_check,
+            "dailyCovers": daily_covers,
+            "foodCostPercentage": 28,
+            "beverageCostPercentage": 22,
+            "laborCostPercentage": (labor_cost / total_revenue) * 100 if total_revenue else 25,
+            "totalRevenue": total_revenue,
+        }
+        base_scenario.update(what_if_metrics(base_scenario, False))
+        return base_scenario
+    
+    # Placeholder for base scenario when none is loaded
+    return {
         "id": base_scenario_id,
         "name": "Base Scenario",
         "avgCheck": 120,
@@ -804,29 +1436,40 @@ def run_what_if_analysis(params: WhatIfParams) -> WhatIfResult:
         "profit": 225000,
         "profitMargin": 25
     }
+
+def run_what_if_analysis(params: WhatIfParams, scenario: Optional[Scenario] = None) -> WhatIfResult:
+    """
+    Run what-if analysis based on scenario changes
+
+    In "distribution" mode each change may be a [low, high] range or a
+    distribution, and the result adds percentiles and histograms from
+    params.samples seeded draws.
+    """
+    # Extract parameters
+    base_scenario_id = params.baseScenarioId
+    changes = params.changes
+    
+    base_scenario = _what_if_base_scenario(base_scenario_id, scenario)
     
     # Apply changes to create modified scenario
     modified_scenario = base_scenario.copy()
     modified_scenario["id"] = f"{base_scenario_id}-modified"
     modified_scenario["name"] = "Modified Scenario"
     
-    for key, value in changes.items():
-        if key in modified_scenario:
-            modified_scenario[key] = value
-    
-    # Recalculate financial metrics
-    if "avgCheck" in changes or "dailyCovers" in changes:
-        modified_scenario["totalRevenue"] = modified_scenario["avgCheck"] * modified_scenario["dailyCovers"] * 30  # Monthly
-    
-    # Recalculate costs
-    food_cost = modified_scenario["totalRevenue"] * 0.7 * (modified_scenario["foodCostPercentage"] / 100)
-    beverage_cost = modified_scenario["totalRevenue"] * 0.3 * (modified_scenario["beverageCostPercentage"] / 100)
-    labor_cost = modified_scenario["totalRevenue"] * (modified_scenario["laborCostPercentage"] / 100)
-    other_costs = modified_scenario["totalRevenue"] * 0.25  # Fixed at 25% for this example
-    
-    modified_scenario["totalCost"] = food_cost + beverage_cost + labor_cost + other_costs
-    modified_scenario["profit"] = modified_scenario["totalRevenue"] - modified_scenario["totalCost"]
-    modified_scenario["profitMargin"] = (modified_scenario["profit"] / modified_scenario["totalRevenue"]) * 100
+    distribution = None
+    if params.mode == "distribution":
+        outcome = run_what_if_distribution(base_scenario, changes, params)
+        modified_scenario.update(outcome["values"])
+        distribution = outcome["distribution"]
+    elif params.mode == "deterministic":
+        for key, value in changes.items():
+            if key in modified_scenario:
+                modified_scenario[key] = value
+        
+        # Recalculate financial metrics
+        modified_scenario.update(what_if_metrics(modified_scenario, "avgCheck" in changes or "dailyCovers" in changes))
+    else:
+        raise ValueError("mode must be 'deterministic' or 'distribution'")
     
     # Calculate impact
     revenue_change = modified_scenario["totalRevenue"] - base_scenario["totalRevenue"]
@@ -852,12 +1495,209 @@ def run_what_if_analysis(params: WhatIfParams) -> WhatIfResult:
         f"{'Improving' if margin_change > 0 else 'Reducing'} profit margin by {abs(margin_change):.1f} percentage points",
         f"Return on investment: {(profit_change / max(1, cost_change)) * 100:.1f}%" if cost_change > 0 else "Cost reduction with maintained or improved profitability"
     ]
+    if distribution is not None:
+        profit = distribution["profit"]["percentiles"]
+        insights.append(
+            f"Profit ranges from SAR {profit['p5']:,.0f} to SAR {profit['p95']:,.0f} (90% interval) "
+            f"with a {distribution['probabilityOfLoss'] * 100:.1f}% probability of loss"
+        )
     
     return WhatIfResult(
         baseScenario=base_scenario,
         modifiedScenario=modified_scenario,
         impact=impact,
-        insights=insights
+        insights=insights,
+        distribution=distribution
+    )
+
+# Sensitivity analysis functions
+
+# Drivers that can be perturbed and the metrics reported for each evaluation
+SENSITIVITY_DRIVERS = (
+    "avgCheck",
+    "dailyCovers",
+    "foodCostPercentage",
+    "beverageCostPercentage",
+    "laborCostPercentage",
+    "staffUtilization",
+    "techImpact",
+    "crossTraining",
+)
+# Efficiency driver values used when the base scenario does not set them
+SENSITIVITY_EFFICIENCY_BASE = {"staffUtilization": 85, "techImpact": 10, "crossTraining": 15}
+
+SENSITIVITY_METRICS = ("totalRevenue", "totalCost", "profit", "profitMargin", "netProfit", "netProfitMargin")
+
+# Base values where the metrics are undefined: zero revenue (margins divide by
+# it) or zero staff efficiency (the labor share divides by it)
+SENSITIVITY_POSITIVE_DRIVERS = ("avgCheck", "dailyCovers", "staffUtilization")
+SENSITIVITY_BELOW_100_DRIVERS = ("techImpact", "crossTraining")
+
+# Upper bound on evaluations in one request and the default runtime budget (seconds)
+MAX_SENSITIVITY_EVALUATIONS = 1000000
+SENSITIVITY_TIME_BUDGET = float(os.getenv("SENSITIVITY_TIME_BUDGET", "1.0"))
+
+def sensitivity_metrics(values: Dict[str, np.ndarray], base: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    What-if and P&L metrics for arrays of driver values
+
+    Efficiency drivers scale the labor cost share the way they scale variable
+    headcount in calculate_staffing_requirements (inversely to the efficiency
+    factor); net profit follows calculate_profit_loss below operating profit.
+    """
+    def efficiency(v):
+        return (v["staffUtilization"] / 100) * (1 - v["techImpact"] / 100) * (1 - v["crossTraining"] / 100)
+    
+    drivers = dict(values)
+    drivers["laborCostPercentage"] = values["laborCostPercentage"] * efficiency(base) / efficiency(values)
+    metrics = what_if_metrics(drivers, True)
+    
+    total_revenue = metrics["totalRevenue"]
+    depreciation_amortization = total_revenue * 0.03
+    interest_expense = total_revenue * 0.01
+    ebt = metrics["profit"] - depreciation_amortization - interest_expense
+    taxes = np.maximum(0, ebt * 0.15)
+    net_profit = ebt - taxes
+    metrics["netProfit"] = net_profit
+    metrics["netProfitMargin"] = (net_profit / total_revenue) * 100
+    return metrics
+
+def run_sensitivity_analysis(params: SensitivityParams, scenario: Optional[Scenario] = None) -> SensitivityResult:
+    """
+    One-at-a-time and pairwise sensitivity of the what-if metrics
+
+    Every perturbation (each driver at each step, and each driver pair over the
+    step grid) is a row of one driver matrix evaluated in a single vectorized pass.
+    """
+    start = time.perf_counter()
+    budget = params.timeBudget or SENSITIVITY_TIME_BUDGET
+    
+    efficiency = dict(SENSITIVITY_EFFICIENCY_BASE)
+    if scenario is not None and scenario.efficiencyDrivers:
+        efficiency = {key: getattr(scenario.efficiencyDrivers, key) for key in efficiency}
+    base_scenario = {**efficiency, **_what_if_base_scenario(params.baseScenarioId, scenario), **params.base}
+    drivers = list(params.drivers or SENSITIVITY_DRIVERS)
+    for driver in drivers:
+        if driver not in SENSITIVITY_DRIVERS:
+            raise ValueError(f"Unknown driver: {driver}")
+    if params.metric not in SENSITIVITY_METRICS:
+        raise ValueError(f"metric must be one of {SENSITIVITY_METRICS}")
+    steps = np.array(sorted(set(params.steps)), dtype=float)
+    if steps.size == 0 or np.any(steps <= -100):
+        raise ValueError("steps must be percentage changes greater than -100")
+    pair_steps = np.array(sorted(set(params.pairSteps) | {0.0}), dtype=float)
+    
+    pairs = [(a, b) for i, a in enumerate(drivers) for b in drivers[i + 1:]] if params.pairwise else []
+    n_single = len(drivers) * steps.size
+    n_pair = len(pairs) * pair_steps.size ** 2
+    evaluations = 1 + n_single + n_pair
+    if evaluations > MAX_SENSITIVITY_EVALUATIONS:
+        raise ValueError(f"{evaluations} evaluations exceed the limit of {MAX_SENSITIVITY_EVALUATIONS}")
+    
+    # Multipliers per driver for every evaluation: base row, one-at-a-time rows, pair grids
+    column = {driver: j for j, driver in enumerate(SENSITIVITY_DRIVERS)}
+    multipliers = np.ones((evaluations, len(SENSITIVITY_DRIVERS)))
+    row = 1
+    for driver in drivers:
+        multipliers[row:row + steps.size, column[driver]] = 1 + steps / 100
+        row += steps.size
+    grid_a, grid_b = np.meshgrid(pair_steps, pair_steps, indexing="ij")
+    for a, b in pairs:
+        multipliers[row:row + grid_a.size, column[a]] = 1 + grid_a.ravel() / 100
+        multipliers[row:row + grid_a.size, column[b]] = 1 + grid_b.ravel() / 100
+        row += grid_a.size
+    
+    for driver in SENSITIVITY_DRIVERS:
+        value = float(base_scenario[driver])
+        if not np.isfinite(value):
+            raise ValueError(f"Base value for {driver} must be a finite number")
+        if driver in SENSITIVITY_POSITIVE_DRIVERS and value <= 0:
+            raise ValueError(f"Base value for {driver} must be greater than 0")
+        if driver in SENSITIVITY_BELOW_100_DRIVERS and value >= 100:
+            raise ValueError(f"Base value for {driver} must be below 100")
+    
+    base_values = np.array([float(base_scenario[driver]) for driver in SENSITIVITY_DRIVERS])
+    values = multipliers * base_values[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics = sensitivity_metrics({driver: values[:, column[driver]] for driver in SENSITIVITY_DRIVERS}, base_scenario)
+    
+    # A step can still land on an undefined point (e.g. techImpact perturbed to 100)
+    finite = np.all([np.isfinite(metrics[name]) for name in SENSITIVITY_METRICS], axis=0)
+    if not finite.all():
+        bad = int(np.flatnonzero(~finite)[0])
+        perturbed = ", ".join(
+            f"{driver}={values[bad, column[driver]]:g}"
+            for driver in SENSITIVITY_DRIVERS if multipliers[bad, column[driver]] != 1
+        )
+        raise ValueError(f"Metrics are undefined at {perturbed}; use different steps or base values")
+    
+    base_metrics = {name: float(metrics[name][0]) for name in SENSITIVITY_METRICS}
+    
+    # One-at-a-time curves, tornado bars and elasticities
+    one_at_a_time = {}
+    tornado = []
+    elasticity = {}
+    low, high = int(np.argmin(steps)), int(np.argmax(steps))
+    below = np.flatnonzero(steps < 0)
+    above = np.flatnonzero(steps > 0)
+    row = 1
+    for driver in drivers:
+        rows = slice(row, row + steps.size)
+        row += steps.size
+        curves = {name: metrics[name][rows] for name in SENSITIVITY_METRICS}
+        one_at_a_time[driver] = {
+            "steps": steps.tolist(),
+            "values": (values[rows, column[driver]]).tolist(),
+            "metrics": {name: curve.tolist() for name, curve in curves.items()},
+        }
+        
+        primary = curves[params.metric]
+        tornado.append({
+            "driver": driver,
+            "baseValue": float(base_values[column[driver]]),
+            "low": {"step": float(steps[low]), "value": float(primary[low])},
+            "high": {"step": float(steps[high]), "value": float(primary[high])},
+            "swing": float(abs(primary[high] - primary[low])),
+        })
+        
+        # Arc elasticity between the smallest steps on either side of the base
+        lo = below[-1] if below.size else None
+        hi = above[0] if above.size else None
+        elasticity[driver] = {}
+        for name, curve in curves.items():
+            base_value = base_metrics[name]
+            if lo is None or hi is None or base_value == 0:
+                elasticity[driver][name] = None
+                continue
+            change = (curve[hi] - curve[lo]) / abs(base_value)
+            elasticity[driver][name] = float(change / ((steps[hi] - steps[lo]) / 100))
+    
+    tornado.sort(key=lambda bar: -bar["swing"])
+    
+    pairwise = {}
+    for a, b in pairs:
+        rows = slice(row, row + grid_a.size)
+        row += grid_a.size
+        pairwise[f"{a}|{b}"] = {
+            "steps": pair_steps.tolist(),
+            "values": metrics[params.metric][rows].reshape(grid_a.shape).tolist(),  # rows: first driver, columns: second
+        }
+    
+    elapsed = time.perf_counter() - start
+    return SensitivityResult.construct(
+        baseScenario=base_scenario,
+        baseMetrics=base_metrics,
+        metric=params.metric,
+        tornado=tornado,
+        elasticity=elasticity,
+        oneAtATime=one_at_a_time,
+        pairwise=pairwise,
+        runtime={
+            "evaluations": evaluations,
+            "elapsedSeconds": elapsed,
+            "budgetSeconds": budget,
+            "withinBudget": elapsed <= budget,
+        }
     )
 
 # Scenario comparison functions
@@ -957,3 +1797,57 @@ def compare_scenarios(scenarios: List[Scenario]) -> ComparisonResult:
         recommendations=recommendations
     )
 
+# Batch calculation functions
+# kind -> (params model, single-item function, optional vectorized function over a list)
+BATCH_CALCULATIONS = {
+    "staffing": (StaffingParams, calculate_staffing_requirements, calculate_staffing_requirements_many),
+    "revenue": (RevenueParams, generate_revenue_projections, generate_revenue_projections_many),
+    "pl": (PLParams, calculate_profit_loss, None),
+    "peak-hours": (PeakHourParams, analyze_peak_hours, analyze_peak_hours_many),
+}
+
+# Upper bound on items in one batch request
+MAX_BATCH_SIZE = 1000
+
+def run_calculation_batch(kind: str, items: List[Dict[str, Any]]) -> BatchResult:
+    """
+    Run one calculation kind over many parameter objects
+
+    Items that fail validation or calculation get an error entry instead of
+    failing the batch; results are returned in input order.
+    """
+    if kind not in BATCH_CALCULATIONS:
+        raise ValueError(f"Unknown calculation kind: {kind}")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch of {len(items)} items exceeds the limit of {MAX_BATCH_SIZE}")
+    
+    params_model, calculate_one, calculate_many = BATCH_CALCULATIONS[kind]
+    results = [BatchItemResult(index=i) for i in range(len(items))]
+    
+    # Validate each item separately so one bad item does not fail the batch
+    valid = []
+    for i, item in enumerate(items):
+        try:
+            valid.append((i, params_model.parse_obj(item)))
+        except ValidationError as e:
+            results[i].error = f"Invalid parameters: {e}"
+    
+    # Vectorized path for the whole batch, falling back to item by item so a
+    # failing item only affects its own entry
+    computed = None
+    if calculate_many and valid:
+        try:
+            computed = calculate_many([params for _, params in valid])
+        except (ValueError, ZeroDivisionError, OverflowError):
+            computed = None
+    
+    for position, (i, params) in enumerate(valid):
+        try:
+            result = computed[position] if computed is not None else calculate_one(params)
+            results[i].result = result.dict()
+        except Exception as e:
+            # Any failure is recorded on its own item rather than failing the batch
+            results[i].error = f"{type(e).__name__}: {e}"
+    
+    failed = sum(1 for result in results if result.error is not None)
+    return BatchResult(results=results, succeeded=len(results) - failed, failed=failed)
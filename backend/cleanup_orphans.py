@@ -0,0 +1,22 @@
+import argparse
+from database import SessionLocal, delete_orphaned_rows
+
+def cleanup_orphans(dry_run: bool = False, batch_size: int = 5000):
+    """Delete staff positions and parameter rows that no scenario references"""
+    # Session on the shared engine (see database.create_db_engine)
+    db = SessionLocal()
+    
+    try:
+        counts = delete_orphaned_rows(db, dry_run=dry_run, batch_size=batch_size)
+        action = "Would delete" if dry_run else "Deleted"
+        for table, count in counts.items():
+            print(f"{action} {count} orphaned rows from {table}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove orphaned scenario rows")
+    parser.add_argument("--dry-run", action="store_true", help="count orphaned rows without deleting them")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows deleted per transaction")
+    args = parser.parse_args()
+    cleanup_orphans(dry_run=args.dry_run, batch_size=args.batch_size)
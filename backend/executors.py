@@ -0,0 +1,175 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Size of the pool used for blocking I/O (database sessions)
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "16"))
+
+# Size of the pool used for CPU-heavy work (model training)
+PROCESS_POOL_SIZE = int(os.getenv("PROCESS_POOL_SIZE", str(max(1, (os.cpu_count() or 2) - 1))))
+
+# Dedicated pool for password hashing (bcrypt is CPU-bound by design) and how
+# many hashes may wait for it before requests are rejected
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", str(4 * HASH_POOL_SIZE)))
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """Return the shared thread pool, creating it on first use"""
+    global _thread_pool
+    with _lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="blocking")
+        return _thread_pool
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use"""
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            # spawn avoids forking a process that already runs executor threads
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PROCESS_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+async def run_in_thread(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run blocking sync work in the shared thread pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_thread_pool(), functools.partial(func, *args, **kwargs))
+
+async def run_in_process(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run CPU-heavy work in the shared process pool
+
+    func and its arguments must be picklable (module-level functions only).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args, **kwargs))
+
+class ExecutorSaturated(Exception):
+    """Raised when a BoundedExecutor already has as many tasks as it admits"""
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is saturated, retry later")
+        self.retry_after = retry_after
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool that admits at most max_workers running plus
+    max_queued waiting tasks
+
+    Further submissions fail immediately with ExecutorSaturated instead of
+    queueing without bound, so a burst of expensive work (e.g. logins) is shed
+    rather than delaying everything behind it. Its threads are separate from
+    the shared pool, so the work cannot starve database calls either.
+    """
+    def __init__(self, name: str, max_workers: int, max_queued: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "completed": 0,
+            "peak_in_flight": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            return self._pool
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            self._stats["completed"] += 1
+
+    def _timed(self, submitted_at: float, func: Callable[..., Any], *args, **kwargs) -> Any:
+        started_at = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            wait = started_at - submitted_at
+            with self._lock:
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+                self._stats["run_seconds_total"] += time.perf_counter() - started_at
+
+    def _retry_after(self) -> float:
+        completed = self._stats["completed"]
+        average = self._stats["run_seconds_total"] / completed if completed else 0.1
+        # Time for the current backlog to drain through the workers
+        return max(1.0, average * (self.max_workers + self.max_queued) / self.max_workers)
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func in the pool, or raise ExecutorSaturated if it is full"""
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queued:
+                self._stats["rejected"] += 1
+                raise ExecutorSaturated(self.name, self._retry_after())
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+        try:
+            future = self._get_pool().submit(self._timed, time.perf_counter(), func, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        # The slot is held until the work itself finishes, even if the caller goes away
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._stats["completed"]
+            return {
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "in_flight": self._in_flight,
+                "running": min(self._in_flight, self.max_workers),
+                "queued": max(0, self._in_flight - self.max_workers),
+                **{key: value for key, value in self._stats.items() if not key.endswith("_total")},
+                "wait_seconds_avg": self._stats["wait_seconds_total"] / completed if completed else 0.0,
+                "run_seconds_avg": self._stats["run_seconds_total"] / completed if completed else 0.0,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+# Executor for bcrypt hashing and verification (see auth)
+hash_executor = BoundedExecutor("password-hashing", HASH_POOL_SIZE, HASH_QUEUE_SIZE)
+
+def shutdown_executors():
+    """Shut down the shared pools (called on application shutdown)"""
+    global _thread_pool, _process_pool
+    with _lock:
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=False)
+            _thread_pool = None
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+    hash_executor.shutdown()
+    logger.info("Executor pools shut down")
@@ -1,8 +1,10 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import uuid
 from datetime import datetime, timedelta
 import pandas as pd
@@ -11,58 +13,100 @@ import os
 
 from models import (
     Scenario, 
+    ScenarioPage,
+    BulkImportResult,
+    TrainingJobStatus,
     StaffingParams, 
+    StaffingSweepParams,
     RevenueParams, 
+    RevenuePortfolioParams,
     PLParams, 
     PeakHourParams,
     OptimizationParams,
     WhatIfParams,
+    SensitivityParams,
+    ShiftScheduleParams,
     StaffingResult,
+    StaffingSweepResult,
     RevenueResult,
+    RevenuePortfolioResult,
     PLResult,
     PeakHourResult,
     ComparisonResult,
     OptimizationResult,
-    WhatIfResult
+    WhatIfResult,
+    SensitivityResult,
+    ShiftScheduleResult,
+    BatchResult
 )
 
 from calculations import (
     calculate_staffing_requirements,
+    run_staffing_sweep,
+    run_revenue_portfolio,
     generate_revenue_projections,
     calculate_profit_loss,
     analyze_peak_hours,
     optimize_staffing,
     run_what_if_analysis,
-    compare_scenarios
+    run_sensitivity_analysis,
+    compare_scenarios,
+    run_calculation_batch
 )
 
 from database import (
     get_db,
     init_db,
-    get_scenarios,
+    get_scenarios_page,
     get_scenario_by_id,
+    get_user_by_username,
     save_scenario,
     update_scenario,
-    delete_scenario
+    delete_scenario,
+    pool_stats
 )
 
 from auth import (
     User,
     UserCreate,
+    UserUpdate,
     Token,
     get_current_active_user,
     is_superuser,
     authenticate_user,
     create_access_token,
     create_user,
+    update_user_account,
+    auth_cache_stats,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
 from ml_models import (
     get_demand_forecaster,
-    get_staffing_optimizer
+    model_registry
 )
 
+from model_search import SEARCH_STRATEGIES
+
+from training_jobs import training_jobs
+
+from scheduling import build_shift_schedule
+
+from scenario_loader import ScenarioLoader, get_scenario_loader
+
+from bulk_io import (
+    BULK_FORMATS,
+    BULK_IMPORT_CHUNK_SIZE,
+    ScenarioImporter,
+    export_scenarios_ndjson,
+    ndjson_records,
+    parquet_records
+)
+
+from executors import ExecutorSaturated, hash_executor, run_in_thread, run_in_process, shutdown_executors
+
+from cache import result_cache, month_bucket
+
 app = FastAPI(title="F&B Manpower Modeling API")
 
 # Configure CORS
@@ -74,11 +118,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Shed load when a bounded executor (e.g. password hashing) is full
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(round(exc.retry_after)))}
+    )
+
+def columnar_response(result: BaseModel) -> JSONResponse:
+    """
+    Send a result holding large columnar lists as-is
+
+    Skips response_model re-validation and pydantic's recursive dict(), which
+    dominate the cost for arrays with hundreds of thousands of entries.
+    """
+    return JSONResponse(content=dict(result))
+
+async def cached_calculation(kind, func, params, result_model, response: Response, bypass: Optional[str], bucket=None):
+    """
+    Run a deterministic calculation through the result cache
+
+    Sets X-Cache: HIT/MISS; a truthy X-Cache-Bypass request header forces a recompute.
+    """
+    skip = bypass is not None and bypass.lower() not in ("", "0", "false", "no")
+    result, hit = await run_in_thread(result_cache.get_or_compute, kind, func, params, result_model, bucket, skip)
+    response.headers["X-Cache"] = "HIT" if hit else "MISS"
+    return result
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     init_db()
 
+# Stop training jobs and release executor pools on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    await run_in_thread(training_jobs.shutdown)
+    shutdown_executors()
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -87,7 +166,7 @@ async def root():
 # Authentication endpoints
 @app.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -102,22 +181,86 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 
 @app.post("/users/", response_model=User)
 async def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(DBUser).filter(DBUser.username == user.username).first()
+    db_user = await get_user_by_username(db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    return create_user(db=db, user=user)
+    return await create_user(db=db, user=user)
 
 @app.get("/users/me/", response_model=User)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
+@app.patch("/users/{username}", response_model=User)
+async def update_user_endpoint(
+    username: str,
+    changes: UserUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(is_superuser)  # Only superusers can change or deactivate accounts
+):
+    db_user = await update_user_account(db, username, changes)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
+
 # Scenario endpoints
-@app.get("/scenarios/", response_model=List[Scenario])
+@app.get("/scenarios/", response_model=ScenarioPage, response_model_exclude_unset=True)
 async def read_scenarios(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    brand: Optional[str] = None,
+    outlet: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated summary fields, e.g. id,name,updatedAt"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    try:
+        items, next_cursor = await get_scenarios_page(
+            db,
+            current_user.id,
+            limit=limit,
+            cursor=cursor,
+            brand=brand,
+            outlet=outlet,
+            name_prefix=name_prefix,
+            fields=field_list
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "nextCursor": next_cursor}
+
+# Bulk import and export (declared before /scenarios/{scenario_id} so the paths win)
+@app.post("/scenarios/import", response_model=BulkImportResult)
+async def import_scenarios(
+    request: Request,
+    format: str = Query("ndjson", description="Body format: ndjson or parquet"),
+    on_conflict: str = Query("error", description="For IDs that already exist: error or skip"),
+    chunk_size: int = Query(BULK_IMPORT_CHUNK_SIZE, ge=1, le=10000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    return await get_scenarios(db, current_user.id)
+    if format not in BULK_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(BULK_FORMATS)}")
+    if format == "parquet":
+        records = parquet_records(request.stream(), chunk_size)
+    else:
+        records = ndjson_records(request.stream())
+    try:
+        importer = ScenarioImporter(db, current_user.id, chunk_size=chunk_size, on_conflict=on_conflict)
+        return await importer.run(records)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/scenarios/export")
+async def export_scenarios(
+    current_user: User = Depends(get_current_active_user)
+):
+    return StreamingResponse(
+        export_scenarios_ndjson(current_user.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="scenarios.ndjson"'}
+    )
 
 @app.get("/scenarios/{scenario_id}", response_model=Scenario)
 async def read_scenario(
@@ -195,110 +338,151 @@ async def delete_scenario_endpoint(
 @app.post("/calculations/staffing", response_model=StaffingResult)
 async def calculate_staffing_endpoint(
     params: StaffingParams,
+    response: Response,
+    x_cache_bypass: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user)
 ):
-    return calculate_staffing_requirements(params)
+    return await cached_calculation(
+        "staffing", calculate_staffing_requirements, params, StaffingResult, response, x_cache_bypass
+    )
+
+@app.post("/calculations/staffing/sweep", response_model=StaffingSweepResult)
+async def staffing_sweep_endpoint(
+    params: StaffingSweepParams,
+    current_user: User = Depends(get_current_active_user)
+):
+    try:
+        return columnar_response(await run_in_thread(run_staffing_sweep, params))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/calculations/revenue", response_model=RevenueResult)
 async def generate_revenue_endpoint(
     params: RevenueParams,
+    response: Response,
+    x_cache_bypass: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user)
 ):
-    return generate_revenue_projections(params)
+    # Periods start at the current month
+    try:
+        return await cached_calculation(
+            "revenue", generate_revenue_projections, params, RevenueResult, response, x_cache_bypass, month_bucket()
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/calculations/revenue/portfolio", response_model=RevenuePortfolioResult)
+async def revenue_portfolio_endpoint(
+    params: RevenuePortfolioParams,
+    current_user: User = Depends(get_current_active_user)
+):
+    try:
+        return columnar_response(await run_in_thread(run_revenue_portfolio, params))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/calculations/pl", response_model=PLResult)
 async def calculate_pl_endpoint(
     params: PLParams,
+    response: Response,
+    x_cache_bypass: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user)
 ):
-    return calculate_profit_loss(params)
+    # Historical labels end at the current month
+    return await cached_calculation(
+        "pl", calculate_profit_loss, params, PLResult, response, x_cache_bypass, month_bucket()
+    )
 
 @app.post("/calculations/peak-hours", response_model=PeakHourResult)
 async def analyze_peak_hours_endpoint(
     params: PeakHourParams,
+    response: Response,
+    x_cache_bypass: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user)
+):
+    # Seeded, so the heatmap is deterministic for the same parameters
+    try:
+        return await cached_calculation(
+            "peak-hours", analyze_peak_hours, params, PeakHourResult, response, x_cache_bypass
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/calculations/{kind}/batch", response_model=BatchResult)
+async def calculation_batch_endpoint(
+    kind: str,
+    items: List[Dict[str, Any]],
     current_user: User = Depends(get_current_active_user)
 ):
-    return analyze_peak_hours(params)
+    try:
+        return await run_in_thread(run_calculation_batch, kind, items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/calculations/optimize", response_model=OptimizationResult)
 async def optimize_staffing_endpoint(
     params: OptimizationParams,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    loader: ScenarioLoader = Depends(get_scenario_loader)
 ):
-    # Check if scenario exists and user has access
-    scenario = await get_scenario_by_id(db, params.scenario_id)
-    if scenario is None:
-        raise HTTPException(status_code=404, detail="Scenario not found")
-    
-    if scenario.owner_id != current_user.id and not current_user.is_superuser:
-        raise HTTPException(status_code=403, detail="Not authorized to access this scenario")
+    # Loads the scenario and checks access
+    scenario = await loader.load(params.scenario_id)
     
-    # Use advanced optimization if available
+    # Integer program, run in the worker pool so the solve does not hold the event loop
     try:
-        optimizer = get_staffing_optimizer()
-        
-        # Extract features from scenario
-        features = {
-            'covers': scenario.revenueDrivers.dailyCovers if scenario.revenueDrivers else 250,
-            'service_style': scenario.serviceParameters.serviceStyle if scenario.serviceParameters else 'casual',
-            'area_per_cover': float(scenario.spaceParameters.areaPerCover) if scenario.spaceParameters else 1.67,
-            'avg_check': scenario.revenueDrivers.avgSpending if scenario.revenueDrivers else 120,
-            'dwelling_time': scenario.revenueDrivers.dwellingTime if scenario.revenueDrivers else 75,
-            'peak_factor': scenario.revenueDrivers.peakFactor if scenario.revenueDrivers else 1.5,
-            'staff_utilization': scenario.efficiencyDrivers.staffUtilization if scenario.efficiencyDrivers else 85,
-            'tech_impact': scenario.efficiencyDrivers.techImpact if scenario.efficiencyDrivers else 10,
-            'cross_training': scenario.efficiencyDrivers.crossTraining if scenario.efficiencyDrivers else 15
-        }
-        
-        # Run optimization
-        optimization_result = optimizer.optimize(features, params.constraints)
-        
-        # Map to our result format
-        return optimize_staffing(params)
-    except Exception as e:
-        # Fall back to basic optimization
-        return optimize_staffing(params)
+        return await run_in_process(optimize_staffing, params, scenario)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/calculations/shift-schedule", response_model=ShiftScheduleResult)
+async def shift_schedule_endpoint(
+    params: ShiftScheduleParams,
+    current_user: User = Depends(get_current_active_user)
+):
+    # Integer program, run in the worker pool like /calculations/optimize
+    try:
+        return await run_in_process(build_shift_schedule, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/calculations/what-if", response_model=WhatIfResult)
 async def what_if_analysis_endpoint(
     params: WhatIfParams,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    loader: ScenarioLoader = Depends(get_scenario_loader)
 ):
-    # Check if scenario exists and user has access
-    scenario = await get_scenario_by_id(db, params.baseScenarioId)
-    if scenario is None:
-        raise HTTPException(status_code=404, detail="Scenario not found")
+    # Loads the scenario and checks access
+    scenario = await loader.load(params.baseScenarioId)
     
-    if scenario.owner_id != current_user.id and not current_user.is_superuser:
-        raise HTTPException(status_code=403, detail="Not authorized to access this scenario")
+    try:
+        return await run_in_thread(run_what_if_analysis, params, scenario)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/calculations/sensitivity", response_model=SensitivityResult)
+async def sensitivity_analysis_endpoint(
+    params: SensitivityParams,
+    loader: ScenarioLoader = Depends(get_scenario_loader)
+):
+    # Loads the scenario and checks access
+    scenario = await loader.load(params.baseScenarioId)
     
-    return run_what_if_analysis(params)
+    try:
+        return columnar_response(await run_in_thread(run_sensitivity_analysis, params, scenario))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/calculations/compare", response_model=ComparisonResult)
 async def compare_scenarios_endpoint(
     data: Dict[str, List[str]],
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    loader: ScenarioLoader = Depends(get_scenario_loader)
 ):
     scenario_ids = data.get("scenario_ids", [])
     if not scenario_ids:
         raise HTTPException(status_code=400, detail="No scenario IDs provided")
     
-    scenarios = []
-    for scenario_id in scenario_ids:
-        scenario = await get_scenario_by_id(db, scenario_id)
-        if scenario is None:
-            raise HTTPException(status_code=404, detail=f"Scenario with ID {scenario_id} not found")
-        
-        # Check if user has access to this scenario
-        if scenario.owner_id != current_user.id and not current_user.is_superuser:
-            raise HTTPException(status_code=403, detail=f"Not authorized to access scenario {scenario_id}")
-        
-        scenarios.append(scenario)
+    # One query for all scenarios, access checked for the whole set
+    scenarios = await loader.load_many(scenario_ids)
     
-    return compare_scenarios(scenarios)
+    return await run_in_thread(compare_scenarios, scenarios)
 
 # Machine learning endpoints
 @app.post("/ml/demand-forecast")
@@ -308,45 +492,117 @@ async def forecast_demand(
     current_user: User = Depends(get_current_active_user)
 ):
     try:
-        forecaster = get_demand_forecaster(model_type)
-        result = forecaster.predict(features)
-        return result
+        forecaster = await run_in_thread(get_demand_forecaster, model_type)
+        return await run_in_thread(forecaster.predict, features)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/ml/train-demand-model")
+@app.post("/ml/demand-forecast/batch")
+async def forecast_demand_batch(
+    features: Union[List[Dict[str, Any]], Dict[str, List[Any]]],
+    model_type: str = "random_forest",
+    current_user: User = Depends(get_current_active_user)
+):
+    try:
+        forecaster = await run_in_thread(get_demand_forecaster, model_type)
+        return await run_in_thread(forecaster.predict_many, features)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def training_search_options(search: Optional[str], n_iter: Optional[int], time_budget: Optional[float]) -> Dict[str, Any]:
+    if search is not None and search not in SEARCH_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"search must be one of {', '.join(SEARCH_STRATEGIES)}")
+    options = {"strategy": search, "n_iter": n_iter, "time_budget": time_budget}
+    return {key: value for key, value in options.items() if value is not None}
+
+@app.post("/ml/train-demand-model", response_model=TrainingJobStatus, status_code=status.HTTP_202_ACCEPTED)
 async def train_demand_model(
     data: List[Dict[str, Any]],
     model_type: str = "random_forest",
+    search: Optional[str] = Query(None, description="Hyperparameter search: grid, random or halving"),
+    n_iter: Optional[int] = Query(None, ge=1, le=500, description="Candidates sampled by random/halving search"),
+    time_budget: Optional[float] = Query(None, gt=0, description="Search wall-clock budget in seconds"),
     current_user: User = Depends(is_superuser)  # Only superusers can train models
 ):
+    search_options = training_search_options(search, n_iter, time_budget)
+    
+    # Queue a background training job; poll /ml/jobs/{id} for progress
+    df = pd.DataFrame(data)
     try:
-        # Convert data to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Train model
-        forecaster = get_demand_forecaster(model_type)
-        result = forecaster.train(df)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return await run_in_thread(training_jobs.submit, "demand_forecaster", model_type, df, search_options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/ml/train-staffing-model")
+@app.post("/ml/train-staffing-model", response_model=TrainingJobStatus, status_code=status.HTTP_202_ACCEPTED)
 async def train_staffing_model(
     data: List[Dict[str, Any]],
     model_type: str = "gradient_boosting",
+    search: Optional[str] = Query(None, description="Hyperparameter search: grid, random or halving"),
+    n_iter: Optional[int] = Query(None, ge=1, le=500, description="Candidates sampled by random/halving search"),
+    time_budget: Optional[float] = Query(None, gt=0, description="Search wall-clock budget in seconds"),
+    multi_output: Optional[bool] = Query(None, description="One model for all staff types instead of one per type"),
     current_user: User = Depends(is_superuser)  # Only superusers can train models
 ):
+    search_options = training_search_options(search, n_iter, time_budget)
+    train_options = {"multi_output": multi_output} if multi_output is not None else {}
+    
+    # Queue a background training job; poll /ml/jobs/{id} for progress
+    df = pd.DataFrame(data)
     try:
-        # Convert data to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Train model
-        optimizer = get_staffing_optimizer(model_type)
-        result = optimizer.train(df)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return await run_in_thread(
+            training_jobs.submit, "staffing_optimizer", model_type, df, search_options, train_options
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/ml/jobs", response_model=List[TrainingJobStatus])
+async def list_training_jobs(
+    current_user: User = Depends(is_superuser)
+):
+    return training_jobs.list()
+
+@app.get("/ml/jobs/{job_id}", response_model=TrainingJobStatus)
+async def get_training_job(
+    job_id: str,
+    current_user: User = Depends(is_superuser)
+):
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job
+
+@app.post("/ml/jobs/{job_id}/cancel", response_model=TrainingJobStatus)
+async def cancel_training_job(
+    job_id: str,
+    current_user: User = Depends(is_superuser)
+):
+    try:
+        job = training_jobs.cancel(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job
+
+# Metrics endpoint
+@app.get("/metrics")
+async def metrics(
+    current_user: User = Depends(get_current_active_user)
+):
+    return {
+        "db_pool": pool_stats(),
+        "model_registry": model_registry.stats(),
+        "training_jobs": training_jobs.stats(),
+        "result_cache": result_cache.stats(),
+        "auth_cache": auth_cache_stats(),
+        "password_hashing": hash_executor.stats()
+    }
+
+@app.get("/ml/registry")
+async def model_registry_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    return model_registry.stats()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,26 @@
+import argparse
+from database import SCENARIO_STORAGE_MODES, SessionLocal, create_tables, migrate_scenario_storage
+
+def migrate(target: str, batch_size: int = 500):
+    """Copy all scenarios into the target storage layout (see SCENARIO_STORAGE)"""
+    # Creates scenario_documents on databases initialized before it existed
+    create_tables()
+    
+    # Session on the shared engine (see database.create_db_engine)
+    db = SessionLocal()
+    
+    try:
+        result = migrate_scenario_storage(db, target, batch_size=batch_size)
+        print(f"Copied {result['copied']} scenarios from {result['source']} to {result['target']} storage "
+              f"({result['skipped']} already present) in {result['seconds']}s")
+        print(f"Set SCENARIO_STORAGE={target} to serve scenarios from the new layout")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy scenarios between the relational and document layouts")
+    parser.add_argument("--to", dest="target", choices=SCENARIO_STORAGE_MODES, default="document",
+                        help="storage layout to copy scenarios into")
+    parser.add_argument("--batch-size", type=int, default=500, help="scenarios copied per transaction")
+    args = parser.parse_args()
+    migrate(args.target, batch_size=args.batch_size)
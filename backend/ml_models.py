@@ -5,21 +5,135 @@ from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
+from scipy.stats import randint, loguniform
 import joblib
 import os
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 import logging
 
+from model_search import PreprocessedFolds, search_hyperparameters
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Directory for saving models
-MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
+MODELS_DIR = os.getenv("MODELS_DIR", os.path.join(os.path.dirname(__file__), "models"))
 os.makedirs(MODELS_DIR, exist_ok=True)
 
+# Maximum number of loaded models kept in memory by the registry
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "8"))
+
+# Maximum number of rows passed to a single model.predict call in batch mode
+PREDICT_CHUNK_SIZE = int(os.getenv("PREDICT_CHUNK_SIZE", "5000"))
+
+# Train the staffing optimizer as one multi-output model instead of one
+# pipeline per target (overridable per training request)
+STAFFING_MULTI_OUTPUT = os.getenv("STAFFING_MULTI_OUTPUT", "false").lower() == "true"
+
+# Staffing optimizer targets, in multi-output column order
+STAFFING_TARGETS = ['waiters', 'runners', 'kitchen_staff', 'other_staff']
+
+def model_file_paths(kind: str, model_type: str, models_dir: Optional[str] = None) -> Tuple[str, str]:
+    """Return the (model, preprocessor) joblib paths for a model kind and type"""
+    models_dir = models_dir or MODELS_DIR
+    return (
+        os.path.join(models_dir, f"{kind}_{model_type}.joblib"),
+        os.path.join(models_dir, f"{kind}_preprocessor_{model_type}.joblib"),
+    )
+
+# Training progress callback: (fraction complete, stage description)
+ProgressCallback = Callable[[float, str], None]
+
+def search_progress(progress: Optional[ProgressCallback], start: float, end: float, stage: str):
+    """Map a search's (fits done, fits planned) onto [start, end] of a training progress callback"""
+    if progress is None:
+        return None
+    return lambda done, planned: progress(start + (end - start) * min(1.0, done / max(planned, 1)), stage)
+
+def model_search_space(model_type: str) -> Tuple[Any, Dict[str, List[Any]], Dict[str, Any]]:
+    """Return (estimator, param_grid, param_distributions) for a model type"""
+    if model_type == "random_forest":
+        return (
+            RandomForestRegressor(random_state=42),
+            {
+                'n_estimators': [50, 100, 200],
+                'max_depth': [None, 10, 20, 30],
+                'min_samples_split': [2, 5, 10]
+            },
+            {
+                'n_estimators': randint(50, 201),
+                'max_depth': [None, 5, 10, 15, 20, 30],
+                'min_samples_split': randint(2, 11)
+            },
+        )
+    if model_type == "gradient_boosting":
+        return (
+            GradientBoostingRegressor(random_state=42),
+            {
+                'n_estimators': [50, 100, 200],
+                'learning_rate': [0.01, 0.1, 0.2],
+                'max_depth': [3, 5, 7]
+            },
+            {
+                'n_estimators': randint(50, 201),
+                'learning_rate': loguniform(0.01, 0.2),
+                'max_depth': randint(3, 8)
+            },
+        )
+    # linear_regression
+    return LinearRegression(), {}, {}
+
+def multi_output_search_space(model_type: str) -> Tuple[Any, Dict[str, List[Any]], Dict[str, Any]]:
+    """
+    model_search_space for a 2-D target
+
+    Forests and linear models predict several outputs natively; gradient
+    boosting is wrapped in MultiOutputRegressor (one booster per output
+    behind a single fit/predict call).
+    """
+    estimator, param_grid, param_distributions = model_search_space(model_type)
+    if model_type != "gradient_boosting":
+        return estimator, param_grid, param_distributions
+    return (
+        MultiOutputRegressor(estimator),
+        {f"estimator__{key}": values for key, values in param_grid.items()},
+        {f"estimator__{key}": values for key, values in param_distributions.items()},
+    )
+
+def fit_searched_model(
+    model_type: str,
+    folds: PreprocessedFolds,
+    y,
+    search_options: Optional[Dict[str, Any]] = None,
+    multi_output: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Tuple[Pipeline, Optional[Dict[str, Any]]]:
+    """
+    Search hyperparameters on the cached folds and refit the best candidate
+
+    Returns a (preprocessor, model) pipeline fitted on all of folds' rows and
+    the search report (None for models without hyperparameters). With
+    multi_output, y has one column per target and candidates are ranked by
+    the MSE averaged over the targets.
+    """
+    search_space = multi_output_search_space if multi_output else model_search_space
+    estimator, param_grid, param_distributions = search_space(model_type)
+    report = None
+    if param_grid:
+        best_params, report = search_hyperparameters(
+            estimator, param_grid, param_distributions, folds, y, progress=progress, **(search_options or {})
+        )
+        estimator.set_params(**best_params)
+    estimator.fit(folds.X, y)
+    return Pipeline(steps=[('preprocessor', folds.preprocessor), ('model', estimator)]), report
+
 class DemandForecaster:
     """
     Machine learning model for forecasting customer demand
@@ -28,8 +142,7 @@ class DemandForecaster:
         self.model_type = model_type
         self.model = None
         self.preprocessor = None
-        self.model_path = os.path.join(MODELS_DIR, f"demand_forecaster_{model_type}.joblib")
-        self.preprocessor_path = os.path.join(MODELS_DIR, f"demand_forecaster_preprocessor_{model_type}.joblib")
+        self.model_path, self.preprocessor_path = model_file_paths("demand_forecaster", model_type)
         
         # Try to load existing model
         self._load_model()
@@ -57,7 +170,12 @@ class DemandForecaster:
             logger.error(f"Error saving model: {e}")
             return False
     
-    def train(self, data: pd.DataFrame):
+    def train(
+        self,
+        data: pd.DataFrame,
+        search_options: Optional[Dict[str, Any]] = None,
+        progress: Optional[ProgressCallback] = None
+    ):
         """
         Train the demand forecasting model
         
@@ -75,6 +193,9 @@ class DemandForecaster:
             - menu_change: Boolean indicating if there was a recent menu change
             - competitor_promotion: Boolean indicating if competitors have promotions
             - covers: Number of covers (target variable)
+        - search_options: Optional overrides for the hyperparameter search
+          (strategy, n_iter, time_budget, n_jobs)
+        - progress: Optional callback receiving (fraction complete, stage)
         """
         # Check if data is valid
         required_columns = [
@@ -113,40 +234,20 @@ class DemandForecaster:
                 ('cat', categorical_transformer, categorical_features)
             ])
         
-        # Create and train the model
-        if self.model_type == "random_forest":
-            model = RandomForestRegressor(random_state=42)
-            param_grid = {
-                'n_estimators': [50, 100, 200],
-                'max_depth': [None, 10, 20, 30],
-                'min_samples_split': [2, 5, 10]
-            }
-        elif self.model_type == "gradient_boosting":
-            model = GradientBoostingRegressor(random_state=42)
-            param_grid = {
-                'n_estimators': [50, 100, 200],
-                'learning_rate': [0.01, 0.1, 0.2],
-                'max_depth': [3, 5, 7]
-            }
-        else:  # linear_regression
-            model = LinearRegression()
-            param_grid = {}
-        
-        # Create pipeline with preprocessing and model
-        pipeline = Pipeline(steps=[
-            ('preprocessor', self.preprocessor),
-            ('model', model)
-        ])
-        
-        # Perform grid search for hyperparameter tuning
-        if param_grid:
-            grid_search = GridSearchCV(pipeline, param_grid, cv=5, scoring='neg_mean_squared_error')
-            grid_search.fit(X_train, y_train)
-            self.model = grid_search.best_estimator_
-            logger.info(f"Best parameters: {grid_search.best_params_}")
-        else:
-            pipeline.fit(X_train, y_train)
-            self.model = pipeline
+        # Fit the preprocessor once per CV fold, then search and refit the model
+        start = time.perf_counter()
+        if progress:
+            progress(0.0, "preprocessing")
+        folds = PreprocessedFolds(self.preprocessor, X_train)
+        self.model, search = fit_searched_model(
+            self.model_type, folds, y_train, search_options,
+            progress=search_progress(progress, 0.05, 0.95, "searching hyperparameters")
+        )
+        self.preprocessor = folds.preprocessor
+        if progress:
+            progress(0.95, "evaluating")
+        if search:
+            logger.info(f"Best parameters: {search['best_params']}")
         
         # Evaluate model
         y_pred = self.model.predict(X_test)
@@ -161,7 +262,9 @@ class DemandForecaster:
         return {
             'mse': mse,
             'r2': r2,
-            'model_type': self.model_type
+            'model_type': self.model_type,
+            'search': search,
+            'training_seconds': round(time.perf_counter() - start, 3)
         }
     
     def predict(self, features: Dict[str, Any]) -> Dict[str, Any]:
@@ -193,6 +296,44 @@ class DemandForecaster:
             'predicted_covers': round(prediction),
             'model_type': self.model_type
         }
+    
+    def predict_many(
+        self,
+        features: Union[List[Dict[str, Any]], Dict[str, List[Any]]],
+        chunk_size: int = PREDICT_CHUNK_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Make predictions for many feature rows with vectorized model calls
+        
+        Parameters:
+        - features: Either a list of feature dictionaries (one per row) or a
+          columnar dictionary mapping each feature to a list of values
+        - chunk_size: Maximum number of rows predicted per model call
+        
+        Returns:
+        - Dictionary with predictions in input order
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train() first or load a pre-trained model.")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        
+        # Convert features to DataFrame (list of rows or columnar payload)
+        df = pd.DataFrame(features)
+        
+        # Remove date and target if present
+        df = df.drop(columns=[col for col in ('date', 'covers') if col in df.columns])
+        
+        # Predict chunk by chunk so intermediate arrays stay bounded
+        predictions = np.empty(len(df), dtype=float)
+        for start in range(0, len(df), chunk_size):
+            predictions[start:start + chunk_size] = self.model.predict(df.iloc[start:start + chunk_size])
+        
+        return {
+            'predicted_covers': [int(value) for value in np.rint(predictions)],
+            'count': len(df),
+            'model_type': self.model_type
+        }
 
 class StaffingOptimizer:
     """
@@ -202,8 +343,7 @@ class StaffingOptimizer:
         self.model_type = model_type
         self.model = None
         self.preprocessor = None
-        self.model_path = os.path.join(MODELS_DIR, f"staffing_optimizer_{model_type}.joblib")
-        self.preprocessor_path = os.path.join(MODELS_DIR, f"staffing_optimizer_preprocessor_{model_type}.joblib")
+        self.model_path, self.preprocessor_path = model_file_paths("staffing_optimizer", model_type)
         
         # Try to load existing model
         self._load_model()
@@ -231,7 +371,13 @@ class StaffingOptimizer:
             logger.error(f"Error saving model: {e}")
             return False
     
-    def train(self, data: pd.DataFrame):
+    def train(
+        self,
+        data: pd.DataFrame,
+        search_options: Optional[Dict[str, Any]] = None,
+        multi_output: Optional[bool] = None,
+        progress: Optional[ProgressCallback] = None
+    ):
         """
         Train the staffing optimization model
         
@@ -250,6 +396,11 @@ class StaffingOptimizer:
             - runners: Number of runners (target)
             - kitchen_staff: Number of kitchen staff (target)
             - other_staff: Number of other staff (target)
+        - search_options: Optional overrides for the hyperparameter search
+          (strategy, n_iter, time_budget, n_jobs)
+        - multi_output: Train one model predicting every target instead of
+          one pipeline per target (defaults to STAFFING_MULTI_OUTPUT)
+        - progress: Optional callback receiving (fraction complete, stage)
         """
         # Check if data is valid
         required_columns = [
@@ -263,8 +414,8 @@ class StaffingOptimizer:
                 raise ValueError(f"Missing required column: {col}")
         
         # Split features and targets
-        X = data.drop(['waiters', 'runners', 'kitchen_staff', 'other_staff'], axis=1)
-        y = data[['waiters', 'runners', 'kitchen_staff', 'other_staff']]
+        X = data.drop(STAFFING_TARGETS, axis=1)
+        y = data[STAFFING_TARGETS]
         
         # Split data into train and test sets
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -288,61 +439,72 @@ class StaffingOptimizer:
                 ('cat', categorical_transformer, categorical_features)
             ])
         
-        # Create and train the model
-        if self.model_type == "random_forest":
-            model = RandomForestRegressor(random_state=42)
-            param_grid = {
-                'n_estimators': [50, 100, 200],
-                'max_depth': [None, 10, 20, 30],
-                'min_samples_split': [2, 5, 10]
-            }
-        elif self.model_type == "gradient_boosting":
-            model = GradientBoostingRegressor(random_state=42)
-            param_grid = {
-                'n_estimators': [50, 100, 200],
-                'learning_rate': [0.01, 0.1, 0.2],
-                'max_depth': [3, 5, 7]
-            }
-        else:  # linear_regression
-            model = LinearRegression()
-            param_grid = {}
+        # Fit the preprocessor once per CV fold; the transformed folds are
+        # shared by every candidate of every target's search
+        start = time.perf_counter()
+        if progress:
+            progress(0.0, "preprocessing")
+        folds = PreprocessedFolds(self.preprocessor, X_train)
+        self.preprocessor = folds.preprocessor
         
-        # Train separate models for each target
-        models = {}
         metrics = {}
-        
-        for target in ['waiters', 'runners', 'kitchen_staff', 'other_staff']:
-            logger.info(f"Training model for {target}")
-            
-            # Create pipeline with preprocessing and model
-            pipeline = Pipeline(steps=[
-                ('preprocessor', self.preprocessor),
-                ('model', model)
-            ])
+        if multi_output is None:
+            multi_output = STAFFING_MULTI_OUTPUT
+        
+        if multi_output:
+            # One model for all targets: one search, one predict per request
+            logger.info(f"Training multi-output model for {', '.join(STAFFING_TARGETS)}")
+            self.model, search = fit_searched_model(
+                self.model_type, folds, y_train, search_options, multi_output=True,
+                progress=search_progress(progress, 0.05, 0.95, "searching hyperparameters")
+            )
+            if search:
+                logger.info(f"Best parameters: {search['best_params']}")
             
-            # Perform grid search for hyperparameter tuning
-            if param_grid:
-                grid_search = GridSearchCV(pipeline, param_grid, cv=5, scoring='neg_mean_squared_error')
-                grid_search.fit(X_train, y_train[target])
-                models[target] = grid_search.best_estimator_
-                logger.info(f"Best parameters for {target}: {grid_search.best_params_}")
-            else:
-                pipeline.fit(X_train, y_train[target])
-                models[target] = pipeline
+            # Evaluate model per target
+            y_pred = self.model.predict(X_test)
+            for i, target in enumerate(STAFFING_TARGETS):
+                mse = mean_squared_error(y_test[target], y_pred[:, i])
+                r2 = r2_score(y_test[target], y_pred[:, i])
+                metrics[target] = {'mse': mse, 'r2': r2}
+                logger.info(f"Model evaluation for {target} - MSE: {mse:.2f}, R²: {r2:.2f}")
+        else:
+            # Train separate models for each target
+            models = {}
+            search = None
             
-            # Evaluate model
-            y_pred = models[target].predict(X_test)
-            mse = mean_squared_error(y_test[target], y_pred)
-            r2 = r2_score(y_test[target], y_pred)
+            share = 0.9 / len(STAFFING_TARGETS)
+            for i, target in enumerate(STAFFING_TARGETS):
+                logger.info(f"Training model for {target}")
+                
+                models[target], target_search = fit_searched_model(
+                    self.model_type, folds, y_train[target], search_options,
+                    progress=search_progress(progress, 0.05 + i * share, 0.05 + (i + 1) * share, f"training {target}")
+                )
+                if target_search:
+                    logger.info(f"Best parameters for {target}: {target_search['best_params']}")
+                
+                # Evaluate model
+                y_pred = models[target].predict(X_test)
+                mse = mean_squared_error(y_test[target], y_pred)
+                r2 = r2_score(y_test[target], y_pred)
+                
+                metrics[target] = {'mse': mse, 'r2': r2, 'search': target_search}
+                logger.info(f"Model evaluation for {target} - MSE: {mse:.2f}, R²: {r2:.2f}")
             
-            metrics[target] = {'mse': mse, 'r2': r2}
-            logger.info(f"Model evaluation for {target} - MSE: {mse:.2f}, R²: {r2:.2f}")
-        
-        self.model = models
+            self.model = models
         
         # Save model
         self._save_model()
         
+        metrics['training'] = {
+            'model_type': self.model_type,
+            'layout': 'multi_output' if multi_output else 'per_target',
+            'search': search,
+            'preprocessor_fits': folds.preprocessor_fits,
+            'preprocessing_seconds': round(folds.seconds, 3),
+            'training_seconds': round(time.perf_counter() - start, 3)
+        }
         return metrics
     
     def optimize(self, features: Dict[str, Any], constraints: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -364,8 +526,14 @@ class StaffingOptimizer:
         
         # Make predictions for each staff type
         predictions = {}
-        for staff_type, model in self.model.items():
-            predictions[staff_type] = round(model.predict(df)[0])
+        if isinstance(self.model, dict):
+            for staff_type, model in self.model.items():
+                predictions[staff_type] = round(model.predict(df)[0])
+        else:
+            # Multi-output model: features are transformed once, one predict call
+            row = self.model.predict(df)[0]
+            for staff_type, value in zip(STAFFING_TARGETS, row):
+                predictions[staff_type] = round(value)
         
         # Apply constraints if provided
         if constraints:
@@ -409,11 +577,162 @@ class StaffingOptimizer:
             'model_type': self.model_type
         }
 
+# Model classes by registry kind
+MODEL_CLASSES = {
+    "demand_forecaster": DemandForecaster,
+    "staffing_optimizer": StaffingOptimizer,
+}
+
+def train_model(
+    kind: str,
+    model_type: str,
+    data: pd.DataFrame,
+    search_options: Optional[Dict[str, Any]] = None,
+    output_dir: Optional[str] = None,
+    **train_options
+) -> Dict[str, Any]:
+    """
+    Train and persist a fresh model instance
+
+    Module-level so it can run in a worker process; serving processes pick up
+    the new files through the registry's file version check. With output_dir
+    the files are written there instead of MODELS_DIR (see
+    ModelRegistry.publish). train_options are passed on to the model's
+    train() (e.g. multi_output for staffing, progress).
+    """
+    if kind not in MODEL_CLASSES:
+        raise ValueError(f"Unknown model kind: {kind}")
+    instance = MODEL_CLASSES[kind](model_type)
+    if output_dir:
+        instance.model_path, instance.preprocessor_path = model_file_paths(kind, model_type, output_dir)
+    return instance.train(data, search_options, **train_options)
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models keyed by (kind, model_type)
+
+    Entries are reloaded when the files on disk change (mtime or size) and the
+    least recently used entry is evicted once more than max_entries are loaded.
+    """
+    def __init__(self, max_entries: int = MODEL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._factories = MODEL_CLASSES
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "reloads": 0,
+            "evictions": 0,
+            "loads": 0,
+            "load_time_seconds": 0.0,
+        }
+    
+    @staticmethod
+    def _file_version(kind: str, model_type: str):
+        """Version of the on-disk model files, or None if they do not exist"""
+        version = []
+        for path in model_file_paths(kind, model_type):
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            version.append((st.st_mtime_ns, st.st_size))
+        return tuple(version)
+    
+    def _store(self, key: Tuple[str, str], instance, version):
+        """Insert an entry as most recently used and evict beyond max_entries (lock held)"""
+        self._entries[key] = (instance, version)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+            logger.info(f"Evicted model {evicted} from registry")
+    
+    def get(self, kind: str, model_type: str):
+        """Return the cached instance, loading or reloading it if needed"""
+        if kind not in self._factories:
+            raise ValueError(f"Unknown model kind: {kind}")
+        
+        key = (kind, model_type)
+        version = self._file_version(kind, model_type)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == version:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            
+            if entry is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["reloads"] += 1
+            
+            start = time.perf_counter()
+            instance = self._factories[kind](model_type)
+            self._stats["loads"] += 1
+            self._stats["load_time_seconds"] += time.perf_counter() - start
+            
+            self._store(key, instance, version)
+            return instance
+    
+    def publish(self, kind: str, model_type: str, staged_dir: str):
+        """
+        Move model files trained into staged_dir into MODELS_DIR and serve them
+
+        Each file is swapped in with os.replace (atomic on the same
+        filesystem), so readers never see a partially written model. The
+        registry lock is held until the new instance is loaded, so requests
+        keep getting the previous model until the swap and the new one after.
+        """
+        if kind not in self._factories:
+            raise ValueError(f"Unknown model kind: {kind}")
+        
+        key = (kind, model_type)
+        with self._lock:
+            # The model file is swapped last: it holds the full pipeline
+            staged = model_file_paths(kind, model_type, staged_dir)
+            for source, target in reversed(list(zip(staged, model_file_paths(kind, model_type)))):
+                os.replace(source, target)
+            
+            start = time.perf_counter()
+            instance = self._factories[kind](model_type)
+            self._stats["loads"] += 1
+            self._stats["load_time_seconds"] += time.perf_counter() - start
+            
+            self._store(key, instance, self._file_version(kind, model_type))
+        
+        logger.info(f"Published model {kind}:{model_type}")
+        return instance
+    
+    def invalidate(self, kind: Optional[str] = None, model_type: Optional[str] = None):
+        """Drop cached entries, optionally limited to a kind and/or model type"""
+        with self._lock:
+            for key in list(self._entries):
+                if (kind is None or key[0] == kind) and (model_type is None or key[1] == model_type):
+                    del self._entries[key]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/load-time counters and the currently loaded keys"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"] + self._stats["reloads"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "loaded": [f"{kind}:{model_type}" for kind, model_type in self._entries],
+            }
+
+# Shared registry used by the API
+model_registry = ModelRegistry()
+
 # Function to get demand forecaster instance
 def get_demand_forecaster(model_type="random_forest"):
-    return DemandForecaster(model_type)
+    return model_registry.get("demand_forecaster", model_type)
 
 # Function to get staffing optimizer instance
 def get_staffing_optimizer(model_type="gradient_boosting"):
-    return StaffingOptimizer(model_type)
+    return model_registry.get("staffing_optimizer", model_type)
 
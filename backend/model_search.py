@@ -0,0 +1,212 @@
+import math
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Hyperparameter search used by model training: "grid" (every grid point),
+# "random" (TRAINING_SEARCH_ITERATIONS sampled candidates) or "halving"
+# (successive halving over sampled candidates, growing the training rows)
+SEARCH_STRATEGIES = ("grid", "random", "halving")
+TRAINING_SEARCH = os.getenv("TRAINING_SEARCH", "halving")
+TRAINING_SEARCH_ITERATIONS = int(os.getenv("TRAINING_SEARCH_ITERATIONS", "18"))
+
+# Parallel candidate fits (joblib n_jobs; -1 uses every core)
+TRAINING_N_JOBS = int(os.getenv("TRAINING_N_JOBS", "-1"))
+
+# Wall-clock budget per search in seconds (0 means no limit)
+TRAINING_TIME_BUDGET = float(os.getenv("TRAINING_TIME_BUDGET", "0"))
+
+TRAINING_CV_FOLDS = 5
+HALVING_FACTOR = 3
+HALVING_MIN_SAMPLES = 30
+
+class PreprocessedFolds:
+    """
+    Cross-validation folds with the preprocessor fitted once per fold
+
+    Each fold's preprocessor is fitted on that fold's training rows only and
+    the full training set gets its own fit for the final model. The transformed
+    arrays depend only on the features, so one instance serves every candidate
+    of every search and every target trained on the same rows.
+    """
+    def __init__(self, preprocessor, X, n_splits: int = TRAINING_CV_FOLDS):
+        start = time.perf_counter()
+        self.folds = []
+        for train_index, val_index in KFold(n_splits=n_splits).split(X):
+            fold_preprocessor = clone(preprocessor)
+            X_train = fold_preprocessor.fit_transform(X.iloc[train_index])
+            X_val = fold_preprocessor.transform(X.iloc[val_index])
+            self.folds.append((train_index, val_index, X_train, X_val))
+        self.preprocessor = clone(preprocessor).fit(X)
+        self.X = self.preprocessor.transform(X)
+        self.preprocessor_fits = n_splits + 1
+        self.seconds = time.perf_counter() - start
+        # Fixed row order per fold for halving subsamples
+        rng = np.random.default_rng(0)
+        self.subsample_orders = [rng.permutation(len(fold[0])) for fold in self.folds]
+
+def _fit_and_score(estimator, params, X_train, y_train, X_val, y_val) -> float:
+    model = clone(estimator).set_params(**params)
+    model.fit(X_train, y_train)
+    return mean_squared_error(y_val, model.predict(X_val))
+
+class _BudgetedEvaluator:
+    """Scores candidates on the cached folds in parallel batches until the deadline"""
+    def __init__(
+        self,
+        estimator,
+        folds: PreprocessedFolds,
+        y: np.ndarray,
+        n_jobs: int,
+        deadline: Optional[float],
+        planned_fits: int = 0,
+        progress: Optional[Callable[[int, int], None]] = None
+    ):
+        self.estimator = estimator
+        self.folds = folds
+        self.y = y
+        self.n_jobs = n_jobs
+        self.batch_size = max(1, effective_n_jobs(n_jobs))
+        self.deadline = deadline
+        self.planned_fits = planned_fits
+        self.progress = progress
+        self.fits = 0
+        self.budget_exhausted = False
+
+    def out_of_time(self) -> bool:
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.budget_exhausted = True
+        return self.budget_exhausted
+
+    def _tasks(self, params, n_samples: Optional[int]):
+        for (train_index, val_index, X_train, X_val), order in zip(self.folds.folds, self.folds.subsample_orders):
+            rows = order[:n_samples] if n_samples else slice(None)
+            yield delayed(_fit_and_score)(
+                self.estimator, params, X_train[rows], self.y[train_index][rows], X_val, self.y[val_index]
+            )
+
+    def evaluate(self, parallel, candidates: List[Dict[str, Any]], n_samples: Optional[int] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """Mean validation MSE per candidate (candidates past the deadline are left out)"""
+        scored = []
+        for start in range(0, len(candidates), self.batch_size):
+            if self.out_of_time():
+                break
+            batch = candidates[start:start + self.batch_size]
+            scores = parallel(task for params in batch for task in self._tasks(params, n_samples))
+            self.fits += len(scores)
+            if self.progress is not None:
+                self.progress(self.fits, self.planned_fits)
+            n_folds = len(self.folds.folds)
+            for i, params in enumerate(batch):
+                scored.append((params, float(np.mean(scores[i * n_folds:(i + 1) * n_folds]))))
+        return scored
+
+def _halving_rungs(n_candidates: int, n_rows: int) -> List[int]:
+    """Training rows per fold for each rung, ending at the full fold"""
+    n_rungs = 1 + int(math.floor(math.log(max(n_candidates, 1), HALVING_FACTOR)))
+    while n_rungs > 1 and n_rows / HALVING_FACTOR ** (n_rungs - 1) < HALVING_MIN_SAMPLES:
+        n_rungs -= 1
+    return [int(math.ceil(n_rows / HALVING_FACTOR ** (n_rungs - 1 - k))) for k in range(n_rungs)]
+
+def _halving_survivors(n_candidates: int, n_rungs: int) -> List[int]:
+    """Candidates evaluated at each rung"""
+    survivors = [n_candidates]
+    for _ in range(n_rungs - 1):
+        survivors.append(max(1, math.ceil(survivors[-1] / HALVING_FACTOR)))
+    return survivors
+
+def search_hyperparameters(
+    estimator,
+    param_grid: Dict[str, List[Any]],
+    param_distributions: Dict[str, Any],
+    folds: PreprocessedFolds,
+    y,
+    strategy: Optional[str] = None,
+    n_iter: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    n_jobs: Optional[int] = None,
+    random_state: int = 42,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Pick hyperparameters for estimator by cross-validated MSE on cached folds
+
+    Returns (best_params, report). The report holds the strategy, candidates
+    and fits evaluated, the best cross-validated MSE and the wall-clock time.
+    The time budget is checked between parallel batches, so a search can
+    overrun it by one batch; when it runs out, the best candidate among those
+    scored on the most training rows so far is returned. progress, if given,
+    is called after every batch with (fits done, fits planned).
+    """
+    strategy = strategy or TRAINING_SEARCH
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown search strategy: {strategy}")
+    n_iter = n_iter or TRAINING_SEARCH_ITERATIONS
+    time_budget = TRAINING_TIME_BUDGET if time_budget is None else time_budget
+    n_jobs = TRAINING_N_JOBS if n_jobs is None else n_jobs
+
+    start = time.perf_counter()
+    deadline = start + time_budget if time_budget and time_budget > 0 else None
+
+    if strategy == "grid":
+        candidates = list(ParameterGrid(param_grid))
+    else:
+        candidates = list(ParameterSampler(param_distributions, n_iter=n_iter, random_state=random_state))
+
+    if strategy == "halving":
+        rung_rows = _halving_rungs(len(candidates), min(len(fold[0]) for fold in folds.folds))
+        planned_candidates = sum(_halving_survivors(len(candidates), len(rung_rows)))
+    else:
+        planned_candidates = len(candidates)
+    evaluator = _BudgetedEvaluator(estimator, folds, np.asarray(y), n_jobs, deadline,
+                                   planned_candidates * len(folds.folds), progress)
+
+    rungs = []
+    with Parallel(n_jobs=n_jobs) as parallel:
+        if strategy == "halving":
+            remaining = candidates
+            for n_samples in rung_rows:
+                scored = evaluator.evaluate(parallel, remaining, n_samples)
+                if not scored:
+                    break
+                rungs.append({"candidates": len(remaining), "evaluated": len(scored),
+                              "train_rows": n_samples, "scored": scored})
+                if evaluator.budget_exhausted:
+                    break
+                scored.sort(key=lambda item: item[1])
+                remaining = [params for params, _ in scored[:max(1, math.ceil(len(scored) / HALVING_FACTOR))]]
+        else:
+            scored = evaluator.evaluate(parallel, candidates)
+            if scored:
+                rungs.append({"candidates": len(candidates), "evaluated": len(scored),
+                              "train_rows": None, "scored": scored})
+
+    if not rungs:
+        raise ValueError("Time budget too small to evaluate any candidate")
+    best_params, best_mse = min(rungs[-1]["scored"], key=lambda item: item[1])
+    seconds = time.perf_counter() - start
+
+    report = {
+        "strategy": strategy,
+        "candidates": len(candidates),
+        "candidates_evaluated": len(rungs[0]["scored"]),
+        "fits": evaluator.fits,
+        "n_jobs": effective_n_jobs(n_jobs),
+        "best_params": best_params,
+        "best_cv_mse": best_mse,
+        "seconds": round(seconds, 3),
+        "budget_exhausted": evaluator.budget_exhausted,
+    }
+    if strategy == "halving":
+        report["rungs"] = [{key: value for key, value in rung.items() if key != "scored"} for rung in rungs]
+    logger.info(f"{strategy} search: {report['fits']} fits in {report['seconds']}s, best CV MSE {best_mse:.2f}")
+    return best_params, report
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 from enum import Enum
 
@@ -85,9 +85,62 @@ class Scenario(BaseModel):
     operationalHours: Optional[OperationalHours] = None
     efficiencyDrivers: Optional[EfficiencyDrivers] = None
     totals: Optional[Totals] = None
+    owner_id: Optional[int] = None
     createdAt: Optional[datetime] = Field(default_factory=datetime.now)
     updatedAt: Optional[datetime] = Field(default_factory=datetime.now)
 
+# Lightweight scenario projection (see the fields= option of GET /scenarios/)
+class ScenarioSummary(BaseModel):
+    id: str
+    name: Optional[str] = None
+    brand: Optional[str] = None
+    outlet: Optional[str] = None
+    totals: Optional[Totals] = None
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
+
+# One page of scenarios with the cursor for the next page
+class ScenarioPage(BaseModel):
+    items: List[Union[Scenario, ScenarioSummary]]
+    nextCursor: Optional[str] = None
+
+# Bulk import report (see POST /scenarios/import)
+class BulkImportError(BaseModel):
+    row: int
+    id: Optional[str] = None
+    error: str
+
+class BulkImportResult(BaseModel):
+    received: int
+    imported: int
+    skipped: int
+    failed: int
+    chunks: int
+    rowsWritten: Dict[str, int] = {}
+    validateSeconds: float
+    insertSeconds: float
+    elapsedSeconds: float
+    rowsPerSecond: Optional[float] = None
+    errors: List[BulkImportError] = []
+    errorsTruncated: bool = False
+
+# Background model training job
+class TrainingJobStatus(BaseModel):
+    id: str
+    kind: str
+    modelType: str
+    status: str
+    progress: float
+    stage: str
+    rows: int
+    options: Dict[str, Any] = {}
+    submittedAt: float
+    startedAt: Optional[float] = None
+    finishedAt: Optional[float] = None
+    logs: List[str] = []
+    metrics: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
 # Parameter models for calculations
 class StaffingParams(BaseModel):
     spaceParameters: SpaceParameters
@@ -95,6 +148,10 @@ class StaffingParams(BaseModel):
     efficiencyDrivers: EfficiencyDrivers
     operationalHours: OperationalHours
 
+class StaffingSweepParams(BaseModel):
+    base: StaffingParams
+    grid: Dict[str, List[Union[float, str]]] = {}  # flattened field -> values, swept as a cartesian product
+
 class RevenueParams(BaseModel):
     projectionPeriod: ProjectionPeriod
     projectionLength: int
@@ -107,6 +164,9 @@ class RevenueParams(BaseModel):
     brand: Optional[str] = None
     outlet: Optional[str] = None
 
+class RevenuePortfolioParams(BaseModel):
+    outlets: List[RevenueParams]  # must share projectionPeriod and projectionLength
+
 class PLParams(BaseModel):
     timeframe: str
     selectedMonth: str
@@ -130,6 +190,10 @@ class PeakHourParams(BaseModel):
     applyRamadan: bool = False
     brand: Optional[str] = None
     outlet: Optional[str] = None
+    seed: Optional[int] = None  # defaults to a seed derived from the other parameters
+    startHour: int = 8
+    endHour: int = 24  # exclusive
+    slotMinutes: int = 60  # 15, 30 or 60
 
 class OptimizationParams(BaseModel):
     scenario_id: str
@@ -138,7 +202,52 @@ class OptimizationParams(BaseModel):
 
 class WhatIfParams(BaseModel):
     baseScenarioId: str
-    changes: Dict[str, Any]
+    changes: Dict[str, Any]  # in distribution mode values may be [low, high] or {"distribution": ...}
+    mode: str = "deterministic"  # "deterministic" or "distribution"
+    samples: int = 10000
+    seed: Optional[int] = None  # defaults to a seed derived from the other parameters
+    bins: int = 50  # histogram bins
+
+class SensitivityParams(BaseModel):
+    baseScenarioId: str
+    base: Dict[str, float] = {}  # overrides for base driver values
+    drivers: List[str] = []  # defaults to every supported driver
+    steps: List[float] = [-20, -10, -5, 5, 10, 20]  # percentage changes, one driver at a time
+    pairwise: bool = True
+    pairSteps: List[float] = [-10, -5, 5, 10]  # percentage changes on each axis of the pair grids
+    metric: str = "profit"  # metric ranked in the tornado and shown in pair grids
+    timeBudget: Optional[float] = None  # seconds
+
+class ShiftEmployee(BaseModel):
+    id: str
+    role: str  # "FOH" or "BOH"
+    maxWeeklyHours: Optional[float] = None  # defaults to ShiftScheduleParams.maxWeeklyHours
+
+class Shift(BaseModel):
+    day: str
+    role: str
+    start: str  # "HH:MM"
+    end: str
+    breakStart: Optional[str] = None  # set for split shifts
+    breakEnd: Optional[str] = None
+    paidHours: float
+    employeeId: Optional[str] = None  # None when no employee could take the shift
+
+class ShiftScheduleParams(BaseModel):
+    heatmapData: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None  # as returned by /calculations/peak-hours
+    peakHours: Optional[PeakHourParams] = None  # demand source when heatmapData is not given
+    staff: List[ShiftEmployee] = []
+    headcount: Dict[str, int] = {}  # role -> employees, used when staff is empty
+    minShiftHours: float = 4
+    maxShiftHours: float = 8
+    allowSplitShifts: bool = True
+    minBreakHours: float = 2  # unpaid gap inside a split shift
+    maxDailyHours: float = 10
+    maxWeeklyHours: float = 48
+    maxDaysPerWeek: int = 6
+    splitShiftPenaltyHours: float = 0.5  # cost of a split shift in paid-hour terms
+    previousSchedule: List[Shift] = []  # last week's shifts, used as a warm start
+    timeLimit: Optional[float] = None
 
 # Result models
 class StaffingResult(BaseModel):
@@ -149,6 +258,16 @@ class StaffingResult(BaseModel):
     staffingStructure: Dict[str, Any]
     recommendations: List[str]
 
+class StaffingSweepResult(BaseModel):
+    count: int
+    parameters: Dict[str, List[Any]]  # swept field values, one entry per parameter set
+    fohStaff: Dict[str, List[int]]
+    bohStaff: Dict[str, List[int]]
+    totalStaff: List[int]
+    fohLaborCost: List[float]
+    bohLaborCost: List[float]
+    laborCost: List[float]
+
 class RevenueResult(BaseModel):
     periods: List[str]
     projections: Dict[str, List[float]]
@@ -156,6 +275,16 @@ class RevenueResult(BaseModel):
     insights: List[str]
     optimizationOpportunities: List[str]
 
+class RevenuePortfolioResult(BaseModel):
+    periods: List[str]
+    outlets: List[str]
+    days: List[int]  # calendar days in each period
+    food: List[List[float]]  # period x outlet
+    beverage: List[List[float]]
+    total: List[List[float]]
+    periodTotals: List[float]
+    outletTotals: List[float]
+
 class PLResult(BaseModel):
     plData: Dict[str, Any]
     historicalData: Dict[str, Any]
@@ -173,12 +302,41 @@ class OptimizationResult(BaseModel):
     optimizedScenario: Dict[str, Any]
     improvements: Dict[str, Any]
     recommendations: List[str]
+    solver: Dict[str, Any] = {}  # status, solveTime, optimalityGap, ...
+
+class SensitivityResult(BaseModel):
+    baseScenario: Dict[str, Any]
+    baseMetrics: Dict[str, float]
+    metric: str
+    tornado: List[Dict[str, Any]]  # sorted by swing, largest first
+    elasticity: Dict[str, Dict[str, Optional[float]]]  # driver -> metric -> elasticity
+    oneAtATime: Dict[str, Dict[str, Any]]
+    pairwise: Dict[str, Dict[str, Any]]  # "driverA|driverB" -> grid of the metric
+    runtime: Dict[str, Any]
+
+class ShiftScheduleResult(BaseModel):
+    shifts: List[Shift]
+    coverage: Dict[str, Dict[str, Dict[str, int]]]  # day -> slot -> required/scheduled per role
+    summary: Dict[str, Any]
+    solver: Dict[str, Any]
+    warmStart: Dict[str, Any]
 
 class WhatIfResult(BaseModel):
     baseScenario: Dict[str, Any]
     modifiedScenario: Dict[str, Any]
     impact: Dict[str, Any]
     insights: List[str]
+    distribution: Optional[Dict[str, Any]] = None  # percentiles and histograms in distribution mode
+
+class BatchItemResult(BaseModel):
+    index: int  # position of the item in the request
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
 
 class ComparisonResult(BaseModel):
     scenarios: List[Dict[str, Any]]
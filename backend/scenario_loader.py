@@ -0,0 +1,56 @@
+from typing import Dict, List
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
+from models import Scenario
+from database import get_db, get_scenarios_by_ids
+from auth import User, get_current_active_user
+
+class ScenarioLoader:
+    """
+    Request-scoped scenario loader
+
+    Fetches every requested scenario with one IN query, checks access for the
+    whole set at once and keeps the loaded scenarios for the rest of the request.
+    """
+    def __init__(self, db: Session, user: User):
+        self.db = db
+        self.user = user
+        self.queries = 0
+        self._scenarios: Dict[str, Scenario] = {}
+
+    async def load_many(self, scenario_ids: List[str]) -> List[Scenario]:
+        """
+        Scenarios in the requested order
+
+        Raises 404 naming every missing ID, then 403 naming every scenario the
+        user may not access.
+        """
+        pending = [scenario_id for scenario_id in dict.fromkeys(scenario_ids) if scenario_id not in self._scenarios]
+        if pending:
+            self._scenarios.update(await get_scenarios_by_ids(self.db, pending))
+            self.queries += 1
+
+        missing = [scenario_id for scenario_id in dict.fromkeys(scenario_ids) if scenario_id not in self._scenarios]
+        if len(missing) == 1:
+            raise HTTPException(status_code=404, detail=f"Scenario with ID {missing[0]} not found")
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Scenarios not found: {', '.join(missing)}")
+
+        scenarios = [self._scenarios[scenario_id] for scenario_id in scenario_ids]
+        if not self.user.is_superuser:
+            forbidden = list(dict.fromkeys(s.id for s in scenarios if s.owner_id != self.user.id))
+            if len(forbidden) == 1:
+                raise HTTPException(status_code=403, detail=f"Not authorized to access scenario {forbidden[0]}")
+            if forbidden:
+                raise HTTPException(status_code=403, detail=f"Not authorized to access scenarios: {', '.join(forbidden)}")
+        return scenarios
+
+    async def load(self, scenario_id: str) -> Scenario:
+        return (await self.load_many([scenario_id]))[0]
+
+# Dependency giving each request its own loader (FastAPI shares it within the request)
+async def get_scenario_loader(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> ScenarioLoader:
+    return ScenarioLoader(db, current_user)
@@ -0,0 +1,413 @@
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from models import (
+    PeakHourParams,
+    Shift,
+    ShiftScheduleParams,
+    ShiftScheduleResult
+)
+from calculations import analyze_peak_hours, PEAK_HOUR_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Solver time budget (seconds) and relative optimality gap at which to stop
+SCHEDULER_TIME_LIMIT = float(os.getenv("SCHEDULER_TIME_LIMIT", "5"))
+SCHEDULER_MIP_GAP = float(os.getenv("SCHEDULER_MIP_GAP", "0.001"))
+
+# Roles scheduled and the heatmap field holding each role's demand
+SHIFT_ROLES = {"FOH": "foh", "BOH": "boh"}
+
+# Cost of one uncovered staff-hour, in paid hours (keeps the model feasible when
+# demand exceeds headcount)
+UNDERSTAFFING_PENALTY_HOURS = 100
+
+# Objective bonus per shift that repeats last week's pattern (tie-break only)
+WARM_START_REUSE_BONUS = 0.001
+
+def _label_minutes(label: str) -> int:
+    """Minutes after midnight for a heatmap slot label ("8" or "8:15")"""
+    hour, _, minute = str(label).partition(":")
+    return int(hour) * 60 + int(minute or 0)
+
+def _format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def demand_grid(params: ShiftScheduleParams) -> Dict[str, Any]:
+    """
+    Slot start times, labels and (days x slots) demand per role
+
+    Demand comes from params.heatmapData, or from analyze_peak_hours for
+    params.peakHours when no heatmap is given. Missing days have no demand.
+    """
+    heatmap = params.heatmapData
+    if heatmap is None:
+        heatmap = analyze_peak_hours(params.peakHours or PeakHourParams()).heatmapData
+
+    labels = sorted({label for day in heatmap.values() for label in day}, key=_label_minutes)
+    if not labels:
+        raise ValueError("heatmapData has no slots")
+    minutes = np.array([_label_minutes(label) for label in labels])
+    steps = np.diff(minutes)
+    slot_minutes = int(steps.min()) if steps.size else 60
+    if slot_minutes <= 0 or np.any(steps % slot_minutes):
+        raise ValueError("heatmapData slots must be evenly spaced")
+
+    # Fill gaps so every slot of the operating window is present
+    minutes = np.arange(minutes[0], minutes[-1] + slot_minutes, slot_minutes)
+    by_minutes = {_label_minutes(label): label for label in labels}
+
+    demand = {}
+    for role, field in SHIFT_ROLES.items():
+        grid = np.zeros((len(PEAK_HOUR_DAYS), minutes.size), dtype=np.int64)
+        for d, day in enumerate(PEAK_HOUR_DAYS):
+            cells = heatmap.get(day, {})
+            for t, minute in enumerate(minutes):
+                cell = cells.get(by_minutes.get(minute))
+                if cell is None and minute % 60 == 0:
+                    cell = cells.get(str(minute // 60))
+                grid[d, t] = int(cell.get(field, 0)) if cell else 0
+        demand[role] = grid
+
+    return {
+        "minutes": minutes,
+        "labels": [by_minutes.get(minute, _format_minutes(minute)) for minute in minutes],
+        "slotMinutes": slot_minutes,
+        "demand": demand,
+    }
+
+def shift_patterns(slots: int, slot_minutes: int, params: ShiftScheduleParams) -> Dict[str, np.ndarray]:
+    """
+    Candidate daily shift patterns over the operating window
+
+    Single shifts last minShiftHours..maxShiftHours. Split shifts are two blocks
+    of at least half the minimum shift with an unpaid break of at least
+    minBreakHours and at most maxDailyHours paid in total. Starts and lengths
+    are whole hours (or whole slots when slots are longer than an hour).
+    """
+    step = max(1, 60 // slot_minutes)
+    slot_hours = slot_minutes / 60
+
+    def slots_for(hours: float) -> int:
+        return int(np.ceil(hours / slot_hours / step - 1e-9)) * step
+
+    min_length = max(step, slots_for(params.minShiftHours))
+    max_length = min(slots, int(params.maxShiftHours / slot_hours) // step * step)
+    max_daily = int(params.maxDailyHours / slot_hours)
+    if min_length > max_length:
+        raise ValueError("minShiftHours must not exceed maxShiftHours or the operating window")
+
+    patterns: List[Tuple[int, int, int, int]] = []  # (start, length, break start, break length)
+    for length in range(min_length, max_length + 1, step):
+        for start in range(0, slots - length + 1, step):
+            patterns.append((start, length, 0, 0))
+
+    if params.allowSplitShifts:
+        min_block = max(step, slots_for(params.minShiftHours / 2))
+        min_gap = max(step, slots_for(params.minBreakHours))
+        for first in range(min_block, max_length + 1, step):
+            for second in range(min_block, max_length + 1, step):
+                if first + second < min_length or first + second > max_daily:
+                    continue
+                for start in range(0, slots - first - min_gap - second + 1, step):
+                    for gap in range(min_gap, slots - start - first - second + 1, step):
+                        patterns.append((start, first, start + first, gap))
+
+    table = np.array(patterns, dtype=np.int64)
+    start, length, break_start, break_length = table.T
+    t = np.arange(slots)
+    end = start + length + break_length
+    coverage = (t[None, :] >= start[:, None]) & (t[None, :] < end[:, None])
+    coverage &= ~((t[None, :] >= break_start[:, None]) & (t[None, :] < (break_start + break_length)[:, None]))
+    return {
+        "start": start,
+        "end": end,
+        "breakStart": break_start,
+        "breakEnd": break_start + break_length,
+        "split": break_length > 0,
+        "coverage": coverage,
+        "paidHours": coverage.sum(axis=1) * slot_hours,
+    }
+
+def _employees(params: ShiftScheduleParams) -> Dict[str, List[Dict[str, Any]]]:
+    """Employees by role, from params.staff or generated from params.headcount"""
+    by_role = {role: [] for role in SHIFT_ROLES}
+    if params.staff:
+        for employee in params.staff:
+            role = employee.role.upper()
+            if role not in by_role:
+                raise ValueError(f"Unknown role for employee {employee.id}: {employee.role}")
+            by_role[role].append({
+                "id": employee.id,
+                "maxWeeklyHours": employee.maxWeeklyHours or params.maxWeeklyHours,
+            })
+    else:
+        for role, count in params.headcount.items():
+            if role.upper() not in by_role:
+                raise ValueError(f"Unknown role in headcount: {role}")
+            by_role[role.upper()] += [
+                {"id": f"{role.upper()}-{i + 1}", "maxWeeklyHours": params.maxWeeklyHours} for i in range(count)
+            ]
+    if not any(by_role.values()):
+        raise ValueError("Provide staff or headcount")
+    return by_role
+
+def _pattern_keys(patterns: Dict[str, np.ndarray], minutes: np.ndarray, slot_minutes: int) -> Dict[tuple, int]:
+    """Pattern index by (start, end, break start, break end) as "HH:MM" strings"""
+    opening = int(minutes[0])
+    def label(slot):
+        return _format_minutes(opening + int(slot) * slot_minutes)
+    keys = {}
+    for p in range(patterns["start"].size):
+        split = patterns["split"][p]
+        keys[(
+            label(patterns["start"][p]),
+            label(patterns["end"][p]),
+            label(patterns["breakStart"][p]) if split else None,
+            label(patterns["breakEnd"][p]) if split else None,
+        )] = p
+    return keys
+
+def build_shift_schedule(params: ShiftScheduleParams) -> ShiftScheduleResult:
+    """
+    Weekly shift schedule covering the heatmap demand with the fewest paid hours
+
+    Shift counts per (role, day, pattern) come from one integer program solved
+    with HiGHS (scipy.optimize.milp); shifts are then assigned to employees
+    within their weekly hour and day limits. A previous schedule warm-starts the
+    solve: when it is still feasible its cost bounds the search, and shifts and
+    employees are kept where the optimum allows.
+    """
+    try:
+        from scipy.optimize import milp, LinearConstraint, Bounds
+        from scipy import sparse
+    except ImportError as e:
+        raise RuntimeError("Shift scheduling requires scipy") from e
+
+    grid = demand_grid(params)
+    minutes, slot_minutes, demand = grid["minutes"], grid["slotMinutes"], grid["demand"]
+    slot_hours = slot_minutes / 60
+    patterns = shift_patterns(minutes.size, slot_minutes, params)
+    employees = _employees(params)
+
+    roles = list(SHIFT_ROLES)
+    days = len(PEAK_HOUR_DAYS)
+    n_patterns, n_slots = patterns["coverage"].shape
+    blocks = len(roles) * days  # one (role, day) block of pattern counts each
+    n_x = blocks * n_patterns
+    n_short = blocks * n_slots
+
+    # Previous week's shifts as pattern counts per (role, day)
+    keys = _pattern_keys(patterns, minutes, slot_minutes)
+    previous = np.zeros((len(roles), days, n_patterns))
+    previous_matched = 0
+    day_index = {day: d for d, day in enumerate(PEAK_HOUR_DAYS)}
+    for shift in params.previousSchedule:
+        p = keys.get((shift.start, shift.end, shift.breakStart, shift.breakEnd))
+        role = shift.role.upper()
+        if p is None or role not in SHIFT_ROLES or shift.day not in day_index:
+            continue
+        previous[roles.index(role), day_index[shift.day], p] += 1
+        previous_matched += 1
+
+    # Objective: paid hours, split shift penalty, understaffing penalty, reuse bonus
+    pattern_cost = patterns["paidHours"] + patterns["split"] * params.splitShiftPenaltyHours
+    c_x = np.tile(pattern_cost, blocks) - WARM_START_REUSE_BONUS * (previous.reshape(-1) > 0)
+    c = np.concatenate([c_x, np.full(n_short, UNDERSTAFFING_PENALTY_HOURS * slot_hours)])
+
+    headcount = np.array([len(employees[role]) for role in roles])
+    weekly_hours = np.array([sum(e["maxWeeklyHours"] for e in employees[role]) for role in roles])
+    required = np.concatenate([demand[role].reshape(-1) for role in roles]).astype(float)
+
+    # Coverage rows: shifts covering each (role, day, slot) plus shortfall >= demand
+    coverage_block = sparse.csr_matrix(patterns["coverage"].T.astype(float))
+    cover = sparse.hstack([sparse.block_diag([coverage_block] * blocks), sparse.identity(n_short)])
+
+    # One shift per employee per day
+    daily = sparse.hstack([sparse.kron(sparse.identity(blocks), np.ones((1, n_patterns))), sparse.csr_matrix((blocks, n_short))])
+    daily_limit = np.repeat(headcount, days).astype(float)
+
+    # Weekly paid hours and shifts per role
+    role_rows = sparse.kron(sparse.identity(len(roles)), np.ones((1, days)))
+    weekly = sparse.hstack([sparse.kron(role_rows, patterns["paidHours"][None, :]), sparse.csr_matrix((len(roles), n_short))])
+    shifts = sparse.hstack([sparse.kron(role_rows, np.ones((1, n_patterns))), sparse.csr_matrix((len(roles), n_short))])
+
+    rows = [cover, daily, weekly, shifts]
+    lower = [required, np.full(blocks, -np.inf), np.full(len(roles), -np.inf), np.full(len(roles), -np.inf)]
+    upper = [np.full(required.size, np.inf), daily_limit, weekly_hours.astype(float), (headcount * params.maxDaysPerWeek).astype(float)]
+
+    # Warm start: last week's schedule, if still feasible, bounds the objective
+    warm_start = {"used": False, "previousShifts": len(params.previousSchedule), "matchedShifts": previous_matched}
+    if previous_matched:
+        previous_x = previous.reshape(-1)
+        covered = coverage_block @ previous.reshape(blocks, n_patterns).T
+        previous_short = np.maximum(0, required - covered.T.reshape(-1))
+        previous_vars = np.concatenate([previous_x, previous_short])
+        feasible = all(
+            np.all(block @ previous_vars <= hi + 1e-9) for block, hi in zip(rows[1:], upper[1:])
+        )
+        warm_start["previousObjective"] = float(c @ previous_vars)
+        warm_start["previousFeasible"] = bool(feasible)
+        if feasible:
+            rows.append(sparse.csr_matrix(c[None, :]))
+            lower.append(np.array([-np.inf]))
+            upper.append(np.array([warm_start["previousObjective"] + 1e-6]))
+            warm_start["used"] = True
+
+    time_limit = params.timeLimit or SCHEDULER_TIME_LIMIT
+    start = time.perf_counter()
+    result = milp(
+        c,
+        constraints=LinearConstraint(sparse.vstack(rows).tocsr(), np.concatenate(lower), np.concatenate(upper)),
+        integrality=np.concatenate([np.ones(n_x), np.zeros(n_short)]),
+        bounds=Bounds(
+            np.zeros(n_x + n_short),
+            np.concatenate([np.repeat(headcount, days * n_patterns).astype(float), required])
+        ),
+        options={"time_limit": time_limit, "mip_rel_gap": SCHEDULER_MIP_GAP}
+    )
+    solve_time = time.perf_counter() - start
+    if result.x is None:
+        if result.status == 2:
+            raise ValueError("Staff limits leave no feasible schedule")
+        raise ValueError(f"No schedule found within {time_limit}s: {result.message}")
+
+    counts = np.rint(result.x[:n_x]).astype(np.int64).reshape(len(roles), days, n_patterns)
+    shifts_out, assignment = _assign_shifts(counts, patterns, minutes, slot_minutes, employees, params)
+
+    # Coverage per slot and summary
+    scheduled = np.einsum("rdp,pt->rdt", counts, patterns["coverage"].astype(np.int64))
+    coverage = {
+        day: {
+            label: {
+                **{SHIFT_ROLES[role]: int(demand[role][d, t]) for role in roles},
+                **{f"{SHIFT_ROLES[role]}Scheduled": int(scheduled[r, d, t]) for r, role in enumerate(roles)},
+            }
+            for t, label in enumerate(grid["labels"])
+        }
+        for d, day in enumerate(PEAK_HOUR_DAYS)
+    }
+    required_grid = np.stack([demand[role] for role in roles])
+    paid_hours = float((counts * patterns["paidHours"]).sum())
+    required_hours = float(required_grid.sum() * slot_hours)
+    summary = {
+        "paidHours": paid_hours,
+        "shifts": int(counts.sum()),
+        "splitShifts": int((counts * patterns["split"]).sum()),
+        "requiredStaffHours": required_hours,
+        "understaffedStaffHours": float(np.maximum(0, required_grid - scheduled).sum() * slot_hours),
+        "overstaffedStaffHours": float(np.maximum(0, scheduled - required_grid).sum() * slot_hours),
+        "utilization": required_hours / paid_hours if paid_hours else 0.0,
+        "employees": int(headcount.sum()),
+        "employeesScheduled": assignment["employeesScheduled"],
+        "unassignedShifts": assignment["unassigned"],
+        "keptAssignments": assignment["kept"],
+    }
+
+    return ShiftScheduleResult.construct(
+        shifts=shifts_out,
+        coverage=coverage,
+        summary=summary,
+        solver={
+            "solver": "HiGHS (scipy.optimize.milp)",
+            "status": "optimal" if result.status == 0 else "time_limit",
+            "solveTime": solve_time,
+            "timeLimit": time_limit,
+            "optimalityGap": float(getattr(result, "mip_gap", 0.0) or 0.0),
+            "objective": float(result.fun),
+            "bound": float(getattr(result, "mip_dual_bound", result.fun)),
+            "nodes": int(getattr(result, "mip_node_count", 0) or 0),
+            "variables": n_x + n_short,
+            "patterns": n_patterns,
+        },
+        warmStart=warm_start
+    )
+
+def _assign_shifts(
+    counts: np.ndarray,
+    patterns: Dict[str, np.ndarray],
+    minutes: np.ndarray,
+    slot_minutes: int,
+    employees: Dict[str, List[Dict[str, Any]]],
+    params: ShiftScheduleParams
+):
+    """
+    Assign solved shifts to employees
+
+    Longest shifts go first. Each shift goes to an employee with the fewest days
+    worked so far (so day limits do not strand shifts late in the week),
+    preferring whoever worked the same shift (then the same day) last week, then
+    the fewest hours, within maxWeeklyHours and maxDaysPerWeek. Shifts nobody can take are
+    returned with employeeId None.
+    """
+    opening = int(minutes[0])
+    def label(slot):
+        return _format_minutes(opening + int(slot) * slot_minutes)
+
+    previous_shift = {}
+    previous_day = set()
+    for shift in params.previousSchedule:
+        if shift.employeeId:
+            previous_shift.setdefault((shift.role.upper(), shift.day, shift.start, shift.end, shift.breakStart), set()).add(shift.employeeId)
+            previous_day.add((shift.employeeId, shift.day))
+
+    hours = {e["id"]: 0.0 for role_employees in employees.values() for e in role_employees}
+    days_worked = {employee_id: 0 for employee_id in hours}
+    shifts = []
+    unassigned = kept = 0
+
+    for d, day in enumerate(PEAK_HOUR_DAYS):
+        for r, role in enumerate(SHIFT_ROLES):
+            working = set()
+            day_patterns = np.flatnonzero(counts[r, d])
+            for p in sorted(day_patterns, key=lambda p: -patterns["paidHours"][p]):
+                split = bool(patterns["split"][p])
+                start, end = label(patterns["start"][p]), label(patterns["end"][p])
+                break_start = label(patterns["breakStart"][p]) if split else None
+                break_end = label(patterns["breakEnd"][p]) if split else None
+                paid = float(patterns["paidHours"][p])
+                same_shift = previous_shift.get((role, day, start, end, break_start), set())
+
+                for _ in range(int(counts[r, d, p])):
+                    candidates = [
+                        e for e in employees[role]
+                        if e["id"] not in working
+                        and hours[e["id"]] + paid <= e["maxWeeklyHours"] + 1e-9
+                        and days_worked[e["id"]] < params.maxDaysPerWeek
+                    ]
+                    employee_id = None
+                    if candidates:
+                        best = min(candidates, key=lambda e: (
+                            days_worked[e["id"]],
+                            e["id"] not in same_shift,
+                            (e["id"], day) not in previous_day,
+                            hours[e["id"]],
+                        ))
+                        employee_id = best["id"]
+                        working.add(employee_id)
+                        hours[employee_id] += paid
+                        days_worked[employee_id] += 1
+                        kept += employee_id in same_shift
+                    else:
+                        unassigned += 1
+
+                    shifts.append(Shift.construct(
+                        day=day,
+                        role=role,
+                        start=start,
+                        end=end,
+                        breakStart=break_start,
+                        breakEnd=break_end,
+                        paidHours=paid,
+                        employeeId=employee_id
+                    ))
+
+    return shifts, {
+        "employeesScheduled": sum(1 for value in days_worked.values() if value),
+        "unassigned": unassigned,
+        "kept": kept,
+    }
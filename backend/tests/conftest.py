@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# The backend modules read their configuration at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ["MODELS_DIR"] = tempfile.mkdtemp()
+os.environ["SCENARIO_STORAGE"] = "relational"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
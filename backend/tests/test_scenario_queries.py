@@ -0,0 +1,79 @@
+"""
+Scenario reads and updates must issue a fixed number of queries, however
+many scenarios (and positions/parameter rows) are stored.
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import database
+from models import Scenario
+
+def sample_scenario(index: int) -> Scenario:
+    return Scenario.parse_obj({
+        "id": f"scenario-{index}",
+        "name": f"Scenario {index}",
+        "brand": "brand",
+        "outlet": f"outlet-{index}",
+        "fohPositions": [
+            {"id": "waiter", "title": "Waiter", "salary": 3500, "department": "FOH", "level": 2, "count": 8},
+            {"id": "runner", "title": "Runner", "salary": 3000, "department": "FOH", "level": 3, "count": 4},
+        ],
+        "bohPositions": [
+            {"id": "chef", "title": "Chef", "salary": 10000, "department": "BOH", "level": 0, "count": 1},
+            {"id": "line-cook", "title": "Line Cook", "salary": 4500, "department": "BOH", "level": 2, "count": 4},
+        ],
+        "spaceParameters": {"totalArea": 400, "fohPercentage": 65, "areaPerCover": "1.67", "externalSeating": 20},
+        "serviceParameters": {"coversPerWaiter": "20", "runnerRatio": "50", "kitchenStations": 5,
+                              "serviceStyle": "casual"},
+        "revenueDrivers": {"avgSpending": 120, "dwellingTime": 75, "tableTurnTime": 90, "peakFactor": 1.5,
+                           "dailyCovers": 250},
+        "operationalHours": {"operatingDays": 30, "dailyHours": 14, "ramadanAdjustment": False},
+        "efficiencyDrivers": {"staffUtilization": 85, "techImpact": 10, "crossTraining": 15,
+                              "seasonalityFactor": 1.0},
+    })
+
+class SelectCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.count += 1
+
+def count_selects(counter, func, *args):
+    before = counter.count
+    func(*args)
+    return counter.count - before
+
+def selects_per_operation(tmp_path, scenarios: int):
+    """SELECT counts for each scenario operation against a database holding `scenarios` scenarios"""
+    engine = create_engine(f"sqlite:///{tmp_path / f'scenarios-{scenarios}.db'}")
+    database.Base.metadata.create_all(engine)
+    db = sessionmaker(autoflush=False, bind=engine)()
+    try:
+        for i in range(scenarios):
+            database.save_scenario.sync(db, sample_scenario(i))
+        db.expunge_all()
+
+        counter = SelectCounter(engine)
+        counts = {}
+        counts["get_scenarios"] = count_selects(counter, database.get_scenarios.sync, db)
+        db.expunge_all()
+        counts["get_scenario_by_id"] = count_selects(counter, database.get_scenario_by_id.sync, db, "scenario-0")
+        db.expunge_all()
+        updated = sample_scenario(0)
+        updated.name = "Renamed"
+        updated.fohPositions[0].salary += 100
+        counts["update_scenario"] = count_selects(counter, database.update_scenario.sync, db, updated)
+        return counts
+    finally:
+        db.close()
+        engine.dispose()
+
+def test_scenario_query_count_is_constant(tmp_path):
+    one = selects_per_operation(tmp_path, 1)
+    many = selects_per_operation(tmp_path, 50)
+    assert one == many
+    # The whole graph is loaded in a fixed handful of queries, not one per row
+    assert one["get_scenarios"] <= 3
@@ -0,0 +1,358 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+import pandas as pd
+
+from executors import ExecutorSaturated
+from ml_models import MODEL_CLASSES, MODELS_DIR, model_registry, train_model
+
+logger = logging.getLogger(__name__)
+
+# Training jobs run at the same time (each in its own process)
+TRAINING_JOB_WORKERS = int(os.getenv("TRAINING_JOB_WORKERS", "1"))
+
+# Jobs waiting for a worker before submissions are rejected with 429
+TRAINING_JOB_QUEUE_SIZE = int(os.getenv("TRAINING_JOB_QUEUE_SIZE", "4"))
+
+# Finished jobs kept for status polling
+TRAINING_JOB_HISTORY = int(os.getenv("TRAINING_JOB_HISTORY", "50"))
+
+# Log lines kept per job
+TRAINING_JOB_LOG_LINES = int(os.getenv("TRAINING_JOB_LOG_LINES", "200"))
+
+# Niceness added to training processes so serving keeps priority for the CPU
+TRAINING_JOB_NICE = int(os.getenv("TRAINING_JOB_NICE", "10"))
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+class _PipeLogHandler(logging.Handler):
+    """Forwards log records from a training process to the job manager"""
+    def __init__(self, conn):
+        super().__init__(level=logging.INFO)
+        self.conn = conn
+        self.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    def emit(self, record):
+        try:
+            self.conn.send(("log", self.format(record)))
+        except Exception:
+            self.handleError(record)
+
+def _run_training_job(conn, kind: str, model_type: str, data: pd.DataFrame, search_options, train_options, staged_dir: str):
+    """Training process entry point: trains into staged_dir and reports over conn"""
+    # Own process group, so cancelling also stops the search workers
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    if TRAINING_JOB_NICE and hasattr(os, "nice"):
+        os.nice(TRAINING_JOB_NICE)
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(_PipeLogHandler(conn))
+
+    last_sent = [0.0]
+    def progress(fraction: float, stage: str):
+        # Throttle: searches report after every parallel batch
+        now = time.monotonic()
+        if now - last_sent[0] >= 0.2 or fraction >= 0.95:
+            last_sent[0] = now
+            conn.send(("progress", fraction, stage))
+
+    try:
+        metrics = train_model(kind, model_type, data, search_options, output_dir=staged_dir,
+                              progress=progress, **train_options)
+        conn.send(("result", metrics))
+    except Exception as e:
+        logging.getLogger(__name__).exception("Training job failed")
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        # Idle search workers would otherwise keep this process from exiting
+        # until their timeout, and the job from finishing
+        from joblib.externals.loky import get_reusable_executor
+        get_reusable_executor().shutdown(wait=True)
+        conn.close()
+
+def _terminate(process):
+    """Terminate a training process together with its search workers"""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            return
+        except OSError:
+            # Not yet in its own process group, so it has no workers either
+            pass
+    process.terminate()
+
+class TrainingJob:
+    """
+    State of one training job as seen by the API
+    """
+    def __init__(self, kind: str, model_type: str, data: pd.DataFrame, search_options, train_options):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.model_type = model_type
+        self.data = data
+        self.rows = len(data)
+        self.search_options = search_options or {}
+        self.train_options = train_options or {}
+        self.status = QUEUED
+        self.progress = 0.0
+        self.stage = "queued"
+        self.logs: Deque[str] = deque(maxlen=TRAINING_JOB_LOG_LINES)
+        self.metrics: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.process = None
+        self.cancel_requested = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "modelType": self.model_type,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "stage": self.stage,
+            "rows": self.rows,
+            "options": {**self.search_options, **self.train_options},
+            "submittedAt": self.submitted_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "logs": list(self.logs),
+            "metrics": self.metrics,
+            "error": self.error,
+        }
+
+class TrainingJobManager:
+    """
+    Runs model training jobs in separate processes with bounded concurrency
+
+    At most max_running jobs train at once; up to max_queued more wait in
+    FIFO order and further submissions raise ExecutorSaturated. Each running
+    job has a monitor thread that collects progress, log lines and the result
+    from its process. On success the staged model files are published into
+    serving with ModelRegistry.publish; failed and cancelled jobs leave the
+    served model untouched.
+    """
+    def __init__(
+        self,
+        max_running: int = TRAINING_JOB_WORKERS,
+        max_queued: int = TRAINING_JOB_QUEUE_SIZE,
+        history: int = TRAINING_JOB_HISTORY
+    ):
+        self.max_running = max(1, max_running)
+        self.max_queued = max(0, max_queued)
+        self.history = history
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._pending: Deque[TrainingJob] = deque()
+        self._running: Dict[str, TrainingJob] = {}
+        self._lock = threading.RLock()
+        self._context = multiprocessing.get_context("spawn")
+        self._closed = False
+
+    def submit(
+        self,
+        kind: str,
+        model_type: str,
+        data: pd.DataFrame,
+        search_options: Optional[Dict[str, Any]] = None,
+        train_options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Queue a training job and start it if a worker is free"""
+        if kind not in MODEL_CLASSES:
+            raise ValueError(f"Unknown model kind: {kind}")
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Training job manager is shut down")
+            if len(self._running) >= self.max_running and len(self._pending) >= self.max_queued:
+                raise ExecutorSaturated("training jobs", retry_after=30)
+            job = TrainingJob(kind, model_type, data, search_options, train_options)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._prune()
+            self._dispatch()
+            return job.to_dict()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Job summaries, newest first (without logs and metrics)"""
+        with self._lock:
+            jobs = [job.to_dict() for job in reversed(self._jobs.values())]
+        for job in jobs:
+            del job["logs"], job["metrics"]
+        return jobs
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued or running job
+
+        Running jobs have their process and its search workers terminated;
+        nothing is published.
+        Returns None for unknown jobs and raises ValueError for finished ones.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status in FINISHED_STATES:
+                raise ValueError(f"Job {job_id} already {job.status}")
+            if job.stage == "publishing":
+                raise ValueError(f"Job {job_id} is already publishing its model")
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                self._pending.remove(job)
+                self._finish(job, CANCELLED, "cancelled")
+            elif job.process is not None:
+                job.stage = "cancelling"
+                _terminate(job.process)
+            return job.to_dict()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                "max_running": self.max_running,
+                "max_queued": self.max_queued,
+                "running": len(self._running),
+                "queued": len(self._pending),
+                "jobs": counts,
+            }
+
+    def shutdown(self):
+        """Stop accepting jobs and terminate running ones"""
+        with self._lock:
+            self._closed = True
+            for job in list(self._pending):
+                job.cancel_requested = True
+                self._finish(job, CANCELLED, "cancelled")
+            self._pending.clear()
+            processes = []
+            for job in self._running.values():
+                job.cancel_requested = True
+                _terminate(job.process)
+                processes.append(job.process)
+        for process in processes:
+            process.join(timeout=5)
+
+    def _dispatch(self):
+        """Start queued jobs while workers are free (lock held)"""
+        while self._pending and len(self._running) < self.max_running and not self._closed:
+            job = self._pending.popleft()
+            staged_dir = tempfile.mkdtemp(prefix=f".staging-{job.id}-", dir=MODELS_DIR)
+            receiver, sender = self._context.Pipe(duplex=False)
+            try:
+                job.process = self._context.Process(
+                    target=_run_training_job,
+                    args=(sender, job.kind, job.model_type, job.data, job.search_options, job.train_options, staged_dir),
+                    name=f"training-{job.id}",
+                    # Not a daemon: joblib cannot start search workers from one
+                    daemon=False,
+                )
+                job.process.start()
+            except Exception as e:
+                # A job whose process never started fails instead of staying queued
+                logger.exception(f"Training job {job.id} could not be started")
+                job.error = f"{type(e).__name__}: {e}"
+                self._finish(job, FAILED, "failed")
+                receiver.close()
+                sender.close()
+                shutil.rmtree(staged_dir, ignore_errors=True)
+                continue
+            sender.close()
+            job.status = RUNNING
+            job.stage = "starting"
+            job.started_at = time.time()
+            self._running[job.id] = job
+            threading.Thread(target=self._monitor, args=(job, receiver, staged_dir),
+                             name=f"training-monitor-{job.id}", daemon=True).start()
+            logger.info(f"Started training job {job.id} ({job.kind}:{job.model_type})")
+
+    def _monitor(self, job: TrainingJob, receiver, staged_dir: str):
+        """Collect messages from a job's process until it exits, then publish or fail"""
+        result = None
+        error = None
+        try:
+            while True:
+                try:
+                    message = receiver.recv()
+                except (EOFError, OSError):
+                    break
+                with self._lock:
+                    if message[0] == "log":
+                        job.logs.append(message[1])
+                    elif message[0] == "progress":
+                        job.progress, job.stage = message[1], message[2]
+                    elif message[0] == "result":
+                        result = message[1]
+                    elif message[0] == "error":
+                        error = message[1]
+            job.process.join()
+
+            with self._lock:
+                cancelled = job.cancel_requested
+                if not cancelled and result is not None:
+                    job.stage = "publishing"
+            if cancelled:
+                self._complete(job, CANCELLED, "cancelled")
+            elif result is not None:
+                model_registry.publish(job.kind, job.model_type, staged_dir)
+                job.metrics = result
+                self._complete(job, SUCCEEDED, "done")
+            else:
+                job.error = error or f"Training process exited with code {job.process.exitcode}"
+                self._complete(job, FAILED, "failed")
+        except Exception as e:
+            logger.exception(f"Training job {job.id} could not be completed")
+            job.error = f"{type(e).__name__}: {e}"
+            self._complete(job, FAILED, "failed")
+        finally:
+            receiver.close()
+            shutil.rmtree(staged_dir, ignore_errors=True)
+
+    def _complete(self, job: TrainingJob, status: str, stage: str):
+        with self._lock:
+            self._running.pop(job.id, None)
+            self._finish(job, status, stage)
+            self._dispatch()
+
+    def _finish(self, job: TrainingJob, status: str, stage: str):
+        """Record a final state and drop the training data (lock held)"""
+        job.status = status
+        job.stage = stage
+        if status == SUCCEEDED:
+            job.progress = 1.0
+        job.finished_at = time.time()
+        job.data = None
+        job.process = None
+        logger.info(f"Training job {job.id} {status}")
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit (lock held)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+# Shared job manager used by the API
+training_jobs = TrainingJobManager()